@@ -3,22 +3,35 @@ from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
 from flask_login import LoginManager
 import os
+import time
 from dotenv import load_dotenv
+from app.db_routing import RoutingSession, REPLICA_BIND
 
 # Load environment variables
 load_dotenv()
 
 # ✅ Define extensions
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 migrate = Migrate()
 login_manager = LoginManager()
 
 def create_app():
     # Error handler for 403 Forbidden (must be after app is created)
     # Remove error handler registration from here
+    started = time.perf_counter()
     app = Flask(__name__)
 
     app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'supersecretkey1234')
+    # create_app does no database work unless INIT_DB_ON_STARTUP=1, which runs
+    # `flask hms init` (tables and default users) on every start, for local setups
+    app.config['INIT_DB_ON_STARTUP'] = os.getenv('INIT_DB_ON_STARTUP', '0') == '1'
+    # Budget for importing the app and running create_app in a fresh process,
+    # checked by `flask hms check-startup`
+    app.config['STARTUP_TIME_BUDGET_MS'] = int(os.getenv('STARTUP_TIME_BUDGET_MS', '1500'))
+    # Werkzeug hash method for new passwords, e.g. 'pbkdf2:sha256:600000'. Users whose
+    # stored hash used other parameters are rehashed on their next login. The
+    # password_hash column (128 chars) fits pbkdf2 hashes, not scrypt ones.
+    app.config['PASSWORD_HASH_METHOD'] = os.getenv('PASSWORD_HASH_METHOD', 'pbkdf2:sha256')
 
     # Allow overriding the full DB URI (useful for testing with SQLite)
     env_db_uri = os.getenv('SQLALCHEMY_DATABASE_URI')
@@ -33,11 +46,119 @@ def create_app():
         app.config['SQLALCHEMY_DATABASE_URI'] = f'mysql+pymysql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}'
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
+    # Connection pool: pre-ping and recycle drop connections the server has
+    # closed (MySQL's wait_timeout). Size, overflow and checkout timeout only
+    # apply to server databases; SQLite keeps SQLAlchemy's pool defaults.
+    engine_options = {
+        'pool_pre_ping': os.getenv('DB_POOL_PRE_PING', '1') == '1',
+        'pool_recycle': int(os.getenv('DB_POOL_RECYCLE', '1800')),
+    }
+    if not app.config['SQLALCHEMY_DATABASE_URI'].startswith('sqlite'):
+        engine_options.update(
+            pool_size=int(os.getenv('DB_POOL_SIZE', '10')),
+            max_overflow=int(os.getenv('DB_MAX_OVERFLOW', '20')),
+            pool_timeout=int(os.getenv('DB_POOL_TIMEOUT', '10')),
+        )
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options
+
+    # Optional read replica for views marked @read_replica (see app/db_routing.py):
+    # DB_REPLICA_URI in full, or DB_REPLICA_HOST with the primary's credentials.
+    # After a replica error those views use the primary for DB_REPLICA_RETRY_SECONDS,
+    # and for DB_REPLICA_WRITE_GRACE_SECONDS after this process commits a write, so
+    # caches keyed on the new data versions are not filled from a lagging replica.
+    replica_uri = os.getenv('DB_REPLICA_URI')
+    if not replica_uri and os.getenv('DB_REPLICA_HOST') and not env_db_uri:
+        replica_uri = (f"mysql+pymysql://{DB_USER}:{DB_PASSWORD}@{os.getenv('DB_REPLICA_HOST')}:"
+                       f"{os.getenv('DB_REPLICA_PORT', DB_PORT)}/{DB_NAME}")
+    if replica_uri:
+        app.config['SQLALCHEMY_BINDS'] = {REPLICA_BIND: replica_uri}
+    app.config['DB_REPLICA_RETRY_SECONDS'] = int(os.getenv('DB_REPLICA_RETRY_SECONDS', '30'))
+    app.config['DB_REPLICA_WRITE_GRACE_SECONDS'] = int(os.getenv('DB_REPLICA_WRITE_GRACE_SECONDS', '10'))
+    # Max age (seconds) of the admin dashboard snapshot; 0 disables the TTL
+    # and relies on write routes invalidating it
+    app.config['DASHBOARD_SNAPSHOT_TTL'] = int(os.getenv('DASHBOARD_SNAPSHOT_TTL', '60'))
+    # Rebuild interval (seconds) of the in-process patient search index, so
+    # writes from other workers become searchable; 0 never rebuilds
+    app.config['PATIENT_SEARCH_INDEX_TTL'] = int(os.getenv('PATIENT_SEARCH_INDEX_TTL', '300'))
+    # Patient identifiers each worker reserves per round trip to the sequence table
+    app.config['PATIENT_ID_BLOCK_SIZE'] = int(os.getenv('PATIENT_ID_BLOCK_SIZE', '50'))
+    # Rows the bulk patient import validates and commits per transaction
+    app.config['PATIENT_IMPORT_CHUNK_SIZE'] = int(os.getenv('PATIENT_IMPORT_CHUNK_SIZE', '500'))
+    # Rows fetched per server-side cursor batch (and written per chunk) by the /export endpoints
+    app.config['EXPORT_CHUNK_ROWS'] = int(os.getenv('EXPORT_CHUNK_ROWS', '1000'))
+
+    # Audit log: written in batches by a background thread in each process (see
+    # app/audit.py). Records reach disk after AUDIT_FLUSH_RECORDS records or
+    # AUDIT_FLUSH_INTERVAL_MS, whichever comes first. All workers append to the one
+    # file; rotate it externally (e.g. logrotate), the app reopens it once moved.
+    app.config['AUDIT_LOG_PATH'] = os.getenv('AUDIT_LOG_PATH', os.path.join(app.root_path, 'audit.log'))
+    app.config['AUDIT_FLUSH_RECORDS'] = int(os.getenv('AUDIT_FLUSH_RECORDS', '100'))
+    app.config['AUDIT_FLUSH_INTERVAL_MS'] = int(os.getenv('AUDIT_FLUSH_INTERVAL_MS', '1000'))
+
+    # Per-request SQL statistics (see app/sql_instrumentation.py): X-Query-Count /
+    # X-DB-Time-ms response headers and the /debug/sql page. On by default in debug,
+    # and always on while TESTING is set so @query_budget is enforced in tests.
+    # A statement repeated SQL_N_PLUS_ONE_THRESHOLD times with different parameters
+    # is reported as a likely N+1; SQL_QUERY_BUDGET_STRICT makes @query_budget raise.
+    app.config['SQL_INSTRUMENTATION'] = os.getenv('SQL_INSTRUMENTATION', '1' if app.debug else '0') == '1'
+    app.config['SQL_INSTRUMENTATION_HISTORY'] = int(os.getenv('SQL_INSTRUMENTATION_HISTORY', '50'))
+    app.config['SQL_N_PLUS_ONE_THRESHOLD'] = int(os.getenv('SQL_N_PLUS_ONE_THRESHOLD', '5'))
+    app.config['SQL_QUERY_BUDGET_STRICT'] = os.getenv('SQL_QUERY_BUDGET_STRICT', '0') == '1'
+
+    # Prometheus text-format metrics on /metrics (see app/metrics.py), served only to
+    # the comma-separated METRICS_ALLOWED_IPS (local scrapes by default)
+    app.config['METRICS_ENABLED'] = os.getenv('METRICS_ENABLED', '1') == '1'
+    app.config['METRICS_ALLOWED_IPS'] = tuple(
+        ip.strip() for ip in os.getenv('METRICS_ALLOWED_IPS', '127.0.0.1,::1').split(',') if ip.strip()
+    )
+    # Rendered sidebar and ward/team card fragments kept per process ({% cache %},
+    # see app/fragment_cache.py). Entries are keyed on role and table versions, so
+    # local writes replace them at once; FRAGMENT_CACHE_TTL bounds how long writes
+    # made by other worker processes go unseen. FRAGMENT_CACHE_SIZE=0 disables it.
+    app.config['FRAGMENT_CACHE_SIZE'] = int(os.getenv('FRAGMENT_CACHE_SIZE', '512'))
+    app.config['FRAGMENT_CACHE_TTL'] = int(os.getenv('FRAGMENT_CACHE_TTL', '60'))
+    # List pages, dashboards and JSON lookups answer 304 Not Modified while the
+    # tables they read are unchanged (see app/http_cache.py). Their validators
+    # also roll over every CONDITIONAL_GET_WINDOW seconds, which bounds staleness
+    # from other worker processes' writes; 0 turns conditional GETs off.
+    app.config['CONDITIONAL_GET_WINDOW'] = int(os.getenv('CONDITIONAL_GET_WINDOW', '60'))
+    # Templates link static files through asset_url(): with fingerprinting on, the
+    # content-hashed copies from `flask hms build-assets` are served from /assets/
+    # precompressed and cached for a year. Off by default in debug so edits show up.
+    app.config['STATIC_ASSETS_FINGERPRINT'] = os.getenv('STATIC_ASSETS_FINGERPRINT',
+                                                        '0' if app.debug else '1') == '1'
+
     # ✅ Initialize extensions
     db.init_app(app)
     migrate.init_app(app, db)
     login_manager.init_app(app)
     login_manager.login_view = 'auth.login'
+    # POST /login throttling (see app/login_throttle.py): token buckets per client
+    # address and per username from that address, and at most LOGIN_MAX_CONCURRENT_HASHES password
+    # verifications at once; further attempts are turned away with 503.
+    from app.login_throttle import login_throttle
+    login_throttle.configure(
+        user_burst=int(os.getenv('LOGIN_USER_BURST', '5')),
+        user_per_minute=int(os.getenv('LOGIN_USER_PER_MINUTE', '5')),
+        ip_burst=int(os.getenv('LOGIN_IP_BURST', '50')),
+        ip_per_minute=int(os.getenv('LOGIN_IP_PER_MINUTE', '60')),
+        max_concurrent=int(os.getenv('LOGIN_MAX_CONCURRENT_HASHES', '2')),
+    )
+    # Logged-in users are cached per process (see app/user_cache.py); changes to a
+    # user evict it at once here, and from other processes within USER_CACHE_TTL
+    from app.user_cache import user_cache
+    user_cache.configure(max_size=int(os.getenv('USER_CACHE_SIZE', '1024')),
+                         ttl=int(os.getenv('USER_CACHE_TTL', '300')))
+    from app.audit import init_audit_logging
+    init_audit_logging(app)
+    from app.sql_instrumentation import init_sql_instrumentation
+    init_sql_instrumentation(app)
+    from app.metrics import init_metrics
+    init_metrics(app)
+    from app.fragment_cache import init_fragment_cache
+    init_fragment_cache(app)
+    from app.assets import init_assets
+    init_assets(app)
 
     # ✅ Register blueprints
     from app.routes.auth import auth_bp
@@ -48,8 +169,10 @@ def create_app():
     from app.routes.doctor import doctor_bp
     from app.routes.nurse import nurse_bp
     from app.routes.staff import staff_bp
-    # Debug routes (only register when app.debug)
-    from app.routes.debug import debug_bp
+    from app.routes.treatment import treatment_bp
+    from app.routes.exports import exports_bp
+    from app.routes.metrics import metrics_bp
+    from app.routes.assets import assets_bp
 
     app.register_blueprint(auth_bp)
     app.register_blueprint(patients_bp)
@@ -59,22 +182,28 @@ def create_app():
     app.register_blueprint(doctor_bp)
     app.register_blueprint(nurse_bp)
     app.register_blueprint(staff_bp)
+    app.register_blueprint(treatment_bp)
+    app.register_blueprint(exports_bp)
+    app.register_blueprint(metrics_bp)
+    app.register_blueprint(assets_bp)
+    # Debug routes (only imported and registered when app.debug)
     if app.debug:
+        from app.routes.debug import debug_bp
         app.register_blueprint(debug_bp)
 
+    # `flask hms ...` commands
+    from app.cli import hms_cli
+    app.cli.add_command(hms_cli)
+
 
-    with app.app_context():
-        from app.models import create_default_users
-        create_default_users()
+    if app.config['INIT_DB_ON_STARTUP']:
+        from app.cli import init_database
+        with app.app_context():
+            init_database()
 
     app_returned = app
     def forbidden(e):
         return render_template('403.html'), 403
     app_returned.register_error_handler(403, forbidden)
+    app_returned.extensions['hms_startup_ms'] = (time.perf_counter() - started) * 1000
     return app_returned
-
-# ✅ Flask-Login user loader
-@login_manager.user_loader
-def load_user(user_id):
-    from app.models import User
-    return User.query.get(int(user_id))
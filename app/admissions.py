@@ -0,0 +1,253 @@
+import codecs
+import csv
+import json
+import os
+from collections import Counter
+from datetime import datetime, UTC
+from typing import NamedTuple
+
+from sqlalchemy import insert, select
+from sqlalchemy.exc import SQLAlchemyError
+
+from app import db
+from app.beds import reserve_beds
+from app.dashboard_stats import invalidate_dashboard_snapshot
+from app.identifiers import patient_identifiers
+from app.models import Patient, Ward, Team
+from app.search_index import patient_search_index
+from app.unit_of_work import UnitOfWork
+
+IMPORT_FORMATS = ('csv', 'ndjson')
+IMPORT_FIELDS = ('name', 'age', 'gender', 'ward_name', 'team_id', 'admission_date')
+DEFAULT_CHUNK_SIZE = 500
+
+
+# -- admission rules shared by add_patient and the bulk import ---------------
+def ward_gender_error(ward, gender):
+    """Only enforced when the ward type is 'male' or 'female'."""
+    ward_type = ward.type.lower()
+    if ward_type in ('male', 'female') and ward_type != gender.lower():
+        return 'Selected ward does not match patient gender.'
+    return None
+
+
+def team_admission_error(team):
+    """Why a team cannot take patients (needs a Consultant and a Grade 1/Junior doctor), or None.
+
+    Reads the team's stored readiness counts; doctors are only loaded to
+    explain a rejection.
+    """
+    if team.admission_ready:
+        return None
+    doctor_count = team.doctor_count
+    if doctor_count == 0:
+        return 'Selected team has no doctors; please add doctors to the team first.'
+    # Readable doctor list for diagnostics
+    doctor_list_text = '; '.join(f"{d.name} ({(d.grade or 'unknown').strip()})" for d in team.doctors)
+    if not team.consultant_count:
+        return f'Selected team must have at least one Consultant (found {doctor_count} doctors). Doctors: {doctor_list_text}'
+    return f'Selected team must have at least one Grade 1 / junior doctor (found {doctor_count} doctors). Doctors: {doctor_list_text}'
+
+
+def parse_admission_date(value):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d')
+    except Exception:
+        return datetime.now(UTC)
+
+
+# -- bulk import ---------------------------------------------------------------
+def detect_format(filename=None, mimetype=None):
+    """Guess 'csv' or 'ndjson' from an upload's file name or content type."""
+    ext = os.path.splitext(filename or '')[1].lower()
+    if ext in ('.ndjson', '.jsonl') or mimetype in ('application/x-ndjson', 'application/jsonl', 'application/json'):
+        return 'ndjson'
+    return 'csv'
+
+
+def read_rows(stream, fmt):
+    """Yield (row_number, mapping) from a binary CSV or NDJSON stream, one line at a time.
+
+    Row numbers are input line numbers. A line that cannot be parsed is
+    yielded with a ValueError in place of the mapping.
+    """
+    lines = codecs.iterdecode(stream, 'utf-8-sig')
+    if fmt == 'csv':
+        reader = csv.DictReader(lines)
+        for row in reader:
+            yield reader.line_num, row
+        return
+    for line_num, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as exc:
+            yield line_num, ValueError(f'Invalid JSON: {exc}')
+            continue
+        if not isinstance(row, dict):
+            row = ValueError('Each line must be a JSON object.')
+        yield line_num, row
+
+
+class RowResult(NamedTuple):
+    row: int
+    status: str  # 'accepted' or 'rejected'
+    patient_identifier: str | None = None
+    error: str | None = None
+
+    def to_dict(self):
+        return {k: v for k, v in self._asdict().items() if v is not None}
+
+
+class _WardInfo(NamedTuple):
+    id: int
+    name: str
+    type: str
+
+
+class AdmissionImporter:
+    """Admit many patients with the same rules as add_patient.
+
+    Wards and team readiness are loaded once up front, so each
+    row is validated in memory. Valid rows are written every `chunk_size`
+    rows: identifiers come from one block, beds are reserved with one
+    conditional UPDATE per ward, and patients plus their activity rows go
+    out as multi-row INSERTs in a single commit. Beds are tracked across the
+    whole import, so a file cannot overfill a ward; if another writer took
+    beds in the meantime, the rows that no longer fit are rejected.
+    Results are yielded in input order.
+    """
+
+    def __init__(self, chunk_size=DEFAULT_CHUNK_SIZE, user_id=None, username=None):
+        self.chunk_size = max(1, chunk_size or DEFAULT_CHUNK_SIZE)
+        self.user_id = user_id
+        self.username = username
+        self.accepted = 0
+        self.rejected = 0
+        self.wards = {}
+        self.ward_names = {}
+        self.free_beds = {}
+        for ward in db.session.execute(select(Ward.id, Ward.name, Ward.type, Ward.capacity, Ward.current_occupancy)):
+            self.wards[ward.name.strip().lower()] = _WardInfo(ward.id, ward.name, ward.type)
+            self.ward_names[ward.id] = ward.name
+            self.free_beds[ward.id] = ward.capacity - ward.current_occupancy
+        self.team_errors = {
+            team.id: team_admission_error(team)
+            for team in Team.query
+        }
+
+    def summary(self):
+        return {'accepted': self.accepted, 'rejected': self.rejected}
+
+    def _validate(self, data):
+        """Return (values, None) for an admissible row or (None, error)."""
+        if isinstance(data, Exception):
+            return None, str(data)
+        fields = {key: str(data.get(key) or '').strip() for key in IMPORT_FIELDS}
+        if not all(fields.values()):
+            return None, 'All fields are required.'
+        try:
+            age = int(fields['age'])
+        except ValueError:
+            return None, 'Age must be a whole number.'
+        ward = self.wards.get(fields['ward_name'].lower())
+        if ward is None:
+            return None, 'Ward with that name does not exist.'
+        error = ward_gender_error(ward, fields['gender'])
+        if error:
+            return None, error
+        try:
+            team_id = int(fields['team_id'])
+        except ValueError:
+            team_id = None
+        if team_id not in self.team_errors:
+            return None, 'Selected team does not exist.'
+        if self.team_errors[team_id]:
+            return None, self.team_errors[team_id]
+        if self.free_beds[ward.id] < 1:
+            return None, 'Selected ward has no available beds.'
+        self.free_beds[ward.id] -= 1
+        return {
+            'name': fields['name'],
+            'age': age,
+            'gender': fields['gender'],
+            'ward_id': ward.id,
+            'team_id': team_id,
+            'admission_date': parse_admission_date(fields['admission_date']),
+        }, None
+
+    def run(self, rows):
+        """Yield one RowResult per input row, in input order, committing every `chunk_size` rows."""
+        chunk = []
+        for row, data in rows:
+            values, error = self._validate(data)
+            chunk.append((row, values, error))
+            if len(chunk) >= self.chunk_size:
+                yield from self._flush(chunk)
+                chunk = []
+        if chunk:
+            yield from self._flush(chunk)
+
+    def _flush(self, chunk):
+        """Write the chunk's valid rows; yield a result for every row of the chunk, in order."""
+        pending = [(row, values) for row, values, error in chunk if error is None]
+        if not pending:
+            for row, _, error in chunk:
+                self.rejected += 1
+                yield RowResult(row, 'rejected', error=error)
+            return
+        # Identifiers come from their own transaction, so take them before any ward row is locked
+        identifiers = iter(patient_identifiers.allocate(len(pending)))
+        wanted = Counter(values['ward_id'] for _, values in pending)
+        granted = {ward_id: reserve_beds(ward_id, count) for ward_id, count in wanted.items()}
+        uow = UnitOfWork()
+        username = self.username if self.username is not None else 'unknown'
+        results, records = [], []
+        for row, values, error in chunk:
+            if error is not None:
+                results.append(RowResult(row, 'rejected', error=error))
+                continue
+            ward_id = values['ward_id']
+            if granted[ward_id] < 1:
+                self.free_beds[ward_id] = 0
+                results.append(RowResult(row, 'rejected', error='Selected ward has no available beds.'))
+                continue
+            granted[ward_id] -= 1
+            values['patient_identifier'] = next(identifiers)
+            records.append(values)
+            results.append(RowResult(row, 'accepted', patient_identifier=values['patient_identifier']))
+            ward_name = self.ward_names[ward_id]
+            uow.audit(f"User '{username}' admitted patient '{values['name']}' ({values['patient_identifier']}) to ward '{ward_name}' (ID: {ward_id}) on {values['admission_date'].strftime('%Y-%m-%d')} (bulk import)")
+            uow.activity('Add Patient', f"{values['name']} admitted to {ward_name}",
+                         user_id=self.user_id, username=username)
+        if records:
+            try:
+                db.session.execute(insert(Patient), records)
+                uow.on_commit(invalidate_dashboard_snapshot)
+                uow.on_commit(self._index, [r['patient_identifier'] for r in records])
+                uow.commit()
+            except SQLAlchemyError as exc:
+                uow.rollback()
+                for values in records:
+                    self.free_beds[values['ward_id']] += 1
+                error = f'Could not save row: {exc.__class__.__name__}'
+                results = [r if r.status == 'rejected' else RowResult(r.row, 'rejected', error=error) for r in results]
+        else:
+            uow.rollback()
+        for result in results:
+            if result.status == 'accepted':
+                self.accepted += 1
+            else:
+                self.rejected += 1
+            yield result
+
+    @staticmethod
+    def _index(identifiers):
+        rows = db.session.execute(
+            select(Patient.id, Patient.name, Patient.patient_identifier,
+                   Patient.ward_id, Patient.team_id, Patient.discharge_date)
+            .where(Patient.patient_identifier.in_(identifiers))
+        )
+        for row in rows:
+            patient_search_index.upsert_patient(row)
@@ -0,0 +1,124 @@
+import gzip
+import hashlib
+import json
+import os
+import re
+import shutil
+
+from flask import url_for
+
+try:
+    import brotli
+except ImportError:  # optional; without it only gzip variants are written
+    brotli = None
+
+# Build output, under the app's static folder
+DIST_DIR = 'dist'
+MANIFEST_NAME = 'manifest.json'
+# Only text assets are worth precompressing
+COMPRESSIBLE = ('.css', '.js', '.svg', '.json', '.txt', '.map', '.html')
+ENCODED_SUFFIXES = {'br': '.br', 'gzip': '.gz'}
+_FINGERPRINT = re.compile(r'\.[0-9a-f]{12}(\.[^./]+)?$')
+
+
+def fingerprinted_name(filename, content):
+    """'css/style.css' -> 'css/style.<first 12 hex digits of sha256>.css'"""
+    stem, ext = os.path.splitext(filename)
+    return f'{stem}.{hashlib.sha256(content).hexdigest()[:12]}{ext}'
+
+
+def is_fingerprinted(filename):
+    """True for names made by fingerprinted_name(), i.e. not the manifest."""
+    return _FINGERPRINT.search(filename) is not None
+
+
+def _source_files(static_folder):
+    for root, dirs, files in os.walk(static_folder):
+        if root == static_folder and DIST_DIR in dirs:
+            dirs.remove(DIST_DIR)
+        for name in files:
+            if not name.endswith(('.gz', '.br')):
+                path = os.path.join(root, name)
+                yield os.path.relpath(path, static_folder).replace(os.sep, '/'), path
+
+
+def _write(path, content):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(content)
+
+
+def build_assets(static_folder, clean=False):
+    """Write fingerprinted copies of the static files, their gzip/brotli variants and a manifest.
+
+    Outputs go to <static_folder>/dist; the manifest maps each source name
+    to its fingerprinted name. Files from earlier builds are kept, so pages
+    rendered before a deploy can still load them, unless `clean` is set.
+    Returns the manifest.
+    """
+    dist = os.path.join(static_folder, DIST_DIR)
+    manifest = {}
+    for filename, path in sorted(_source_files(static_folder)):
+        with open(path, 'rb') as f:
+            content = f.read()
+        hashed = fingerprinted_name(filename, content)
+        manifest[filename] = hashed
+        target = os.path.join(dist, hashed)
+        _write(target, content)
+        if filename.endswith(COMPRESSIBLE):
+            # mtime=0 keeps the .gz bytes identical between builds
+            _write(target + '.gz', gzip.compress(content, compresslevel=9, mtime=0))
+            if brotli is not None:
+                _write(target + '.br', brotli.compress(content, quality=11))
+    if clean and os.path.isdir(dist):
+        _remove_stale(dist, set(manifest.values()))
+    _write(os.path.join(dist, MANIFEST_NAME), json.dumps(manifest, indent=2, sort_keys=True).encode())
+    return manifest
+
+
+def _remove_stale(dist, keep):
+    for root, dirs, files in os.walk(dist):
+        for name in files:
+            relative = os.path.relpath(os.path.join(root, name), dist).replace(os.sep, '/')
+            base = relative.removesuffix('.gz').removesuffix('.br')
+            if base != MANIFEST_NAME and base not in keep:
+                os.remove(os.path.join(root, name))
+    for root, dirs, files in os.walk(dist, topdown=False):
+        if root != dist and not os.listdir(root):
+            shutil.rmtree(root)
+
+
+class AssetManifest:
+    """Source name -> fingerprinted name, as written by build_assets()."""
+
+    def __init__(self):
+        self.entries = {}
+
+    def load(self, path):
+        try:
+            with open(path, encoding='utf-8') as f:
+                self.entries = json.load(f)
+        except FileNotFoundError:
+            self.entries = {}
+        return self.entries
+
+    def url(self, filename):
+        """URL of the fingerprinted asset, or the plain static URL if it was not built."""
+        hashed = self.entries.get(filename)
+        if hashed is None:
+            return url_for('static', filename=filename)
+        return url_for('assets.asset', filename=hashed)
+
+
+asset_manifest = AssetManifest()
+
+
+def init_assets(app):
+    """Point templates' asset_url() at the build manifest when fingerprinting is on."""
+    manifest_path = os.path.join(app.static_folder, DIST_DIR, MANIFEST_NAME)
+    if app.config.get('STATIC_ASSETS_FINGERPRINT'):
+        if not asset_manifest.load(manifest_path):
+            app.logger.info('No asset manifest at %s; run `flask hms build-assets`', manifest_path)
+    else:
+        asset_manifest.entries = {}
+    app.jinja_env.globals['asset_url'] = asset_manifest.url
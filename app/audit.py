@@ -0,0 +1,173 @@
+import atexit
+import logging
+import logging.handlers
+import os
+import queue
+import threading
+import time
+
+# Routes log audit events here; the record is only queued in the request
+# thread and written to disk by a background listener in the same process.
+audit_logger = logging.getLogger('audit')
+audit_logger.setLevel(logging.INFO)
+audit_logger.propagate = False
+
+AUDIT_FORMAT = '%(asctime)s %(levelname)s %(message)s'
+
+_state_lock = threading.Lock()
+_settings = None
+_audit_queue = None
+_listener = None
+# Process that owns _audit_queue and _listener
+_listener_pid = None
+
+
+class BatchFileHandler(logging.handlers.WatchedFileHandler):
+    """Appends a whole batch of records to the audit log with one write.
+
+    Every worker process appends to the same file, which is opened for
+    append, so a batch lands in one piece instead of interleaving with
+    another process's records. Rotation is left to an external tool such
+    as logrotate: the file is reopened when it has been moved away.
+    """
+
+    def emit_batch(self, records):
+        text = ''.join(self.format(record) + self.terminator for record in records)
+        if not text:
+            return
+        with self.lock:
+            self.reopenIfNeeded()
+            if self.stream is None:
+                self.stream = self._open()
+            self.stream.flush()
+            os.write(self.stream.fileno(), text.encode(self.encoding or 'utf-8'))
+
+
+class BatchingQueueListener(logging.handlers.QueueListener):
+    """QueueListener that writes records in batches.
+
+    A batch is written once `flush_records` records are waiting or
+    `flush_interval` seconds after its first record arrived, whichever comes
+    first; that pair is the durability window for an unclean crash.
+    """
+
+    def __init__(self, queue_, handler, flush_records=100, flush_interval=1.0):
+        super().__init__(queue_, handler, respect_handler_level=True)
+        self.flush_records = max(1, flush_records)
+        self.flush_interval = max(0.0, flush_interval)
+
+    def _write(self, batch):
+        handler = self.handlers[0]
+        try:
+            handler.emit_batch([record for record in batch
+                                if record.levelno >= handler.level and handler.filter(record)])
+        except Exception:
+            handler.handleError(batch[0])
+
+    def _monitor(self):
+        q = self.queue
+        while True:
+            record = q.get()
+            if record is self._sentinel:
+                return
+            batch = [record]
+            deadline = time.monotonic() + self.flush_interval
+            stop = False
+            while len(batch) < self.flush_records:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    record = q.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if record is self._sentinel:
+                    stop = True
+                    break
+                batch.append(record)
+            self._write(batch)
+            if stop:
+                return
+
+
+def _build_handler(path):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    handler = BatchFileHandler(path, encoding='utf-8', delay=True)
+    handler.setFormatter(logging.Formatter(AUDIT_FORMAT))
+    return handler
+
+
+def _start_listener():
+    """Start this process's queue and writer thread, unless already running."""
+    global _audit_queue, _listener, _listener_pid
+    with _state_lock:
+        if _listener_pid == os.getpid() or _settings is None:
+            return
+        _audit_queue = queue.SimpleQueue()
+        _listener = BatchingQueueListener(
+            _audit_queue, _build_handler(_settings['path']),
+            flush_records=_settings['flush_records'], flush_interval=_settings['flush_interval'],
+        )
+        _listener.start()
+        _listener_pid = os.getpid()
+
+
+class _LazyQueueHandler(logging.handlers.QueueHandler):
+    """Queues audit records, starting the writer thread on this process's first record.
+
+    Starting lazily means a worker forked from a preloaded master (gunicorn
+    --preload) gets its own writer; threads do not survive fork().
+    """
+
+    def __init__(self):
+        super().__init__(None)
+
+    def enqueue(self, record):
+        if _listener_pid != os.getpid():
+            _start_listener()
+        if _audit_queue is not None:
+            _audit_queue.put_nowait(record)
+
+
+def init_audit_logging(app):
+    """Route the 'audit' logger through an in-memory queue to a batching file writer."""
+    global _settings
+    shutdown_audit_logging()
+    _settings = {
+        'path': app.config['AUDIT_LOG_PATH'],
+        'flush_records': app.config.get('AUDIT_FLUSH_RECORDS', 100),
+        'flush_interval': app.config.get('AUDIT_FLUSH_INTERVAL_MS', 1000) / 1000.0,
+    }
+    for existing in list(audit_logger.handlers):
+        audit_logger.removeHandler(existing)
+    audit_logger.addHandler(_LazyQueueHandler())
+
+
+def shutdown_audit_logging():
+    """Drain the queue to disk and stop the listener; safe to call repeatedly."""
+    global _listener, _listener_pid
+    with _state_lock:
+        listener, _listener = _listener, None
+        owned = _listener_pid == os.getpid()
+        _listener_pid = None
+    if listener is not None and owned:
+        listener.stop()
+        for handler in listener.handlers:
+            handler.close()
+
+
+def _forget_parent_listener():
+    # The child has a copy of the parent's queue (records the parent will
+    # write) but not its thread; start afresh on the child's first record
+    global _state_lock, _audit_queue, _listener, _listener_pid
+    _state_lock = threading.Lock()
+    _audit_queue, _listener, _listener_pid = None, None, None
+
+
+def audit_queue_depth():
+    """Records logged but not yet written (approximate)."""
+    return _audit_queue.qsize() if _audit_queue is not None else 0
+
+
+atexit.register(shutdown_audit_logging)
+os.register_at_fork(after_in_child=_forget_parent_listener)
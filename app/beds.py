@@ -0,0 +1,73 @@
+from sqlalchemy import select, update
+from sqlalchemy.orm.util import identity_key
+
+from app import db
+from app.models import Ward
+
+
+def _execute(statement, ward_id):
+    result = db.session.execute(statement.execution_options(synchronize_session=False))
+    # Any Ward already loaded in this session now has a stale occupancy
+    ward = db.session.identity_map.get(identity_key(Ward, ward_id))
+    if ward is not None:
+        db.session.expire(ward, ['current_occupancy'])
+    return result.rowcount == 1
+
+
+def _claim(ward_id, count):
+    return _execute(
+        update(Ward)
+        .where(Ward.id == ward_id, Ward.current_occupancy + count <= Ward.capacity)
+        .values(current_occupancy=Ward.current_occupancy + count),
+        ward_id,
+    )
+
+
+def reserve_bed(ward_id):
+    """Take one bed in a ward if it has room; return False when the ward is full.
+
+    The capacity check and the increment are a single conditional UPDATE, so
+    concurrent admissions cannot overbook a ward: the database serializes
+    writers on the ward row and re-checks the condition for each of them.
+    The change commits (or rolls back) with the caller's transaction.
+    """
+    return _claim(ward_id, 1)
+
+
+def reserve_beds(ward_id, count):
+    """Take up to `count` beds in a ward at once; return how many were taken."""
+    if count <= 0:
+        return 0
+    if _claim(ward_id, count):
+        return count
+    # Not enough room for all of them: take whatever is left
+    free = db.session.execute(
+        select(Ward.capacity - Ward.current_occupancy).where(Ward.id == ward_id)
+    ).scalar()
+    if free and 0 < free < count and _claim(ward_id, free):
+        return free
+    return 0
+
+
+def release_bed(ward_id):
+    """Free one bed in a ward; return False if it was already empty."""
+    return _execute(
+        update(Ward)
+        .where(Ward.id == ward_id, Ward.current_occupancy > 0)
+        .values(current_occupancy=Ward.current_occupancy - 1),
+        ward_id,
+    )
+
+
+def move_bed(from_ward_id, to_ward_id):
+    """Reserve a bed in `to_ward_id` and release the one held in `from_ward_id`.
+
+    Returns False, leaving both wards untouched, when the target ward is full.
+    """
+    if from_ward_id == to_ward_id:
+        return True
+    if not reserve_bed(to_ward_id):
+        return False
+    if from_ward_id is not None:
+        release_bed(from_ward_id)
+    return True
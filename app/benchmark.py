@@ -0,0 +1,214 @@
+import contextlib
+import contextvars
+import json
+import os
+import statistics
+import subprocess
+import threading
+import time
+from collections import Counter
+from datetime import datetime, UTC
+
+from sqlalchemy import event, select
+
+from app import db
+from app.models import User, Patient, Ward, Team
+
+# (label, role to log in as, URL); {patient}, {ward} and {team} are filled
+# with ids from the database being measured
+BENCHMARK_ROUTES = [
+    ('dashboard.dashboard', 'admin', '/dashboard'),
+    ('dashboard.reports', 'admin', '/reports'),
+    ('dashboard.doctor_scheduling', 'admin', '/doctor-scheduling'),
+    ('dashboard.notifications', 'admin', '/dashboard/notifications'),
+    ('patients.list_patients', 'admin', '/patients'),
+    ('patients.list_patients (ward filter)', 'admin', '/patients?ward_id={ward}'),
+    ('patients.list_patients (discharged)', 'admin', '/patients?status=discharged'),
+    ('patients.patient_details', 'admin', '/patients/{patient}'),
+    ('patients.list_patients_by_ward', 'admin', '/wards/{ward}/patients'),
+    ('patients.list_patients_by_team', 'admin', '/teams/{team}/patients'),
+    ('patients.search_patients', 'admin', '/api/patients/search?q=smi'),
+    ('patients.add_patient_form', 'admin', '/patients/add'),
+    ('wards.list_wards', 'admin', '/wards'),
+    ('wards.ward_details', 'admin', '/wards/{ward}'),
+    ('teams.list_teams', 'admin', '/teams'),
+    ('teams.team_details', 'admin', '/teams/{team}'),
+    ('staff.staff_list', 'admin', '/staff'),
+    ('doctor.dashboard', 'doctor', '/doctor'),
+    ('nurse.dashboard', 'nurse', '/nurse'),
+]
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True, cwd=os.path.dirname(__file__)).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class _QueryCounter:
+    """Counts statements the current thread runs on `engine`."""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.count = 0
+        self.thread = threading.get_ident()
+
+    def _count(self, *args):
+        if threading.get_ident() == self.thread:
+            self.count += 1
+
+    def __enter__(self):
+        event.listen(self.engine, 'before_cursor_execute', self._count)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, 'before_cursor_execute', self._count)
+        return False
+
+
+def _request(client, url):
+    # Run outside any app context the caller (e.g. the flask CLI) has pushed,
+    # so the request gets its own app context, session and `g` as in production
+    def get():
+        response = client.get(url)
+        response.get_data()
+        return response
+    return contextvars.Context().run(get)
+
+
+class LoginFlood:
+    """Threads posting wrong passwords to /login, from varying addresses, until stopped."""
+
+    def __init__(self, app, threads, usernames):
+        self.app = app
+        self.threads = threads
+        self.usernames = usernames or ['admin']
+        self.statuses = Counter()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._workers = []
+
+    def _run(self, worker):
+        client = self.app.test_client()
+        attempt = 0
+        while not self._stop.is_set():
+            attempt += 1
+            response = client.post('/login', data={
+                'username': self.usernames[attempt % len(self.usernames)], 'password': 'wrong-password',
+            }, environ_base={'REMOTE_ADDR': f'10.{worker % 250}.{attempt // 250 % 250}.{attempt % 250}'})
+            with self._lock:
+                self.statuses[response.status_code] += 1
+
+    def __enter__(self):
+        for worker in range(self.threads):
+            thread = threading.Thread(target=contextvars.Context().run, args=(self._run, worker), daemon=True)
+            thread.start()
+            self._workers.append(thread)
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        for thread in self._workers:
+            thread.join()
+        return False
+
+
+def _percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def run_benchmark(app, repeat=5, warmup=1, routes=None, echo=print, login_flood=0):
+    """Time each route through the test client; return a JSON-serializable result dict.
+
+    Each route is requested `warmup` times unmeasured, then `repeat` times.
+    Latency is wall time for the full request in milliseconds; queries is
+    the number of statements executed by the last measured request. With
+    `login_flood`, that many threads keep posting bad logins meanwhile, to
+    check that the login throttle keeps other routes' latency steady.
+    """
+    with app.app_context():
+        ids = {
+            'patient': db.session.execute(select(Patient.id).order_by(Patient.id.desc()).limit(1)).scalar(),
+            'ward': db.session.execute(select(Ward.id).order_by(Ward.id).limit(1)).scalar(),
+            'team': db.session.execute(select(Team.id).order_by(Team.id).limit(1)).scalar(),
+        }
+        users = dict(db.session.execute(select(User.role, User.id).where(User.username.in_(['admin', 'doctor', 'nurse']))).all())
+        users_by_name = db.session.execute(select(User.username)).scalars().all()
+        engine = db.engine
+        counts = {
+            'patients': db.session.execute(select(db.func.count(Patient.id))).scalar(),
+            'wards': db.session.execute(select(db.func.count(Ward.id))).scalar(),
+        }
+    client = app.test_client()
+    flood = LoginFlood(app, login_flood, list(users_by_name))
+    with flood if login_flood else contextlib.nullcontext():
+        results = _time_routes(client, routes or BENCHMARK_ROUTES, users, ids, engine, repeat, warmup, echo)
+    data = {
+        'commit': _git_commit(),
+        'created_at': datetime.now(UTC).isoformat(timespec='seconds'),
+        'database': engine.dialect.name,
+        'rows': counts,
+        'repeat': repeat,
+        'results': results,
+    }
+    if login_flood:
+        data['login_flood'] = {'threads': login_flood,
+                               'responses': {str(k): v for k, v in sorted(flood.statuses.items())}}
+        echo(f"login flood ({login_flood} threads): {data['login_flood']['responses']}")
+    return data
+
+
+def _time_routes(client, routes, users, ids, engine, repeat, warmup, echo):
+    results = []
+    for label, role, url in routes:
+        if role not in users:
+            echo(f'skip {label}: no {role} user')
+            continue
+        url = url.format(**ids)
+        # Log in by session cookie, the way Flask-Login stores the user id
+        with client.session_transaction() as session:
+            session['_user_id'] = str(users[role])
+            session['_fresh'] = True
+        for _ in range(warmup):
+            _request(client, url)
+        timings = []
+        with _QueryCounter(engine) as counter:
+            for _ in range(repeat):
+                counter.count = 0
+                started = time.perf_counter()
+                response = _request(client, url)
+                timings.append((time.perf_counter() - started) * 1000)
+        result = {
+            'route': label, 'url': url, 'status': response.status_code, 'queries': counter.count,
+            'min_ms': round(min(timings), 2), 'median_ms': round(statistics.median(timings), 2),
+            'p95_ms': round(_percentile(timings, 95), 2), 'p99_ms': round(_percentile(timings, 99), 2),
+        }
+        results.append(result)
+        echo(f"{label:45} {result['status']}  {result['median_ms']:9.2f} ms  p99 {result['p99_ms']:9.2f} ms"
+             f"  {result['queries']:4} queries")
+    return results
+
+
+def save_results(data, directory):
+    os.makedirs(directory, exist_ok=True)
+    stamp = datetime.now(UTC).strftime('%Y%m%d-%H%M%S')
+    path = os.path.join(directory, f"{stamp}-{data.get('commit') or 'nocommit'}.json")
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2)
+    return path
+
+
+def compare_results(baseline, current):
+    """Yield one line per route shared by both runs: median latency and query deltas."""
+    before = {r['route']: r for r in baseline['results']}
+    yield f"{'route':45} {'median ms (before -> after)':>30} {'queries':>14}"
+    for result in current['results']:
+        old = before.get(result['route'])
+        if old is None:
+            continue
+        change = (result['median_ms'] - old['median_ms']) / old['median_ms'] * 100 if old['median_ms'] else 0.0
+        yield (f"{result['route']:45} {old['median_ms']:>10.2f} -> {result['median_ms']:<9.2f} ({change:+6.1f}%)"
+               f" {old['queries']:>5} -> {result['queries']:<5}")
@@ -0,0 +1,292 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+from typing import NamedTuple
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+
+hms_cli = AppGroup('hms', help='Hospital management commands.')
+
+
+# Index names per table, read from the catalog because reflection skips
+# expression indexes such as ix_ward_name_lower
+_INDEX_NAMES_SQL = {
+    'sqlite': "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = :table",
+    'mysql': 'SELECT DISTINCT index_name FROM information_schema.statistics '
+             'WHERE table_schema = DATABASE() AND table_name = :table',
+}
+_INDEX_NAMES_SQL['mariadb'] = _INDEX_NAMES_SQL['mysql']
+
+# Columns derived from other rows; filled in when an older database gains them
+_READINESS_COLUMNS = {'doctor.grade_category', 'team.doctor_count', 'team.consultant_count', 'team.grade1_count'}
+
+
+def add_missing_columns():
+    """Add the models' columns that an existing table lacks; returns their 'table.column' names.
+
+    create_all() never alters a table that already exists. A column is
+    added with its scalar default, which existing rows take; a NOT NULL
+    column without one cannot be added and raises RuntimeError.
+    """
+    from sqlalchemy import inspect, literal
+    from app import db
+    dialect = db.engine.dialect
+    quote = dialect.identifier_preparer.quote
+    added = []
+    with db.engine.begin() as conn:
+        inspector = inspect(conn)
+        for table in db.metadata.sorted_tables:
+            existing = {column['name'] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                ddl = f'ALTER TABLE {quote(table.name)} ADD COLUMN {quote(column.name)} {column.type.compile(dialect)}'
+                default = column.default.arg if column.default is not None and column.default.is_scalar else None
+                if default is not None:
+                    ddl += f" DEFAULT {literal(default).compile(dialect=dialect, compile_kwargs={'literal_binds': True})}"
+                if not column.nullable:
+                    if default is None:
+                        raise RuntimeError(f'Cannot add {table.name}.{column.name}: NOT NULL without a default')
+                    ddl += ' NOT NULL'
+                conn.exec_driver_sql(ddl)
+                added.append(f'{table.name}.{column.name}')
+    return added
+
+
+def create_missing_indexes():
+    """Create the models' indexes that an existing database lacks; returns their names.
+
+    create_all() only indexes the tables it creates, so databases made
+    before an index was declared need this step. Safe to run repeatedly.
+    An index on a column the table does not have yet is skipped with a
+    warning; add_missing_columns() adds the column first.
+    """
+    from sqlalchemy import inspect, text
+    from app import db
+    sql = _INDEX_NAMES_SQL.get(db.engine.dialect.name)
+    created = []
+    with db.engine.begin() as conn:
+        inspector = inspect(conn)
+        for table in db.metadata.sorted_tables:
+            if sql is not None:
+                existing = set(conn.execute(text(sql), {'table': table.name}).scalars())
+            else:
+                existing = {index['name'] for index in inspector.get_indexes(table.name)}
+            columns = {column['name'] for column in inspector.get_columns(table.name)}
+            for index in sorted(table.indexes, key=lambda index: index.name):
+                if index.name in existing:
+                    continue
+                missing = [column.name for column in index.columns if column.name not in columns]
+                if missing:
+                    current_app.logger.warning('Not creating index %s: %s has no column %s',
+                                               index.name, table.name, ', '.join(missing))
+                    continue
+                index.create(conn)
+                created.append(index.name)
+    return created
+
+
+class DatabaseInit(NamedTuple):
+    columns: list  # 'table.column' names of the columns added
+    indexes: list  # names of the indexes created
+    rollup_rebuilt: bool  # whether the treatment rollup was rebuilt from the log
+    users: list  # usernames of the default users created
+
+
+def _rollup_needs_rebuild():
+    # An empty rollup next to a non-empty log: the rollup table was just created
+    from sqlalchemy import exists, select
+    from app import db
+    from app.models import TreatmentDailyRollup, TreatmentLog
+    return db.session.execute(
+        select(~exists().select_from(TreatmentDailyRollup), exists().select_from(TreatmentLog))
+    ).one() == (True, True)
+
+
+def init_database():
+    """Create missing tables, columns, indexes and the default users; returns what was created.
+
+    Also brings an older database up to date: columns added to existing
+    tables are backfilled before their indexes are built, and a new, empty
+    treatment rollup is filled from the treatment log.
+    """
+    from app import db
+    from app.models import create_default_users, refresh_team_readiness
+    from app.treatment_rollup import rebuild_treatment_rollup
+    db.create_all()
+    columns = add_missing_columns()
+    if _READINESS_COLUMNS.intersection(columns):
+        refresh_team_readiness()
+    indexes = create_missing_indexes()
+    rollup_rebuilt = _rollup_needs_rebuild()
+    if rollup_rebuilt:
+        rebuild_treatment_rollup()
+    return DatabaseInit(columns, indexes, rollup_rebuilt, create_default_users())
+
+
+@hms_cli.command('init')
+def init():
+    """Create missing tables, columns and indexes and the default admin, nurse and doctor accounts."""
+    created = init_database()
+    if created.columns:
+        click.echo(f"Added columns: {', '.join(created.columns)}")
+    if created.indexes:
+        click.echo(f"Created indexes: {', '.join(created.indexes)}")
+    if created.rollup_rebuilt:
+        click.echo('Rebuilt the treatment rollup from the treatment log.')
+    click.echo(f"Created users: {', '.join(created.users)}" if created.users else 'Default users already exist.')
+
+
+# Run in a fresh interpreter so module imports are part of the measurement
+_STARTUP_PROBE = '''
+import time
+started = time.perf_counter()
+from app import create_app
+create_app()
+print((time.perf_counter() - started) * 1000)
+'''
+
+
+def measure_startup(app_root, runs=5):
+    """Milliseconds to import the app and run create_app(), in `runs` fresh interpreters.
+
+    Raises RuntimeError with the probe's stderr if create_app fails.
+    """
+    env = dict(os.environ)
+    package_parent = os.path.dirname(app_root)
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [package_parent, env.get('PYTHONPATH')]))
+    timings = []
+    for _ in range(runs):
+        probe = subprocess.run([sys.executable, '-c', _STARTUP_PROBE], env=env, capture_output=True, text=True)
+        if probe.returncode != 0:
+            raise RuntimeError(f'create_app failed:\n{probe.stderr}')
+        timings.append(float(probe.stdout.strip().splitlines()[-1]))
+    return timings
+
+
+@hms_cli.command('check-startup')
+@click.option('--runs', type=int, default=5, show_default=True)
+@click.option('--budget-ms', type=int, default=None, help='Defaults to STARTUP_TIME_BUDGET_MS.')
+def check_startup(runs, budget_ms):
+    """Time importing the app and create_app() in fresh processes; fail if the median is over budget."""
+    budget_ms = budget_ms or current_app.config['STARTUP_TIME_BUDGET_MS']
+    try:
+        timings = measure_startup(current_app.root_path, runs)
+    except RuntimeError as exc:
+        raise click.ClickException(str(exc))
+    median = statistics.median(timings)
+    click.echo(f"startup: median {median:.0f} ms, max {max(timings):.0f} ms over {runs} runs "
+               f"(budget {budget_ms} ms)")
+    if median > budget_ms:
+        raise click.ClickException(f'Startup takes {median:.0f} ms, over the {budget_ms} ms budget')
+
+
+@hms_cli.command('import-patients')
+@click.argument('source', type=click.File('rb'))
+@click.option('--format', 'fmt', type=click.Choice(['csv', 'ndjson']),
+              help='Input format; guessed from the file name when omitted.')
+@click.option('--chunk-size', type=int, default=None, help='Rows committed per transaction.')
+@click.option('--report', type=click.File('w'), default=None,
+              help='Write the per-row NDJSON report to this file.')
+def import_patients(source, fmt, chunk_size, report):
+    """Admit patients in bulk from a CSV or NDJSON file ('-' reads stdin)."""
+    from app.admissions import AdmissionImporter, detect_format, read_rows
+    fmt = fmt or detect_format(getattr(source, 'name', None))
+    importer = AdmissionImporter(
+        chunk_size=chunk_size or current_app.config.get('PATIENT_IMPORT_CHUNK_SIZE'),
+        username='cli',
+    )
+    for result in importer.run(read_rows(source, fmt)):
+        if report is not None:
+            report.write(json.dumps(result.to_dict()) + '\n')
+        if result.status == 'rejected':
+            click.echo(f'row {result.row}: {result.error}', err=True)
+    summary = importer.summary()
+    click.echo(f"{summary['accepted']} admitted, {summary['rejected']} rejected")
+
+
+@hms_cli.command('refresh-team-readiness')
+def refresh_team_readiness():
+    """Reclassify every doctor's grade and recount team readiness (e.g. after adding the columns)."""
+    from app.models import refresh_team_readiness as refresh
+    grades = refresh()
+    click.echo(f'Classified {grades} distinct grades and recounted all teams.')
+
+
+@hms_cli.command('rebuild-treatment-rollup')
+def rebuild_treatment_rollup():
+    """Recompute the daily treatment rollup from the full treatment log."""
+    from app.treatment_rollup import rebuild_treatment_rollup as rebuild, total_treatments
+    rebuild()
+    click.echo(f'Rollup rebuilt: {total_treatments()} treatments.')
+
+
+@hms_cli.command('check-query-plans')
+@click.option('--verbose', is_flag=True, help='Print every plan, not only the failing ones.')
+def check_query_plans(verbose):
+    """EXPLAIN the hot queries and exit non-zero if any reads a whole table."""
+    from app.query_plans import explain_hot_queries
+    failed = 0
+    for plan in explain_hot_queries():
+        if plan.full_scans:
+            failed += 1
+        if plan.full_scans or verbose:
+            click.echo(f"{'FULL SCAN' if plan.full_scans else 'ok'}: {plan.name}")
+            for line in plan.lines:
+                click.echo(f'    {line}')
+    if failed:
+        raise click.ClickException(f'{failed} hot queries use a full table scan')
+    click.echo('All hot queries use an index.')
+
+
+@hms_cli.command('build-assets')
+@click.option('--clean', is_flag=True, help='Delete files from earlier builds that are no longer in the manifest.')
+def build_assets(clean):
+    """Write content-hashed, precompressed copies of the static files and their manifest."""
+    from app import assets
+    manifest = assets.build_assets(current_app.static_folder, clean=clean)
+    for source, hashed in manifest.items():
+        click.echo(f'{source} -> {hashed}')
+    if assets.brotli is None:
+        click.echo('brotli is not installed; wrote gzip variants only.')
+    click.echo(f'Wrote {len(manifest)} assets to {assets.DIST_DIR}/; restart the app to serve them.')
+
+
+@hms_cli.command('seed')
+@click.option('--wards', type=int, default=20, show_default=True)
+@click.option('--patients', type=int, default=1000, show_default=True)
+@click.option('--treatments', type=int, default=10000, show_default=True)
+@click.option('--teams', type=int, default=None, help='Defaults to half the number of wards.')
+@click.option('--seed', 'random_seed', type=int, default=None, help='Random seed for a repeatable data set.')
+@click.option('--force', is_flag=True, help='Allow seeding a database other than SQLite.')
+def seed(wards, patients, treatments, teams, random_seed, force):
+    """Generate synthetic wards, teams, staff, patients and treatment logs."""
+    from app import db
+    from app.seed import seed_hospital
+    if db.engine.dialect.name != 'sqlite' and not force:
+        raise click.ClickException('Refusing to seed a non-SQLite database without --force.')
+    db.create_all()
+    seed_hospital(wards, patients, treatments, teams=teams, seed=random_seed, echo=click.echo)
+
+
+@hms_cli.command('bench')
+@click.option('--repeat', type=int, default=5, show_default=True, help='Measured requests per route.')
+@click.option('--warmup', type=int, default=1, show_default=True)
+@click.option('--output-dir', default='.benchmarks', show_default=True, help='Where result files are saved.')
+@click.option('--compare', 'baseline', type=click.File('r'), default=None,
+              help='Earlier result file to compare this run against.')
+@click.option('--login-flood', type=int, default=0, show_default=True,
+              help='Threads posting bad logins while the routes are timed.')
+def bench(repeat, warmup, output_dir, baseline, login_flood):
+    """Time every main route through the test client and save per-route latency and query counts."""
+    from app.benchmark import run_benchmark, save_results, compare_results
+    data = run_benchmark(current_app._get_current_object(), repeat=repeat, warmup=warmup, echo=click.echo,
+                         login_flood=login_flood)
+    click.echo(f'Saved {save_results(data, output_dir)}')
+    if baseline is not None:
+        for line in compare_results(json.load(baseline), data):
+            click.echo(line)
@@ -0,0 +1,230 @@
+import itertools
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime, UTC, timedelta
+from typing import NamedTuple
+
+from sqlalchemy import case, func, select
+
+from app import db
+from app.db_routing import primary_reads
+from app.models import Patient, Ward, Team, Doctor, Nurse, Technician, ActivityLog
+from app.treatment_rollup import treatment_total_select, treatments_per_day
+
+# Simple estimate used on the admin dashboard
+INCOME_PER_TREATMENT = 120
+CHART_DAYS = 7
+
+
+class WardOccupancy(NamedTuple):
+    id: int
+    name: str
+    capacity: int
+    current_occupancy: int
+
+
+class RecentPatient(NamedTuple):
+    id: int
+    name: str
+    admission_date: datetime
+
+
+class RecentActivity(NamedTuple):
+    action: str
+    username: str
+    details: str
+    timestamp: datetime
+
+
+@dataclass
+class DashboardStats:
+    """Aggregated numbers for the admin dashboard.
+
+    Holds plain values only (no ORM instances) so it can be rendered or
+    cached outside the session that produced it.
+    """
+    total_patients: int = 0
+    active_admissions: int = 0
+    discharged_today: int = 0
+    total_beds: int = 0
+    occupied_beds: int = 0
+    active_teams: int = 0
+    total_doctors: int = 0
+    total_nurses: int = 0
+    total_technicians: int = 0
+    total_treatments: int = 0
+    wards: list = field(default_factory=list)
+    treatments_chart: dict = field(default_factory=dict)
+    staff_chart: dict = field(default_factory=dict)
+    recent_patients: list = field(default_factory=list)
+    recent_activities: list = field(default_factory=list)
+    computed_at: datetime | None = None
+
+    def age_seconds(self, now=None):
+        """Seconds since these numbers were computed."""
+        if self.computed_at is None:
+            return 0.0
+        return max(0.0, ((now or datetime.now(UTC)) - self.computed_at).total_seconds())
+
+    @property
+    def available_beds(self):
+        return self.total_beds - self.occupied_beds
+
+    @property
+    def income_estimate(self):
+        return self.total_treatments * INCOME_PER_TREATMENT
+
+    @property
+    def full_wards(self):
+        return [w for w in self.wards if w.current_occupancy >= w.capacity]
+
+    @property
+    def ward_chart(self):
+        return {'labels': [w.name for w in self.wards], 'data': [w.current_occupancy for w in self.wards]}
+
+    def summary(self):
+        """The `stats` mapping expected by dashboard.html."""
+        return {
+            'total_patients': self.total_patients,
+            'total_beds': self.total_beds,
+            'available_beds': self.available_beds,
+            'active_teams': self.active_teams,
+            'discharged_patients': self.discharged_today,
+            'total_doctors': self.total_doctors,
+            'total_nurses': self.total_nurses,
+        }
+
+
+def _count(model):
+    return select(func.count()).select_from(model).scalar_subquery()
+
+
+def collect_dashboard_stats(now=None):
+    """Compute DashboardStats with a fixed handful of aggregate queries.
+
+    The number of queries does not depend on how many patients, treatments
+    or wards exist: per-row work is pushed into GROUP BY on the database.
+    Prefer dashboard_snapshot.get() in request handlers.
+    """
+    now = now or datetime.now(UTC)
+    today = datetime(now.year, now.month, now.day)
+    tomorrow = today + timedelta(days=1)
+    start_date = today - timedelta(days=CHART_DAYS - 1)
+    stats = DashboardStats(computed_at=now)
+
+    # 1. Ward occupancy (one row per ward, never per patient)
+    ward_rows = db.session.execute(
+        select(Ward.id, Ward.name, Ward.capacity, Ward.current_occupancy).order_by(Ward.id)
+    ).all()
+    stats.wards = [WardOccupancy(*row) for row in ward_rows]
+    stats.total_beds = sum(w.capacity for w in stats.wards)
+    stats.occupied_beds = sum(w.current_occupancy for w in stats.wards)
+
+    # 2. Patient totals, current admissions and today's discharges in a single pass
+    total_patients, active_admissions, discharged_today = db.session.execute(
+        select(
+            func.count(Patient.id),
+            func.coalesce(func.sum(case((Patient.discharge_date.is_(None), 1), else_=0)), 0),
+            func.coalesce(func.sum(case(
+                ((Patient.discharge_date >= today) & (Patient.discharge_date < tomorrow), 1),
+                else_=0,
+            )), 0),
+        )
+    ).one()
+    stats.total_patients = total_patients
+    stats.active_admissions = int(active_admissions)
+    stats.discharged_today = int(discharged_today)
+
+    # 3. Staff totals and the treatment total (from the daily rollup) as
+    # scalar subqueries of one statement
+    (stats.active_teams, stats.total_doctors, stats.total_nurses,
+     stats.total_technicians, stats.total_treatments) = db.session.execute(
+        select(_count(Team), _count(Doctor), _count(Nurse), _count(Technician),
+               treatment_total_select().scalar_subquery())
+    ).one()
+    stats.total_treatments = int(stats.total_treatments)
+
+    # 4. Treatments per day for the chart window, one rollup row per day
+    counts = treatments_per_day(start_date.date(), tomorrow.date())
+    stats.treatments_chart = {'labels': list(counts.keys()), 'data': list(counts.values())}
+
+    # 5. Distinct doctors responsible for each ward's patients; technicians
+    # are not assigned to wards, so every ward counts all of them
+    doctors_per_ward = dict(db.session.execute(
+        select(Patient.ward_id, func.count(func.distinct(Doctor.id)))
+        .join(Doctor, Doctor.team_id == Patient.team_id)
+        .group_by(Patient.ward_id)
+    ).all())
+    stats.staff_chart = {
+        'labels': [w.name for w in stats.wards],
+        'data': [doctors_per_ward.get(w.id, 0) + stats.total_technicians for w in stats.wards],
+    }
+
+    # 6. Short recent-activity feeds
+    stats.recent_patients = [RecentPatient(*row) for row in db.session.execute(
+        select(Patient.id, Patient.name, Patient.admission_date).order_by(Patient.admission_date.desc()).limit(5)
+    )]
+    stats.recent_activities = [RecentActivity(*row) for row in db.session.execute(
+        select(ActivityLog.action, ActivityLog.username, ActivityLog.details, ActivityLog.timestamp)
+        .order_by(ActivityLog.timestamp.desc()).limit(10)
+    )]
+    return stats
+
+
+class DashboardSnapshot:
+    """Process-local materialized DashboardStats.
+
+    The snapshot is recomputed only after invalidate() is called by a write
+    route, or once it is older than the optional TTL. The TTL is the backstop
+    for writes made by other worker processes, which cannot reach this
+    process's invalidate(). Concurrent readers of a stale snapshot wait for a
+    single recomputation instead of each querying the database. It is always
+    computed on the primary, as it is then served for the whole TTL.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counter = itertools.count(1)
+        self._generation = 0
+        # (generation, stats) replaced atomically so readers never see a mix
+        self._current = (-1, None)
+
+    def invalidate(self):
+        self._generation = next(self._counter)
+
+    def _fresh(self, current, ttl):
+        generation, stats = current
+        if stats is None or generation != self._generation:
+            return False
+        return not ttl or stats.age_seconds() < ttl
+
+    def get(self, ttl=None):
+        current = self._current
+        if self._fresh(current, ttl):
+            return current[1]
+        with self._lock:
+            current = self._current
+            if self._fresh(current, ttl):
+                return current[1]
+            generation = self._generation
+            with primary_reads():
+                stats = collect_dashboard_stats()
+            self._current = (generation, stats)
+        return stats
+
+    def clear(self):
+        """Drop the computed stats, so peek() has nothing until the next get()."""
+        with self._lock:
+            self._current = (-1, None)
+
+    def peek(self):
+        """The last computed stats however stale, or None if none were computed yet; never queries."""
+        return self._current[1]
+
+
+dashboard_snapshot = DashboardSnapshot()
+
+
+def invalidate_dashboard_snapshot():
+    """Mark the dashboard snapshot stale; call after committing a write that changes it."""
+    dashboard_snapshot.invalidate()
@@ -0,0 +1,82 @@
+import threading
+import time
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+
+class DataVersions:
+    """Process-local change counters per table, bumped when a write commits.
+
+    Caches key their entries on the versions of the tables they were built
+    from, so a committed change to any of those tables makes the old
+    entries unreachable. Writes committed by another worker process are not
+    seen here; caches keyed on these versions also expire by age.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._versions = {}
+        self._changed = {}
+
+    def get(self, *tables):
+        """Current versions of `tables`, in the order given."""
+        with self._lock:
+            return tuple(self._versions.get(table, 0) for table in tables)
+
+    def token(self, *tables):
+        """The versions of `tables` as one short string, for cache keys."""
+        return '.'.join(str(version) for version in self.get(*tables))
+
+    def last_changed(self, *tables):
+        """Wall-clock time of the latest bump to any of `tables`, or 0.0 if none was bumped."""
+        with self._lock:
+            return max((self._changed.get(table, 0.0) for table in tables), default=0.0)
+
+    def last_write(self):
+        """Wall-clock time of the latest bump to any table, or 0.0 if there was none."""
+        with self._lock:
+            return max(self._changed.values(), default=0.0)
+
+    def bump(self, tables):
+        now = time.time()
+        with self._lock:
+            for table in tables:
+                self._versions[table] = self._versions.get(table, 0) + 1
+                self._changed[table] = now
+
+
+data_versions = DataVersions()
+
+
+def _written(session, tables):
+    session.info.setdefault('written_tables', set()).update(tables)
+
+
+@event.listens_for(Session, 'after_flush')
+def _record_flushed_tables(session, flush_context):
+    tables = {obj.__table__.name for obj in session.new}
+    tables.update(obj.__table__.name for obj in session.deleted)
+    tables.update(obj.__table__.name for obj in session.dirty
+                  if session.is_modified(obj, include_collections=False))
+    if tables:
+        _written(session, tables)
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _record_executed_tables(orm_execute_state):
+    # Bulk INSERT/UPDATE/DELETE statements run through session.execute()
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        table = getattr(orm_execute_state.statement, 'table', None)
+        if table is not None:
+            _written(orm_execute_state.session, {table.name})
+
+
+# Tables written before a rollback are still bumped at the next commit: a
+# rolled-back savepoint does not undo the rest of its transaction, and an
+# extra bump only costs a cache miss
+@event.listens_for(Session, 'after_commit')
+def _bump_committed_tables(session):
+    tables = session.info.pop('written_tables', None)
+    if tables:
+        data_versions.bump(tables)
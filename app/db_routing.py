@@ -0,0 +1,99 @@
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+from flask import current_app, g, has_app_context
+from flask_sqlalchemy.session import Session
+from sqlalchemy import Select
+from sqlalchemy.exc import DBAPIError
+
+from app.data_versions import data_versions
+
+logger = logging.getLogger(__name__)
+
+# Bind key of the optional read replica in SQLALCHEMY_BINDS
+REPLICA_BIND = 'replica'
+
+_state_lock = threading.Lock()
+_replica_down_until = 0.0
+
+
+class RoutingSession(Session):
+    """Session that sends SELECTs to the read replica inside @read_replica views.
+
+    Only plain SELECTs issued outside a flush are rerouted; INSERT, UPDATE
+    and DELETE statements, and everything outside those views, still go to
+    the primary.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if (bind is None and not self._flushing and isinstance(clause, Select)
+                and has_app_context() and g.get('db_use_replica')):
+            engine = self._db.engines.get(REPLICA_BIND)
+            if engine is not None:
+                return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def _mark_replica_down(exc):
+    global _replica_down_until
+    with _state_lock:
+        _replica_down_until = time.monotonic() + current_app.config.get('DB_REPLICA_RETRY_SECONDS', 30)
+    logger.warning('Read replica failed, using the primary: %s', getattr(exc, 'orig', exc))
+
+
+def _written_recently():
+    # The replica may not have replayed this process's latest commit yet
+    grace = current_app.config.get('DB_REPLICA_WRITE_GRACE_SECONDS', 10)
+    return time.time() - data_versions.last_write() < grace
+
+
+@contextmanager
+def primary_reads():
+    """Send the block's SELECTs to the primary, even inside a @read_replica view.
+
+    For results that are cached beyond the request, which must not be
+    computed from a replica that lags behind the data versions they are
+    stored under.
+    """
+    use_replica = g.get('db_use_replica', False)
+    g.db_use_replica = False
+    try:
+        yield
+    finally:
+        g.db_use_replica = use_replica
+
+
+def read_replica(f):
+    """Serve a read-only view's SELECTs from the replica bind, if one is configured.
+
+    Usage:
+        @read_replica
+        def view():
+            ...
+
+    If a database error is raised while the view reads from the replica,
+    the view is run again against the primary (safe, as it only reads) and
+    the replica is skipped for DB_REPLICA_RETRY_SECONDS. The replica is also
+    skipped for DB_REPLICA_WRITE_GRACE_SECONDS after this process commits a
+    write, so that the view does not render (and cache, or send an ETag for)
+    data older than the write.
+    """
+    @wraps(f)
+    def wrapped(*args, **kwargs):
+        from app import db
+        if REPLICA_BIND not in db.engines or time.monotonic() < _replica_down_until or _written_recently():
+            return f(*args, **kwargs)
+        g.db_use_replica = True
+        try:
+            return f(*args, **kwargs)
+        except DBAPIError as exc:
+            g.db_use_replica = False
+            _mark_replica_down(exc)
+            db.session.rollback()
+            return f(*args, **kwargs)
+        finally:
+            g.db_use_replica = False
+    return wrapped
@@ -0,0 +1,101 @@
+import threading
+import time
+from collections import OrderedDict
+
+from jinja2 import nodes
+from jinja2.ext import Extension
+from markupsafe import Markup
+
+
+class FragmentCache:
+    """Bounded, TTL'd process-local cache of rendered template fragments.
+
+    Keys are tuples whose first item names the fragment; the rest is what
+    the fragment depends on (role, data versions from app.data_versions,
+    filters). Hits and misses are counted per fragment name.
+    """
+
+    def __init__(self, max_size=512, ttl=600):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.hits = {}
+        self.misses = {}
+
+    def configure(self, max_size=None, ttl=None):
+        with self._lock:
+            if max_size is not None:
+                self.max_size = max_size
+            if ttl is not None:
+                self.ttl = ttl
+            self._entries.clear()
+
+    def get_or_render(self, key, render):
+        """The cached markup for `key`, or render() stored under it."""
+        name = key[0]
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and (not self.ttl or now - entry[0] < self.ttl):
+                self._entries.move_to_end(key)
+                self.hits[name] = self.hits.get(name, 0) + 1
+                return entry[1]
+            self.misses[name] = self.misses.get(name, 0) + 1
+        # Rendered outside the lock; two requests may both render a new fragment
+        html = Markup(render())
+        if self.max_size > 0:
+            with self._lock:
+                self._entries[key] = (now, html)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_size:
+                    self._entries.popitem(last=False)
+        return html
+
+    def stats(self):
+        """{fragment name: (hits, misses)}"""
+        with self._lock:
+            return {name: (self.hits.get(name, 0), self.misses.get(name, 0))
+                    for name in sorted(set(self.hits) | set(self.misses))}
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+fragment_cache = FragmentCache()
+
+
+class FragmentCacheExtension(Extension):
+    """Adds a {% cache %} tag to templates.
+
+    Usage:
+        {% cache 'ward_cards', current_user.role, data_version('ward') %}
+            ...
+        {% endcache %}
+
+    The first argument names the fragment, the others are part of its
+    key; the body is rendered once per distinct key and reused until it
+    ages out.
+    """
+
+    tags = {'cache'}
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        key = [parser.parse_expression()]
+        while parser.stream.skip_if('comma'):
+            key.append(parser.parse_expression())
+        body = parser.parse_statements(('name:endcache',), drop_needle=True)
+        return nodes.CallBlock(self.call_method('_render', [nodes.Tuple(key, 'load')]), [], [], body) \
+            .set_lineno(lineno)
+
+    def _render(self, key, caller):
+        return fragment_cache.get_or_render(key, caller)
+
+
+def init_fragment_cache(app):
+    from app.data_versions import data_versions
+    fragment_cache.configure(max_size=app.config['FRAGMENT_CACHE_SIZE'], ttl=app.config['FRAGMENT_CACHE_TTL'])
+    app.jinja_env.add_extension(FragmentCacheExtension)
+    app.jinja_env.globals['data_version'] = data_versions.token
@@ -0,0 +1,80 @@
+import hashlib
+import time
+from datetime import datetime, UTC
+from functools import wraps
+
+from flask import current_app, make_response, request, session
+from flask_login import current_user
+
+from app.data_versions import data_versions
+
+# Changes from before this process started are unknown to data_versions
+_STARTED = time.time()
+
+
+def _validators(tables, window):
+    """(ETag, Last-Modified) for the current request over `tables`."""
+    now = time.time()
+    window_start = now - now % window
+    key = '|'.join((request.full_path, str(current_user.get_id()), str(current_user.role),
+                    data_versions.token(*tables), str(int(window_start))))
+    etag = hashlib.sha1(key.encode()).hexdigest()[:20]
+    changed = max(data_versions.last_changed(*tables), window_start, _STARTED)
+    # Last-Modified has one-second resolution: leave it out while a second
+    # change in the same second could still go unnoticed
+    if now - changed < 1:
+        return etag, None
+    return etag, datetime.fromtimestamp(int(changed), UTC)
+
+
+def _client_is_current(etag, last_modified):
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(etag)
+    return (last_modified is not None and request.if_modified_since is not None
+            and request.if_modified_since >= last_modified)
+
+
+def _set_validators(response, etag, last_modified):
+    response.set_etag(etag, weak=True)
+    if last_modified is not None:
+        response.last_modified = last_modified
+    # Pages are per user; browsers may keep them but must revalidate each time
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    response.vary.add('Cookie')
+    return response
+
+
+def conditional_get(*models):
+    """Answer 304 Not Modified, without running the view, while `models` are unchanged.
+
+    Usage:
+        @conditional_get(Ward, Team)
+        def view():
+            ...
+
+    The ETag covers the URL, the user and their role, and the version of
+    each model's table (see app.data_versions), which is bumped when a
+    write to it commits. Versions are per process, so validators also
+    roll over every CONDITIONAL_GET_WINDOW seconds: that bounds how long
+    a write made by another worker process, or anything the view shows
+    that is not in those tables, can be answered with a 304.
+    """
+    tables = tuple(model.__table__.name for model in models)
+
+    def decorator(f):
+        @wraps(f)
+        def wrapped(*args, **kwargs):
+            window = current_app.config.get('CONDITIONAL_GET_WINDOW')
+            # Pending flash messages belong in the next full page
+            if not window or request.method not in ('GET', 'HEAD') or session.get('_flashes'):
+                return f(*args, **kwargs)
+            etag, last_modified = _validators(tables, window)
+            if _client_is_current(etag, last_modified):
+                return _set_validators(current_app.response_class(status=304), etag, last_modified)
+            response = make_response(f(*args, **kwargs))
+            if response.status_code == 200:
+                _set_validators(response, etag, last_modified)
+            return response
+        return wrapped
+    return decorator
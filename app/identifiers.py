@@ -0,0 +1,94 @@
+import os
+import threading
+
+from flask import current_app
+from sqlalchemy import func, select, update
+from sqlalchemy.exc import IntegrityError
+
+from app import db
+from app.models import IdentifierSequence, Patient
+
+DEFAULT_BLOCK_SIZE = 50
+
+
+class IdentifierAllocator:
+    """Hands out formatted sequential identifiers from blocks reserved in the DB.
+
+    Each process reserves `block_size` values at a time by atomically bumping
+    the sequence row in its own short transaction, then serves identifiers
+    from memory until the block runs out. Concurrent workers therefore never
+    see the same value, and most calls issue no query at all. Values left in
+    a block when a process exits are skipped, so identifiers can have gaps.
+    A forked child drops the blocks it inherited, which the parent is still
+    serving, and reserves its own.
+    """
+
+    def __init__(self, name, prefix, width):
+        self.name = name
+        self.prefix = prefix
+        self.width = width
+        self._lock = threading.Lock()
+        # engine URL -> [next value, end of block (exclusive)]
+        self._blocks = {}
+        os.register_at_fork(after_in_child=self._forget_blocks)
+
+    def _forget_blocks(self):
+        self._lock = threading.Lock()
+        self._blocks = {}
+
+    def format(self, value):
+        return f'{self.prefix}{value:0{self.width}d}'
+
+    def next(self):
+        return self.allocate(1)[0]
+
+    def allocate(self, count):
+        """Return `count` new identifiers, reserving one block large enough for all of them."""
+        engine = db.engine
+        key = str(engine.url)
+        with self._lock:
+            block = self._blocks.get(key)
+            if block is None or block[1] - block[0] < count:
+                size = max(count, current_app.config.get('PATIENT_ID_BLOCK_SIZE', DEFAULT_BLOCK_SIZE))
+                start = self._reserve(engine, size)
+                # Any remainder of the previous block is abandoned
+                block = self._blocks[key] = [start, start + size]
+            start = block[0]
+            block[0] += count
+        return [self.format(value) for value in range(start, start + count)]
+
+    def _reserve(self, engine, size):
+        """Atomically claim [start, start + size) from the sequence row and return start."""
+        table = IdentifierSequence.__table__
+        while True:
+            with engine.begin() as conn:
+                bumped = conn.execute(
+                    update(table).where(table.c.name == self.name)
+                    .values(next_value=table.c.next_value + size)
+                )
+                if bumped.rowcount:
+                    # The row stays locked until this transaction ends
+                    end = conn.execute(select(table.c.next_value).where(table.c.name == self.name)).scalar_one()
+                    return end - size
+            try:
+                with engine.begin() as conn:
+                    start = self._initial_value(conn)
+                    conn.execute(table.insert().values(name=self.name, next_value=start + size))
+                    return start
+            except IntegrityError:
+                # Another process created the row first; go back to bumping it
+                continue
+
+    def _initial_value(self, conn):
+        """First value for a new sequence: past every existing identifier and row id."""
+        max_id = conn.execute(select(func.max(Patient.id))).scalar() or 0
+        column = Patient.patient_identifier
+        pattern = column.like(f'{self.prefix}%')
+        longest = select(func.max(func.length(column))).where(pattern).scalar_subquery()
+        top = conn.execute(select(func.max(column)).where(pattern, func.length(column) == longest)).scalar()
+        digits = (top or '')[len(self.prefix):]
+        max_identifier = int(digits) if digits.isdigit() else 0
+        return max(max_id, max_identifier) + 1
+
+
+patient_identifiers = IdentifierAllocator('patient', prefix='P', width=4)
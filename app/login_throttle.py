@@ -0,0 +1,99 @@
+import math
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+
+class TokenBucketLimiter:
+    """In-process token buckets keyed by an arbitrary hashable key.
+
+    Each key holds up to `burst` tokens and regains `per_minute` tokens a
+    minute; an attempt costs one token. Only the `max_keys` most recently
+    used keys are tracked, so a flood of distinct usernames or addresses
+    cannot grow memory without bound (an evicted key starts full again).
+    """
+
+    def __init__(self, burst, per_minute, max_keys=10000):
+        self.burst = burst
+        self.rate = per_minute / 60.0
+        self.max_keys = max_keys
+        self._lock = threading.Lock()
+        self._buckets = OrderedDict()
+
+    def _refill(self, key, now):
+        tokens, updated = self._buckets.get(key, (self.burst, now))
+        return min(self.burst, tokens + (now - updated) * self.rate)
+
+    def try_consume(self, key):
+        """Take a token for `key`; return 0, or the seconds until one is available."""
+        with self._lock:
+            now = time.monotonic()
+            tokens = self._refill(key, now)
+            if tokens < 1:
+                return math.ceil((1 - tokens) / self.rate) if self.rate else 60
+            self._buckets[key] = (tokens - 1, now)
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+            return 0
+
+    def reset(self, key):
+        with self._lock:
+            self._buckets.pop(key, None)
+
+
+class LoginThrottle:
+    """Guards POST /login so password hashing cannot take over the workers.
+
+    check() refuses an attempt while the client address's bucket, or the
+    bucket for that username from that address, is empty, before any query
+    or hash. Keying the username's bucket on the address too means failed
+    attempts from one client cannot lock the account out for everyone
+    else; guessing from many addresses is held back by their own buckets.
+    hash_slot() bounds how many pbkdf2 verifications run at once; when they
+    are all busy a caller is turned away immediately instead of queueing
+    behind them.
+    """
+
+    def __init__(self):
+        self.configure()
+
+    def configure(self, user_burst=5, user_per_minute=5, ip_burst=50, ip_per_minute=60, max_concurrent=2):
+        self.users = TokenBucketLimiter(user_burst, user_per_minute)
+        # Wards often share one NAT address, so the per-address bucket is the looser one
+        self.addresses = TokenBucketLimiter(ip_burst, ip_per_minute)
+        self._slots = threading.BoundedSemaphore(max(1, max_concurrent))
+        self.rejected_rate = 0
+        self.rejected_busy = 0
+
+    @staticmethod
+    def _user_key(username, address):
+        return username.strip().lower(), address or 'unknown'
+
+    def check(self, username, address):
+        """Spend a token from the address's, then the username's bucket; 0, or seconds to wait."""
+        wait = (self.addresses.try_consume(address or 'unknown')
+                or self.users.try_consume(self._user_key(username, address)))
+        if wait:
+            self.rejected_rate += 1
+        return wait
+
+    def succeeded(self, username, address):
+        """A correct password refills the username's bucket for that address."""
+        self.users.reset(self._user_key(username, address))
+
+    @contextmanager
+    def hash_slot(self):
+        """Yield True while holding a verification slot, or False at once if none is free."""
+        acquired = self._slots.acquire(blocking=False)
+        if not acquired:
+            self.rejected_busy += 1
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                self._slots.release()
+
+
+login_throttle = LoginThrottle()
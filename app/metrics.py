@@ -0,0 +1,172 @@
+import bisect
+import threading
+import time
+
+from flask import g, request
+
+# Request latency bucket upper bounds, in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _number(value):
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name, help_text, labelnames=()):
+        self.name, self.help, self.labelnames = name, help_text, tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def expose(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} counter']
+        with self._lock:
+            items = sorted(self._values.items())
+        lines += [f'{self.name}{_labels(self.labelnames, labels)} {_number(value)}' for labels, value in items]
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help_text, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name, self.help, self.labelnames = name, help_text, tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        # labels -> [per-bucket counts (last one is +Inf), sum]
+        self._values = {}
+
+    def observe(self, value, *labels):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._values.get(labels)
+            if series is None:
+                series = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def expose(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            items = sorted((labels, (list(counts), total)) for labels, (counts, total) in self._values.items())
+        for labels, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                le = (('le', _number(float(bound))),)
+                lines.append(f'{self.name}_bucket{_labels(self.labelnames, labels, le)} {cumulative}')
+            lines.append(f'{self.name}_sum{_labels(self.labelnames, labels)} {_number(total)}')
+            lines.append(f'{self.name}_count{_labels(self.labelnames, labels)} {cumulative}')
+        return lines
+
+
+def _gauge(name, help_text, samples, labelnames=()):
+    """Exposition lines for a gauge computed at scrape time from (labels, value) pairs."""
+    lines = [f'# HELP {name} {help_text}', f'# TYPE {name} gauge']
+    lines += [f'{name}{_labels(labelnames, labels)} {_number(value)}' for labels, value in samples]
+    return lines
+
+
+# Process-local; with several worker processes each one is scraped (or
+# aggregated) separately
+requests_total = Counter('hms_http_requests_total', 'HTTP requests handled.', ('endpoint', 'method', 'status'))
+request_errors_total = Counter('hms_http_request_errors_total', 'HTTP requests answered with a 5xx status.',
+                               ('endpoint',))
+request_duration = Histogram('hms_http_request_duration_seconds', 'Time spent handling a request.', ('endpoint',))
+
+
+def _endpoint():
+    # Unmatched URLs share one label so arbitrary paths cannot add series
+    return request.endpoint or 'unmatched'
+
+
+def _start_timer():
+    g.metrics_started = time.perf_counter()
+
+
+def _record_request(response):
+    started = g.pop('metrics_started', None)
+    if started is None:
+        return response
+    endpoint = _endpoint()
+    request_duration.observe(time.perf_counter() - started, endpoint)
+    requests_total.inc(endpoint, request.method, str(response.status_code))
+    if response.status_code >= 500:
+        request_errors_total.inc(endpoint)
+    return response
+
+
+def _pool_samples(engines):
+    samples = {'size': [], 'checked_out': [], 'overflow': []}
+    for bind, engine in engines.items():
+        pool = engine.pool
+        label = (bind or 'default',)
+        for key, method in (('size', 'size'), ('checked_out', 'checkedout'), ('overflow', 'overflow')):
+            if hasattr(pool, method):
+                # QueuePool.overflow() is negative until pool_size connections are open
+                samples[key].append((label, max(0, getattr(pool, method)())))
+    return samples
+
+
+def _fragment_counters(fragments):
+    """Exposition lines for the fragment cache's {name: (hits, misses)} counts."""
+    lines = []
+    series = (('hms_fragment_cache_hits_total', 'Template fragments served from the cache.'),
+              ('hms_fragment_cache_misses_total', 'Template fragments rendered and cached.'))
+    for index, (name, help_text) in enumerate(series):
+        lines += [f'# HELP {name} {help_text}', f'# TYPE {name} counter']
+        lines += [f'{name}{_labels(("fragment",), (fragment,))} {counts[index]}'
+                  for fragment, counts in fragments.items()]
+    return lines
+
+
+def render_metrics(engines, audit_depth, stats, fragments=None):
+    """All metrics in the Prometheus text exposition format.
+
+    `stats` is the cached DashboardStats, or None until the dashboard has
+    computed it; business gauges come from it rather than from queries made
+    for the scrape, and are left out while it is None. `fragments` maps
+    fragment cache names to (hits, misses).
+    """
+    lines = requests_total.expose() + request_errors_total.expose() + request_duration.expose()
+    lines += _fragment_counters(fragments or {})
+    pool = _pool_samples(engines)
+    lines += _gauge('hms_db_pool_size', 'Connections the pool keeps open.', pool['size'], ('bind',))
+    lines += _gauge('hms_db_pool_checked_out', 'Connections currently in use.', pool['checked_out'], ('bind',))
+    lines += _gauge('hms_db_pool_overflow', 'Connections open beyond the pool size.', pool['overflow'], ('bind',))
+    lines += _gauge('hms_audit_queue_depth', 'Audit records queued but not yet written.', [((), audit_depth)])
+    if stats is not None:
+        lines += _gauge('hms_active_admissions', 'Patients admitted and not discharged.',
+                        [((), stats.active_admissions)])
+        lines += _gauge('hms_ward_occupied_beds', 'Occupied beds per ward.',
+                        [((w.name,), w.current_occupancy) for w in stats.wards], ('ward',))
+        lines += _gauge('hms_ward_capacity_beds', 'Beds per ward.',
+                        [((w.name,), w.capacity) for w in stats.wards], ('ward',))
+        lines += _gauge('hms_dashboard_snapshot_age_seconds', 'Age of the cached numbers behind the hms_ gauges.',
+                        [((), round(stats.age_seconds(), 3))])
+    return '\n'.join(lines) + '\n'
+
+
+def init_metrics(app):
+    """Time every request and count it by endpoint, method and status."""
+    if not app.config.get('METRICS_ENABLED'):
+        return
+    app.before_request(_start_timer)
+    app.after_request(_record_request)
@@ -8,6 +8,7 @@ class Nurse(db.Model):
     grade = db.Column(db.String(50))
     team_id = db.Column(db.Integer, db.ForeignKey('team.id'))
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), unique=True)
+    user = db.relationship('User')
 
     def __repr__(self):
         return f'<Nurse {self.name}>'
@@ -22,14 +23,26 @@ class Technician(db.Model):
 
     def __repr__(self):
         return f'<Technician {self.name} ({self.specialization})>'
-from sqlalchemy.orm import validates
+import itertools
+import re
+from sqlalchemy import and_, event, func, inspect, select, update
+from sqlalchemy.ext.hybrid import hybrid_property
+from sqlalchemy.orm import Session, column_property, make_transient_to_detached, validates
+from sqlalchemy.orm.util import identity_key
 from flask_login import UserMixin
-from werkzeug.security import generate_password_hash, check_password_hash
+from werkzeug.security import generate_password_hash, check_password_hash, DEFAULT_PBKDF2_ITERATIONS
 from datetime import datetime, UTC
 # ---------------------------
 # TreatmentLog model (FR5)
 # ---------------------------
 class TreatmentLog(db.Model):
+    __table_args__ = (
+        # Patient details (a patient's log), doctor dashboard (a doctor's day)
+        # and the time-ordered reports/scheduling/export scans
+        db.Index('ix_treatment_log_patient_time', 'patient_id', 'treatment_time'),
+        db.Index('ix_treatment_log_doctor_time', 'doctor_id', 'treatment_time'),
+        db.Index('ix_treatment_log_treatment_time', 'treatment_time'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     patient_id = db.Column(db.Integer, db.ForeignKey('patient.id'), nullable=False)
     doctor_id = db.Column(db.Integer, db.ForeignKey('doctor.id'), nullable=False)
@@ -47,6 +60,25 @@ class TreatmentLog(db.Model):
     def __repr__(self):
         return f'<TreatmentLog Patient {self.patient_id} Doctor {self.doctor_id}>'
 
+# ---------------------------
+# TreatmentDailyRollup model
+# ---------------------------
+class TreatmentDailyRollup(db.Model):
+    """Treatments per (UTC) day, doctor, team and ward; see app/treatment_rollup.py.
+
+    Derived data that can be rebuilt from treatment_log, so the ids carry no
+    foreign keys and never block deleting a ward, team or doctor.
+    """
+    __tablename__ = 'treatment_daily_rollup'
+    day = db.Column(db.Date, primary_key=True)
+    doctor_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    team_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    ward_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    treatment_count = db.Column(db.Integer, default=0, nullable=False)
+
+    def __repr__(self):
+        return f'<TreatmentDailyRollup {self.day} doctor {self.doctor_id}: {self.treatment_count}>'
+
 # ActivityLog model for professional recent activity tracking
 class ActivityLog(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -54,7 +86,8 @@ class ActivityLog(db.Model):
     username = db.Column(db.String(64))
     action = db.Column(db.String(64))
     details = db.Column(db.String(256))
-    timestamp = db.Column(db.DateTime, default=datetime.utcnow)
+    # Recent-activity feeds sort on it and exports filter on it
+    timestamp = db.Column(db.DateTime, default=datetime.utcnow, index=True)
 
     def __repr__(self):
         return f'<ActivityLog {self.action} by {self.username} at {self.timestamp}>'
@@ -70,6 +103,43 @@ from datetime import datetime
 # ---------------------------
 # User model
 # ---------------------------
+def password_hash_method():
+    """PASSWORD_HASH_METHOD with the iteration count spelled out, e.g. 'pbkdf2:sha256:1000000'.
+
+    Werkzeug records the effective parameters at the start of each hash, so
+    the configured method is normalized to compare equal to them.
+    """
+    from flask import current_app, has_app_context
+    method = current_app.config.get('PASSWORD_HASH_METHOD') if has_app_context() else None
+    method = method or 'pbkdf2:sha256'
+    if method.startswith('pbkdf2'):
+        parts = method.split(':')
+        if len(parts) == 1:
+            parts.append('sha256')
+        if len(parts) == 2:
+            parts.append(str(DEFAULT_PBKDF2_ITERATIONS))
+        method = ':'.join(parts)
+    return method
+
+
+# Hash of a random password per method, checked when the username is unknown
+_dummy_password_hashes = {}
+
+
+def check_unknown_user_password(password):
+    """Verify `password` against a throwaway hash and return False.
+
+    Takes as long as User.check_password, so a failed login for a username
+    that does not exist cannot be told apart from a wrong password.
+    """
+    method = password_hash_method()
+    if method not in _dummy_password_hashes:
+        import secrets
+        _dummy_password_hashes[method] = generate_password_hash(secrets.token_hex(16), method=method, salt_length=16)
+    check_password_hash(_dummy_password_hashes[method], password)
+    return False
+
+
 class User(db.Model, UserMixin):
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(64), unique=True, nullable=False)
@@ -87,10 +157,15 @@ class User(db.Model, UserMixin):
             raise ValueError("Password cannot be empty")
         self.password_hash = generate_password_hash(
             password,
-            method='pbkdf2:sha256',
+            method=password_hash_method(),
             salt_length=16
         )
 
+    def password_needs_rehash(self):
+        """Whether the stored hash was made with other parameters than PASSWORD_HASH_METHOD."""
+        stored = (self.password_hash or '').split('$', 1)[0]
+        return stored != password_hash_method()
+
     def check_password(self, password):
         if not self.password_hash:
             return False
@@ -102,10 +177,51 @@ class User(db.Model, UserMixin):
     def __repr__(self):
         return f'<User {self.username}>'
 
+_USER_COLUMNS = [column.key for column in User.__table__.columns]
+
+
 @login_manager.user_loader
 def load_user(user_id):
+    """Load the logged-in user, from the process-local user cache when possible.
+
+    A cache hit rebuilds the User from its cached columns and merges it into
+    the request's session with load=False, so no query is issued.
+    """
     from app import db
-    return db.session.get(User, int(user_id))
+    from app.user_cache import user_cache
+    user_id = int(user_id)
+    values = user_cache.get(user_id)
+    if values is not None:
+        user = User(**values)
+        make_transient_to_detached(user)
+        return db.session.merge(user, load=False)
+    user = db.session.get(User, user_id)
+    if user is not None:
+        user_cache.put(user_id, {key: getattr(user, key) for key in _USER_COLUMNS})
+    return user
+
+
+@event.listens_for(Session, 'after_flush')
+def _invalidate_cached_users(session, flush_context):
+    from app.user_cache import user_cache
+    user_ids = {obj.id for obj in session.deleted if isinstance(obj, User)}
+    for obj in session.dirty:
+        if isinstance(obj, User) and session.is_modified(obj, include_collections=False):
+            user_ids.add(obj.id)
+    if user_ids:
+        # Evict now, and again on commit in case a concurrent request
+        # re-cached the old row in between
+        user_cache.invalidate(*user_ids)
+        session.info.setdefault('changed_users', set()).update(user_ids)
+
+
+@event.listens_for(Session, 'after_commit')
+@event.listens_for(Session, 'after_rollback')
+def _evict_changed_users(session):
+    from app.user_cache import user_cache
+    user_ids = session.info.pop('changed_users', None)
+    if user_ids:
+        user_cache.invalidate(*user_ids)
 
 
 # ---------------------------
@@ -126,6 +242,10 @@ class Ward(db.Model):
         return f'<Ward {self.name}>'
 
 
+# Case-insensitive ward name lookups (add_patient); query with func.lower(Ward.name) == value
+db.Index('ix_ward_name_lower', func.lower(Ward.name))
+
+
 # ---------------------------
 # Team model
 # ---------------------------
@@ -134,9 +254,23 @@ class Team(db.Model):
     code = db.Column(db.String(10), unique=True, nullable=False)
     name = db.Column(db.String(100), nullable=False)
     specialization = db.Column(db.String(100), nullable=False)
+    # Doctor counts by grade category, kept current on every flush that
+    # adds, deletes, moves or re-grades a doctor (see _refresh_team_readiness)
+    doctor_count = db.Column(db.Integer, default=0, nullable=False)
+    consultant_count = db.Column(db.Integer, default=0, nullable=False)
+    grade1_count = db.Column(db.Integer, default=0, nullable=False)
     doctors = db.relationship('Doctor', backref='medical_team', lazy=True)
     patients = db.relationship('Patient', backref='treatment_team', lazy=True)
 
+    @hybrid_property
+    def admission_ready(self):
+        """A team can take patients once it has a Consultant and a Grade 1 doctor."""
+        return self.consultant_count > 0 and self.grade1_count > 0
+
+    @admission_ready.expression
+    def admission_ready(cls):
+        return and_(cls.consultant_count > 0, cls.grade1_count > 0)
+
     def __repr__(self):
         return f'<Team {self.code} - {self.name}>'
 
@@ -144,12 +278,26 @@ class Team(db.Model):
 # ---------------------------
 # Doctor model
 # ---------------------------
+GRADE_CONSULTANT = 'consultant'
+GRADE_1 = 'grade1'
+GRADE_OTHER = 'other'
+_CONSULTANT_RE = re.compile(r'consult')
+_GRADE_1_RE = re.compile(r'grade\s*1|grade1|\bg1\b|junior')
+
+
 class Doctor(db.Model):
+    __table_args__ = (
+        # Serves the per-team readiness counts
+        db.Index('ix_doctor_team_grade_category', 'team_id', 'grade_category'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
     grade = db.Column(db.String(20), nullable=False)
+    # GRADE_CONSULTANT, GRADE_1 or GRADE_OTHER; set together with grade
+    grade_category = db.Column(db.String(16), default=GRADE_OTHER, nullable=False)
     specialization = db.Column(db.String(100), nullable=False)
-    team_id = db.Column(db.Integer, db.ForeignKey('team.id'), nullable=False)
+    # active_history: moving a doctor must also recount the team it left
+    team_id = column_property(db.Column(db.Integer, db.ForeignKey('team.id'), nullable=False), active_history=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), unique=True)
 
     def __repr__(self):
@@ -166,25 +314,116 @@ class Doctor(db.Model):
         """
         if not grade_str:
             return ''
-        g = grade_str.strip().lower()
-        import re
-        if re.search(r'consult', g):
+        category = Doctor.grade_category_for(grade_str)
+        if category == GRADE_CONSULTANT:
             return 'Consultant'
-        if re.search(r'grade\s*1|grade1|\bg1\b|junior', g):
+        if category == GRADE_1:
             return 'Grade 1'
         # Fallback: Title-case trimmed
         return grade_str.strip().title()
 
+    @staticmethod
+    def grade_category_for(grade_str: str) -> str:
+        """Classify a grade string as GRADE_CONSULTANT, GRADE_1 or GRADE_OTHER."""
+        g = (grade_str or '').strip().lower()
+        if _CONSULTANT_RE.search(g):
+            return GRADE_CONSULTANT
+        if _GRADE_1_RE.search(g):
+            return GRADE_1
+        return GRADE_OTHER
+
     @validates('grade')
     def _normalize_grade_on_set(self, key, value):
-        # When grade is assigned, normalize it for consistent storage
-        return Doctor.normalize_grade(value)
+        # When grade is assigned, normalize it for consistent storage and
+        # classify it once, so readers never re-parse the string
+        grade = Doctor.normalize_grade(value)
+        self.grade_category = Doctor.grade_category_for(grade)
+        return grade
+
+
+def team_readiness_update(team_ids=None):
+    """UPDATE statement recounting Team doctor counts from the doctor table."""
+    team = Team.__table__
+    doctor = Doctor.__table__
+
+    def count(*criteria):
+        return (select(func.count()).select_from(doctor)
+                .where(doctor.c.team_id == team.c.id, *criteria).scalar_subquery())
+
+    stmt = update(team).values(
+        doctor_count=count(),
+        consultant_count=count(doctor.c.grade_category == GRADE_CONSULTANT),
+        grade1_count=count(doctor.c.grade_category == GRADE_1),
+    )
+    if team_ids is not None:
+        stmt = stmt.where(team.c.id.in_(team_ids))
+    return stmt
+
+
+def refresh_team_readiness():
+    """Reclassify every doctor's grade and recount every team, then commit.
+
+    For rows written before the columns existed, or by anything bypassing
+    the ORM. Returns the number of distinct grades classified.
+    """
+    grades = db.session.execute(select(Doctor.grade).distinct()).scalars().all()
+    by_category = {}
+    for grade in grades:
+        by_category.setdefault(Doctor.grade_category_for(grade), []).append(grade)
+    for category, members in by_category.items():
+        db.session.execute(update(Doctor).where(Doctor.grade.in_(members)).values(grade_category=category))
+    db.session.execute(team_readiness_update())
+    db.session.commit()
+    return len(grades)
+
+
+_READINESS_ATTRS = ['doctor_count', 'consultant_count', 'grade1_count']
+
+
+@event.listens_for(Session, 'after_flush')
+def _refresh_team_readiness(session, flush_context):
+    team_ids = set()
+    for obj in itertools.chain(session.new, session.deleted):
+        if isinstance(obj, Doctor):
+            team_ids.add(obj.team_id)
+    for obj in session.dirty:
+        if isinstance(obj, Doctor):
+            state = inspect(obj)
+            for attr in ('team_id', 'grade_category'):
+                history = state.attrs[attr].history
+                if history.has_changes():
+                    # A doctor moving teams changes both the old and the new team
+                    team_ids.update(history.deleted)
+                    team_ids.add(obj.team_id)
+    team_ids.discard(None)
+    if team_ids:
+        session.connection().execute(team_readiness_update(team_ids))
+        session.info.setdefault('readiness_teams', set()).update(team_ids)
+
+
+@event.listens_for(Session, 'after_flush_postexec')
+def _expire_team_readiness(session, flush_context):
+    # Loaded Team objects re-read their counts on next access
+    for team_id in session.info.pop('readiness_teams', ()):
+        team = session.identity_map.get(identity_key(Team, team_id))
+        if team is not None:
+            session.expire(team, _READINESS_ATTRS)
 
 
 # ---------------------------
 # Patient model
 # ---------------------------
 class Patient(db.Model):
+    __table_args__ = (
+        # Keyset pagination of the patient list on (admission_date, id), on
+        # its own or within one ward/team; the ward/team indexes also serve
+        # the per-ward and per-team patient lists
+        db.Index('ix_patient_admission_date_id', 'admission_date', 'id'),
+        db.Index('ix_patient_ward_admission', 'ward_id', 'admission_date', 'id'),
+        db.Index('ix_patient_team_admission', 'team_id', 'admission_date', 'id'),
+        # Active/discharged filters and "discharged today"
+        db.Index('ix_patient_discharge_date', 'discharge_date'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     patient_identifier = db.Column(db.String(32), unique=True, nullable=False, index=True)
     name = db.Column(db.String(100), nullable=False)
@@ -202,18 +441,33 @@ class Patient(db.Model):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         if not getattr(self, 'patient_identifier', None):
-            # Generate a unique identifier like P0001, P0002, ...
-            last = Patient.query.order_by(Patient.id.desc()).first()
-            next_num = (last.id + 1) if last else 1
-            self.patient_identifier = f"P{next_num:04d}"
+            # Unique identifier like P0001, P0002, ... from a per-process block
+            from app.identifiers import patient_identifiers
+            self.patient_identifier = patient_identifiers.next()
 
     def __repr__(self):
         return f'<Patient {self.name}>'
+
+
+# ---------------------------
+# IdentifierSequence model
+# ---------------------------
+class IdentifierSequence(db.Model):
+    """Next unreserved value of a named identifier sequence (see app/identifiers.py)."""
+    name = db.Column(db.String(32), primary_key=True)
+    next_value = db.Column(db.BigInteger, nullable=False)
+
+    def __repr__(self):
+        return f'<IdentifierSequence {self.name}={self.next_value}>'
 from app import db
 from app.models import User
 from werkzeug.security import generate_password_hash
 
 def create_default_users():
+    """Add the built-in admin, nurse and doctor accounts that do not exist yet.
+
+    Run by `flask hms init`; returns the usernames created.
+    """
     default_users = [
         {
             'username': 'admin',
@@ -234,9 +488,13 @@ def create_default_users():
             'password': 'doctor123'
         }
     ]
+    # One query for all of them rather than one per username
+    existing = set(db.session.execute(
+        db.select(User.username).where(User.username.in_([u['username'] for u in default_users]))
+    ).scalars())
+    created = []
     for user_data in default_users:
-        user = User.query.filter_by(username=user_data['username']).first()
-        if not user:
+        if user_data['username'] not in existing:
             new_user = User(
                 username=user_data['username'],
                 email=user_data['email'],
@@ -244,6 +502,9 @@ def create_default_users():
             )
             new_user.set_password(user_data['password'])
             db.session.add(new_user)
-    db.session.commit()
+            created.append(user_data['username'])
+    if created:
+        db.session.commit()
+    return created
 
 
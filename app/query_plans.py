@@ -0,0 +1,80 @@
+from datetime import datetime, timedelta, UTC
+from typing import NamedTuple
+
+from sqlalchemy import func, select
+
+from app import db
+from app.models import Patient, Ward, TreatmentLog, ActivityLog, TreatmentDailyRollup
+
+
+def hot_queries():
+    """(name, statement) pairs shaped like the routes' most frequent queries."""
+    now = datetime.now(UTC)
+    today = datetime(now.year, now.month, now.day)
+    tomorrow = today + timedelta(days=1)
+    newest = (Patient.admission_date.desc(), Patient.id.desc())
+    return [
+        ('patient list page', select(Patient).order_by(*newest).limit(50)),
+        ('patient list page, one ward', select(Patient).where(Patient.ward_id == 1).order_by(*newest).limit(50)),
+        ('patient list page, one team', select(Patient).where(Patient.team_id == 1).order_by(*newest).limit(50)),
+        ('patients discharged today', select(func.count(Patient.id))
+            .where(Patient.discharge_date >= today, Patient.discharge_date < tomorrow)),
+        ('ward by name', select(Ward).where(func.lower(Ward.name) == 'general')),
+        ('patient treatment log', select(TreatmentLog).where(TreatmentLog.patient_id == 1)
+            .order_by(TreatmentLog.treatment_time)),
+        ("doctor's treatments today", select(TreatmentLog).where(
+            TreatmentLog.doctor_id == 1, TreatmentLog.treatment_time >= today, TreatmentLog.treatment_time < tomorrow)),
+        ("today's treatments", select(TreatmentLog)
+            .where(TreatmentLog.treatment_time >= today, TreatmentLog.treatment_time < tomorrow)
+            .order_by(TreatmentLog.treatment_time)),
+        ('recent treatments', select(TreatmentLog).order_by(TreatmentLog.treatment_time.desc()).limit(20)),
+        ('recent activity', select(ActivityLog).order_by(ActivityLog.timestamp.desc()).limit(10)),
+        ('treatment rollup range', select(TreatmentDailyRollup.day, func.sum(TreatmentDailyRollup.treatment_count))
+            .where(TreatmentDailyRollup.day >= (today - timedelta(days=30)).date(),
+                   TreatmentDailyRollup.day < tomorrow.date())
+            .group_by(TreatmentDailyRollup.day)),
+    ]
+
+
+class QueryPlan(NamedTuple):
+    name: str
+    lines: list
+    full_scans: list  # plan lines reading a whole table
+
+
+def _sqlite_plan(conn, sql, params):
+    lines = [row[-1] for row in conn.exec_driver_sql('EXPLAIN QUERY PLAN ' + sql, params)]
+    # "SCAN t" reads every row; "SCAN t USING [COVERING] INDEX" walks an index
+    # in order (with a LIMIT, only the first entries)
+    scans = [line for line in lines if line.startswith('SCAN ') and ' USING ' not in line]
+    return lines, scans
+
+
+def _mysql_plan(conn, sql, params):
+    result = conn.exec_driver_sql('EXPLAIN ' + sql, params)
+    rows = [dict(zip(result.keys(), row)) for row in result]
+    lines = [f"{r.get('table')}: type={r.get('type')} key={r.get('key')} rows={r.get('rows')}" for r in rows]
+    scans = [line for line, r in zip(lines, rows) if r.get('type') == 'ALL']
+    return lines, scans
+
+
+_PLANNERS = {'sqlite': _sqlite_plan, 'mysql': _mysql_plan, 'mariadb': _mysql_plan}
+
+
+def explain_hot_queries():
+    """EXPLAIN every hot query on the current database and flag full table scans.
+
+    Supported on SQLite and MySQL/MariaDB; raises RuntimeError elsewhere.
+    """
+    engine = db.engine
+    planner = _PLANNERS.get(engine.dialect.name)
+    if planner is None:
+        raise RuntimeError(f'No EXPLAIN support for {engine.dialect.name}')
+    plans = []
+    with engine.connect() as conn:
+        for name, stmt in hot_queries():
+            compiled = stmt.compile(dialect=engine.dialect)
+            params = tuple(compiled.params[key] for key in compiled.positiontup or ())
+            lines, scans = planner(conn, compiled.string, params)
+            plans.append(QueryPlan(name, lines, scans))
+    return plans
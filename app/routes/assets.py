@@ -0,0 +1,41 @@
+import mimetypes
+import os
+
+from flask import Blueprint, abort, current_app, request, send_from_directory
+from werkzeug.security import safe_join
+
+from app.assets import DIST_DIR, ENCODED_SUFFIXES, is_fingerprinted
+
+assets_bp = Blueprint('assets', __name__)
+
+# Fingerprinted names change whenever the content does
+ONE_YEAR = 365 * 24 * 3600
+
+
+# Files written by `flask hms build-assets`, in the best precompressed
+# encoding the client accepts. Un-fingerprinted files (the manifest) are
+# rewritten in place by every build, so clients revalidate them instead
+@assets_bp.route('/assets/<path:filename>')
+def asset(filename):
+    directory = os.path.join(current_app.static_folder, DIST_DIR)
+    path = safe_join(directory, filename)
+    if path is None or not os.path.isfile(path):
+        abort(404)
+    mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    fingerprinted = is_fingerprinted(filename)
+    max_age = ONE_YEAR if fingerprinted else 0
+    encoding = next((encoding for encoding, suffix in ENCODED_SUFFIXES.items()
+                     if request.accept_encodings[encoding] and os.path.isfile(path + suffix)), None)
+    if encoding is None:
+        response = send_from_directory(directory, filename, mimetype=mimetype, max_age=max_age)
+    else:
+        response = send_from_directory(directory, filename + ENCODED_SUFFIXES[encoding],
+                                       mimetype=mimetype, max_age=max_age)
+        response.content_encoding = encoding
+    response.vary.add('Accept-Encoding')
+    response.cache_control.public = True
+    if fingerprinted:
+        response.cache_control.immutable = True
+    else:
+        response.cache_control.no_cache = True
+    return response
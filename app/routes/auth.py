@@ -1,7 +1,8 @@
 from flask import Blueprint, render_template, redirect, url_for, flash, request
 from flask_login import login_user, logout_user, login_required
-from app.models import User
+from app.models import User, check_unknown_user_password
 from app import db
+from app.login_throttle import login_throttle
 from urllib.parse import urlparse, urljoin
 
 auth_bp = Blueprint('auth', __name__)
@@ -16,9 +17,30 @@ def login():
     if request.method == 'POST':
         username = request.form.get('username', '')
         password = request.form.get('password', '')
+        # Refuse floods before any query or password hash
+        wait = login_throttle.check(username, request.remote_addr)
+        if wait:
+            flash(f'Too many login attempts. Try again in {wait} seconds.', 'danger')
+            return render_template('auth/login.html'), 429, {'Retry-After': str(wait)}
         user = User.query.filter_by(username=username).first()
 
-        if user and user.check_password(password):
+        # Unknown usernames take a slot and hash too, so neither a 503 nor the
+        # response time tells whether an account exists
+        with login_throttle.hash_slot() as acquired:
+            if not acquired:
+                flash('The server is busy. Please try again in a moment.', 'warning')
+                return render_template('auth/login.html'), 503, {'Retry-After': '1'}
+            if user is None:
+                verified = check_unknown_user_password(password)
+            else:
+                verified = user.check_password(password)
+                if verified and user.password_needs_rehash():
+                    # PASSWORD_HASH_METHOD changed since this hash was made
+                    user.set_password(password)
+                    db.session.commit()
+
+        if verified:
+            login_throttle.succeeded(username, request.remote_addr)
             login_user(user)
             # Redirect based on role
             role = (user.role or '').lower()
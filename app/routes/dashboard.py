@@ -12,139 +12,98 @@
 
 # app/routes/dashboard.py
 
-from flask import Blueprint, render_template, jsonify, abort
+from flask import Blueprint, render_template, jsonify, abort, current_app, request
 from flask_login import login_required, current_user
+from sqlalchemy import select
+from sqlalchemy.orm import joinedload
+from app import db
 from app.models import Patient, TreatmentLog, Doctor, ActivityLog
 from app.models import Patient, Ward, Team, Doctor, TreatmentLog, ActivityLog
-from app.models import Nurse
+from app.models import Nurse, Technician, User
+from app.dashboard_stats import dashboard_snapshot
+from app.sql_instrumentation import query_budget
+from app.db_routing import read_replica
+from app.http_cache import conditional_get
+from app.treatment_rollup import treatments_per_day, total_treatments as total_treatments_from_rollup
 from datetime import datetime, UTC, timedelta
 from collections import OrderedDict
 import os
 
 # Blueprint definition — only once
 dashboard_bp = Blueprint('dashboard', __name__)
+
+# Day ranges offered by the reports chart
+REPORT_RANGES = (7, 30, 90, 365)
+REPORT_DEFAULT_DAYS = 30
+
 @dashboard_bp.route('/reports', methods=['GET'])
 @login_required
+@conditional_get(Patient, Ward, Team, Doctor, TreatmentLog)
+@query_budget(9)
+@read_replica
 def reports():
     if current_user.role != 'admin':
         abort(403)
+    # Chart window; every range reads one rollup row per day
+    days = request.args.get('days', REPORT_DEFAULT_DAYS, type=int)
+    if days not in REPORT_RANGES:
+        days = REPORT_DEFAULT_DAYS
+    tomorrow = datetime.now(UTC).date() + timedelta(days=1)
+    treatments_by_day = treatments_per_day(tomorrow - timedelta(days=days), tomorrow)
     total_patients = Patient.query.count()
-    total_treatments = TreatmentLog.query.count()
+    total_treatments = total_treatments_from_rollup()
     # Example: income estimate = $100 per treatment
     income_estimate = total_treatments * 100
-    treatments = TreatmentLog.query.order_by(TreatmentLog.treatment_time.desc()).limit(20).all()
+    range_treatments = sum(treatments_by_day.values())
+    treatments = TreatmentLog.query.options(
+        joinedload(TreatmentLog.patient), joinedload(TreatmentLog.doctor)
+    ).order_by(TreatmentLog.treatment_time.desc()).limit(20).all()
+    # Filter choices for the export form
+    wards = db.session.execute(select(Ward.id, Ward.name).order_by(Ward.name)).all()
+    teams = db.session.execute(select(Team.id, Team.code, Team.name).order_by(Team.code)).all()
     return render_template('dashboard/reports.html',
                            total_patients=total_patients,
                            total_treatments=total_treatments,
                            income_estimate=income_estimate,
-                           treatments=treatments)
-
-# Path for notifications audit log
-AUDIT_LOG_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'audit.log')
+                           treatments=treatments,
+                           wards=wards,
+                           teams=teams,
+                           days=days,
+                           report_ranges=REPORT_RANGES,
+                           range_treatments=range_treatments,
+                           range_income=range_treatments * 100,
+                           treatments_chart={'labels': list(treatments_by_day.keys()),
+                                             'data': list(treatments_by_day.values())})
 
 # -----------------------------
 # Route: Admin Dashboard
 # -----------------------------
 @dashboard_bp.route('/dashboard')
 @login_required
+@conditional_get(Patient, Ward, Team, Doctor, Nurse, Technician, User, TreatmentLog, ActivityLog)
+@query_budget(10)
+@read_replica
 def dashboard():
     if not (current_user.is_authenticated and (current_user.role or '').lower() == 'admin'):
         abort(403)
 
-    total_patients = Patient.query.count()
-
-    total_beds = sum(ward.capacity for ward in Ward.query.all())
-    occupied_beds = sum(ward.current_occupancy for ward in Ward.query.all())
-    available_beds = total_beds - occupied_beds
-
-    active_teams = Team.query.count()
-
-    today = datetime.now(UTC).date()
-    discharged_patients = Patient.query.filter(
-        Patient.discharge_date != None,
-        Patient.discharge_date >= datetime(today.year, today.month, today.day),
-        Patient.discharge_date < datetime(today.year, today.month, today.day, 23, 59, 59)
-    ).count()
-
-    total_doctors = Doctor.query.count()
-    total_nurses = Nurse.query.count()
-    stats = {
-        'total_patients': total_patients,
-        'total_beds': total_beds,
-        'available_beds': available_beds,
-        'active_teams': active_teams,
-        'discharged_patients': discharged_patients,
-        'total_doctors': total_doctors,
-        'total_nurses': total_nurses,
-    }
-
-    recent_patients = Patient.query.order_by(Patient.admission_date.desc()).limit(5).all()
-    recent_treatments = TreatmentLog.query.order_by(TreatmentLog.treatment_time.desc()).limit(5).all()
-    doctors = Doctor.query.order_by(Doctor.name).limit(6).all()
-    # Recent activity: last 10 actions
-    recent_activities = ActivityLog.query.order_by(ActivityLog.timestamp.desc()).limit(10).all()
-
-    # Treatments per last 7 days
-    start_date = today - timedelta(days=6)
-    treatments_recent = TreatmentLog.query.filter(
-        TreatmentLog.treatment_time >= datetime(start_date.year, start_date.month, start_date.day, tzinfo=UTC)
-    ).all()
-
-    counts = OrderedDict(( (start_date + timedelta(days=i)).strftime('%Y-%m-%d'), 0 ) for i in range(7))
-    for t in treatments_recent:
-        key = t.treatment_time.astimezone(UTC).date().strftime('%Y-%m-%d')
-        if key in counts:
-            counts[key] += 1
-    treatments_chart = {'labels': list(counts.keys()), 'data': list(counts.values())}
-
-    total_treatments = TreatmentLog.query.count()
-    income_estimate = total_treatments * 120  # Simple estimate
-
-    wards = Ward.query.all()
-    ward_chart = {'labels': [w.name for w in wards], 'data': [w.current_occupancy for w in wards]}
-
-    from app.models import Technician
-    staff_chart = {'labels': [w.name for w in wards], 'data': []}
-    for w in wards:
-        doctor_ids = set()
-        nurse_ids = set()
-        technician_ids = set()
-        for p in getattr(w, 'patients', []):
-            if hasattr(p, 'team_id') and p.team_id:
-                team = Team.query.get(p.team_id)
-                if team:
-                    for d in getattr(team, 'doctors', []):
-                        doctor_ids.add(d.id)
-        # Count technicians assigned to this ward (if you have such logic, otherwise count all)
-        # If technicians are not assigned to wards, count all technicians
-        technicians = Technician.query.all()
-        technician_count = len(technicians)
-        staff_chart['data'].append(len(doctor_ids) + len(nurse_ids) + technician_count)
-
-    recent_admissions = Patient.query.order_by(Patient.admission_date.desc()).limit(5).all()
-    recent_discharges = Patient.query.filter(Patient.discharge_date != None).order_by(Patient.discharge_date.desc()).limit(5).all()
-    recent_staff_changes = []  # Optional
+    # Served from the materialized snapshot; write routes invalidate it
+    stats = dashboard_snapshot.get(ttl=current_app.config.get('DASHBOARD_SNAPSHOT_TTL'))
 
     # Pending treatments: treatments in last 7 days with status 'pending' (if status field exists)
     pending_treatments = []
     if hasattr(TreatmentLog, 'status'):
         pending_treatments = TreatmentLog.query.filter_by(status='pending').all()
-    # Pass wards for alerts section
-    wards = Ward.query.all()
-    # Filter full wards in Python for template use
-    full_wards = [w for w in wards if w.current_occupancy >= w.capacity]
     return render_template(
-        'dashboard.html', stats=stats, recent_patients=recent_patients,
-        recent_treatments=recent_treatments, doctors=doctors,
-        treatments_chart=treatments_chart, income_estimate=income_estimate,
-        ward_chart=ward_chart, staff_chart=staff_chart,
-        recent_admissions=recent_admissions, recent_discharges=recent_discharges,
-        recent_staff_changes=recent_staff_changes,
+        'dashboard.html', stats=stats.summary(), recent_patients=stats.recent_patients,
+        treatments_chart=stats.treatments_chart, income_estimate=stats.income_estimate,
+        ward_chart=stats.ward_chart, staff_chart=stats.staff_chart,
+        snapshot_age=int(stats.age_seconds()),
         current_year=datetime.now().year,
-        wards=wards,
-        full_wards=full_wards,
+        wards=stats.wards,
+        full_wards=stats.full_wards,
         pending_treatments=pending_treatments,
-        recent_activities=recent_activities
+        recent_activities=stats.recent_activities
     )
 
 # -----------------------------
@@ -166,9 +125,10 @@ def medical_records():
 @login_required
 def notifications():
     notifications = []
+    audit_log_path = current_app.config['AUDIT_LOG_PATH']
     try:
-        if os.path.exists(AUDIT_LOG_PATH):
-            with open(AUDIT_LOG_PATH, 'r', encoding='utf-8') as f:
+        if os.path.exists(audit_log_path):
+            with open(audit_log_path, 'r', encoding='utf-8') as f:
                 lines = f.readlines()[-10:]
                 for line in reversed(lines):
                     if 'INFO' in line:
@@ -186,12 +146,14 @@ def doctor_scheduling():
         abort(403)
     from app.models import Doctor, Patient, TreatmentLog, Ward
     from sqlalchemy import or_
-    from datetime import datetime, UTC
     selected_date = datetime.now(UTC).date()
+    day_start = datetime(selected_date.year, selected_date.month, selected_date.day, tzinfo=UTC)
     # Fetch appointments for today (using TreatmentLog as Appointment model)
-    appointments_query = TreatmentLog.query.filter(
-        TreatmentLog.treatment_time >= datetime(selected_date.year, selected_date.month, selected_date.day, tzinfo=UTC),
-        TreatmentLog.treatment_time < datetime(selected_date.year, selected_date.month, selected_date.day, 23, 59, 59, tzinfo=UTC)
+    appointments_query = TreatmentLog.query.options(
+        joinedload(TreatmentLog.patient), joinedload(TreatmentLog.doctor)
+    ).filter(
+        TreatmentLog.treatment_time >= day_start,
+        TreatmentLog.treatment_time < day_start + timedelta(days=1)
     ).order_by(TreatmentLog.treatment_time.asc())
     appointments = []
     for appt in appointments_query:
@@ -1,7 +1,9 @@
 from flask import Blueprint, current_app, render_template_string
 from flask_login import login_required, current_user
+from sqlalchemy.orm import selectinload
 from app import db
 from app.models import Team, Doctor
+from app.sql_instrumentation import instrumentation_enabled, recent_requests
 
 debug_bp = Blueprint('debug', __name__, url_prefix='/debug')
 
@@ -16,7 +18,7 @@ def teams_debug():
     if not current_user.is_authenticated or getattr(current_user, 'role', None) != 'admin':
         return "Forbidden", 403
 
-    teams = Team.query.all()
+    teams = Team.query.options(selectinload(Team.doctors)).all()
     rows = []
     for t in teams:
         docs = []
@@ -46,7 +48,7 @@ def teams_json():
         return {"error": "Not available"}, 404
     if not current_user.is_authenticated or getattr(current_user, 'role', None) != 'admin':
         return {"error": "Forbidden"}, 403
-    teams = Team.query.all()
+    teams = Team.query.options(selectinload(Team.doctors)).all()
     out = {}
     for t in teams:
         out[t.id] = {
@@ -77,3 +79,72 @@ def seed_team_doctors(team_id):
     db.session.add_all([c1, j1])
     db.session.commit()
     return {"message": f"Added 2 doctors to team {team.id}", "doctors": [{"id": c1.id, "name": c1.name, "grade": c1.grade}, {"id": j1.id, "name": j1.name, "grade": j1.grade}]}
+
+
+def _request_summary(r, threshold):
+    return {
+        'method': r.method,
+        'path': r.path,
+        'endpoint': r.endpoint,
+        'status': r.status,
+        'started_at': r.started_at.isoformat(timespec='seconds') if r.started_at else None,
+        'queries': r.count,
+        'db_ms': round(r.total_ms, 2),
+        'budget': r.budget,
+        'over_budget': r.over_budget,
+        'slowest': [{'ms': round(ms, 2), 'statement': sql} for ms, sql in r.slowest],
+        'failed': [{'error': error, 'statement': sql} for sql, error in r.failed],
+        'repeated': [{'count': s.count, 'total_ms': round(s.total_ms, 2), 'statement': s.statement}
+                     for s in r.repeated(threshold)],
+    }
+
+
+@debug_bp.route('/sql')
+@login_required
+def sql_debug():
+    """Recent requests with their query count, DB time, slowest and repeated statements."""
+    if not current_app.debug:
+        return "Not available", 404
+    if not current_user.is_authenticated or getattr(current_user, 'role', None) != 'admin':
+        return "Forbidden", 403
+    threshold = current_app.config.get('SQL_N_PLUS_ONE_THRESHOLD', 5)
+    rows = [_request_summary(r, threshold) for r in recent_requests()]
+    html = """
+    <h1>SQL per request (debug)</h1>
+    {% if not enabled %}<p>SQL_INSTRUMENTATION is off.</p>{% endif %}
+    <table border="1" cellpadding="4">
+      <tr><th>When</th><th>Request</th><th>Status</th><th>Queries</th><th>DB ms</th><th>Budget</th><th>Details</th></tr>
+      {% for r in rows %}
+      <tr{% if r.over_budget or r.repeated or r.failed %} style="background:#fde2e2"{% endif %}>
+        <td>{{ r.started_at }}</td>
+        <td>{{ r.method }} {{ r.path }}<br><small>{{ r.endpoint }}</small></td>
+        <td>{{ r.status }}</td>
+        <td>{{ r.queries }}</td>
+        <td>{{ r.db_ms }}</td>
+        <td>{{ r.budget if r.budget is not none else '' }}</td>
+        <td>
+          {% if r.repeated %}<b>Repeated (possible N+1):</b>
+            <ul>{% for s in r.repeated %}<li>{{ s.count }}x, {{ s.total_ms }} ms: <code>{{ s.statement }}</code></li>{% endfor %}</ul>
+          {% endif %}
+          {% if r.failed %}<b>Failed:</b>
+            <ul>{% for s in r.failed %}<li>{{ s.error }}: <code>{{ s.statement }}</code></li>{% endfor %}</ul>
+          {% endif %}
+          <b>Slowest:</b>
+          <ul>{% for s in r.slowest %}<li>{{ s.ms }} ms: <code>{{ s.statement }}</code></li>{% endfor %}</ul>
+        </td>
+      </tr>
+      {% endfor %}
+    </table>
+    """
+    return render_template_string(html, rows=rows, enabled=instrumentation_enabled(current_app))
+
+
+@debug_bp.route('/sql.json')
+@login_required
+def sql_json():
+    if not current_app.debug:
+        return {"error": "Not available"}, 404
+    if not current_user.is_authenticated or getattr(current_user, 'role', None) != 'admin':
+        return {"error": "Forbidden"}, 403
+    threshold = current_app.config.get('SQL_N_PLUS_ONE_THRESHOLD', 5)
+    return {'requests': [_request_summary(r, threshold) for r in recent_requests()]}
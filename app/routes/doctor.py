@@ -1,11 +1,16 @@
 from flask import Blueprint, render_template
 from flask_login import login_required, current_user
-from app.models import Doctor, Patient, TreatmentLog
+from sqlalchemy.orm import joinedload
+from app.models import Doctor, Patient, Ward, TreatmentLog
+from app.sql_instrumentation import query_budget
+from app.http_cache import conditional_get
 
 doctor_bp = Blueprint('doctor', __name__)
 
 @doctor_bp.route('/doctor')
 @login_required
+@conditional_get(Doctor, Patient, Ward, TreatmentLog)
+@query_budget(6)
 def dashboard():
     if not (current_user.is_authenticated and (current_user.role or '').lower() == 'doctor'):
         from flask import abort
@@ -15,8 +20,9 @@ def dashboard():
     my_patients = []
     todays_appointments = []
     rounds_scheduled = 0
-    from datetime import datetime, UTC
+    from datetime import datetime, UTC, timedelta
     today = datetime.now(UTC).date()
+    day_start = datetime(today.year, today.month, today.day, tzinfo=UTC)
     if doctor:
         # Patients assigned to this doctor's team
         my_patients = Patient.query.filter_by(team_id=doctor.team_id).order_by(Patient.admission_date.desc()).all()
@@ -28,9 +34,11 @@ def dashboard():
                 'ward': t.patient.assigned_ward.name if t.patient and t.patient.assigned_ward else '',
                 'notes': t.notes or ''
             }
-            for t in TreatmentLog.query.filter_by(doctor_id=doctor.id).filter(
-                TreatmentLog.treatment_time >= datetime(today.year, today.month, today.day, tzinfo=UTC),
-                TreatmentLog.treatment_time < datetime(today.year, today.month, today.day, 23, 59, 59, tzinfo=UTC)
+            for t in TreatmentLog.query.options(
+                joinedload(TreatmentLog.patient).joinedload(Patient.assigned_ward)
+            ).filter_by(doctor_id=doctor.id).filter(
+                TreatmentLog.treatment_time >= day_start,
+                TreatmentLog.treatment_time < day_start + timedelta(days=1)
             ).all()
         ]
         rounds_scheduled = len(todays_appointments)
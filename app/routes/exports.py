@@ -0,0 +1,175 @@
+import csv
+import io
+import json
+from datetime import datetime, timedelta
+
+from flask import Blueprint, Response, abort, current_app, request, stream_with_context
+from flask_login import login_required
+from sqlalchemy import select
+from sqlalchemy.orm import aliased
+
+from app import db
+from app.models import Patient, Ward, Team, Doctor, Nurse, TreatmentLog, ActivityLog
+from app.utils import roles_required
+
+exports_bp = Blueprint('exports', __name__)
+
+EXPORT_FORMATS = {'csv': 'text/csv', 'ndjson': 'application/x-ndjson'}
+
+
+def _parse_day(name):
+    value = request.args.get(name)
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value, '%Y-%m-%d')
+    except ValueError:
+        abort(400, description=f"'{name}' must be a date in YYYY-MM-DD format")
+
+
+def _export_filters():
+    """start/end (inclusive days), ward_id and team_id from the query string."""
+    end = _parse_day('end')
+    return {
+        'start': _parse_day('start'),
+        'end': end + timedelta(days=1) if end else None,
+        'ward_id': request.args.get('ward_id', type=int),
+        'team_id': request.args.get('team_id', type=int),
+    }
+
+
+def _in_range(stmt, column, filters):
+    if filters['start']:
+        stmt = stmt.where(column >= filters['start'])
+    if filters['end']:
+        stmt = stmt.where(column < filters['end'])
+    return stmt
+
+
+def _by_ward_and_team(stmt, filters):
+    if filters['ward_id']:
+        stmt = stmt.where(Patient.ward_id == filters['ward_id'])
+    if filters['team_id']:
+        stmt = stmt.where(Patient.team_id == filters['team_id'])
+    return stmt
+
+
+def _format_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat(sep=' ', timespec='seconds')
+    return value
+
+
+# A cell starting with one of these is read as a formula by spreadsheet apps
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+def _csv_value(value):
+    value = _format_value(value)
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def _encode_csv(rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerows([_csv_value(v) for v in row] for row in rows)
+    return buffer.getvalue()
+
+
+def _encode_ndjson(header, rows):
+    return ''.join(
+        json.dumps(dict(zip(header, (_format_value(v) for v in row)))) + '\n' for row in rows
+    )
+
+
+def _stream_export(name, stmt, fmt):
+    """Stream `stmt` as CSV or NDJSON, one chunk of rows at a time.
+
+    The statement selects plain columns rather than ORM entities, and runs
+    with yield_per, so rows come off a server-side cursor in batches and
+    are written out straight away; nothing accumulates in the session's
+    identity map and memory stays flat however many rows match.
+    """
+    if fmt not in EXPORT_FORMATS:
+        abort(404)
+    header = [column.name for column in stmt.selected_columns]
+    chunk_rows = current_app.config.get('EXPORT_CHUNK_ROWS', 1000)
+
+    def generate():
+        if fmt == 'csv':
+            yield _encode_csv([header])
+        result = db.session.execute(stmt.execution_options(yield_per=chunk_rows))
+        try:
+            for rows in result.partitions():
+                yield _encode_csv(rows) if fmt == 'csv' else _encode_ndjson(header, rows)
+        finally:
+            result.close()
+
+    filename = f"{name}-{datetime.now().strftime('%Y%m%d-%H%M%S')}.{fmt}"
+    return Response(
+        stream_with_context(generate()),
+        mimetype=EXPORT_FORMATS[fmt],
+        headers={'Content-Disposition': f'attachment; filename="{filename}"'},
+    )
+
+
+# Patients admitted in the date range, optionally limited to a ward/team
+@exports_bp.route('/export/patients.<fmt>')
+@login_required
+@roles_required('admin')
+def export_patients(fmt):
+    filters = _export_filters()
+    stmt = (
+        select(
+            Patient.id, Patient.patient_identifier, Patient.name, Patient.age, Patient.gender,
+            Patient.admission_date, Patient.discharge_date,
+            Ward.name.label('ward'), Team.code.label('team'),
+        )
+        .outerjoin(Ward, Ward.id == Patient.ward_id)
+        .outerjoin(Team, Team.id == Patient.team_id)
+        .order_by(Patient.id)
+    )
+    stmt = _by_ward_and_team(_in_range(stmt, Patient.admission_date, filters), filters)
+    return _stream_export('patients', stmt, fmt)
+
+
+# Treatments given in the date range, optionally limited to the patient's ward/team
+@exports_bp.route('/export/treatments.<fmt>')
+@login_required
+@roles_required('admin')
+def export_treatments(fmt):
+    filters = _export_filters()
+    nurse = aliased(Nurse)
+    stmt = (
+        select(
+            TreatmentLog.id, TreatmentLog.treatment_time,
+            Patient.patient_identifier, Patient.name.label('patient'),
+            Doctor.name.label('doctor'), nurse.name.label('nurse'),
+            TreatmentLog.medication, TreatmentLog.dosage, TreatmentLog.notes,
+            Ward.name.label('ward'), Team.code.label('team'),
+        )
+        .join(Patient, Patient.id == TreatmentLog.patient_id)
+        .join(Doctor, Doctor.id == TreatmentLog.doctor_id)
+        .outerjoin(nurse, nurse.id == TreatmentLog.nurse_id)
+        .outerjoin(Ward, Ward.id == Patient.ward_id)
+        .outerjoin(Team, Team.id == Patient.team_id)
+        .order_by(TreatmentLog.id)
+    )
+    stmt = _by_ward_and_team(_in_range(stmt, TreatmentLog.treatment_time, filters), filters)
+    return _stream_export('treatments', stmt, fmt)
+
+
+# Activity log entries in the date range (activity rows carry no ward or team)
+@exports_bp.route('/export/activity.<fmt>')
+@login_required
+@roles_required('admin')
+def export_activity(fmt):
+    filters = _export_filters()
+    stmt = select(
+        ActivityLog.id, ActivityLog.timestamp, ActivityLog.user_id, ActivityLog.username,
+        ActivityLog.action, ActivityLog.details,
+    ).order_by(ActivityLog.id)
+    stmt = _in_range(stmt, ActivityLog.timestamp, filters)
+    return _stream_export('activity', stmt, fmt)
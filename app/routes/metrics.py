@@ -0,0 +1,20 @@
+from flask import Blueprint, Response, abort, current_app, request
+
+from app import db
+from app.audit import audit_queue_depth
+from app.dashboard_stats import dashboard_snapshot
+from app.fragment_cache import fragment_cache
+from app.metrics import render_metrics
+
+metrics_bp = Blueprint('metrics', __name__)
+
+
+# Prometheus scrape target; only answers addresses listed in METRICS_ALLOWED_IPS
+@metrics_bp.route('/metrics')
+def metrics():
+    if not current_app.config.get('METRICS_ENABLED'):
+        abort(404)
+    if request.remote_addr not in current_app.config.get('METRICS_ALLOWED_IPS', ()):
+        abort(404)
+    body = render_metrics(db.engines, audit_queue_depth(), dashboard_snapshot.peek(), fragment_cache.stats())
+    return Response(body, mimetype='text/plain; version=0.0.4; charset=utf-8')
@@ -5,9 +5,15 @@ nurse_bp = Blueprint('nurse', __name__)
 
 
 from app.models import Ward, Patient
+from app.sql_instrumentation import query_budget
+from app.db_routing import read_replica
+from app.http_cache import conditional_get
 
 @nurse_bp.route('/nurse')
 @login_required
+@conditional_get(Ward, Patient)
+@query_budget(5)
+@read_replica
 def dashboard():
     from flask_login import current_user
     if not (current_user.is_authenticated and (current_user.role or '').lower() == 'nurse'):
@@ -1,27 +1,35 @@
 # ...existing code...
 
-from flask import Blueprint, render_template, redirect, url_for, flash, request
-import logging
+from flask import (Blueprint, render_template, redirect, url_for, flash, request, jsonify, current_app,
+                   Response, stream_with_context)
 from flask_login import login_required, current_user
+from sqlalchemy import func, or_
+from sqlalchemy.orm import joinedload, selectinload
 from datetime import datetime, UTC
-from app.models import Patient, Ward, Team, ActivityLog
+import io
+import json
+from app.models import Patient, Ward, Team, TreatmentLog
 from app import db
-from app.utils import roles_required
-
-
-# Audit logger setup
-audit_logger = logging.getLogger('audit')
-audit_logger.setLevel(logging.INFO)
-audit_handler = logging.FileHandler('audit.log')
-audit_handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(message)s'))
-if not audit_logger.hasHandlers():
-    audit_logger.addHandler(audit_handler)
+from app.utils import roles_required, keyset_paginate
+from app.sql_instrumentation import query_budget
+from app.http_cache import conditional_get
+from app.dashboard_stats import invalidate_dashboard_snapshot
+from app.search_index import patient_search_index
+from app.unit_of_work import UnitOfWork
+from app.beds import reserve_bed, release_bed, move_bed
+from app.admissions import (AdmissionImporter, IMPORT_FORMATS, detect_format, read_rows,
+                            ward_gender_error, team_admission_error, parse_admission_date)
 
 patients_bp = Blueprint('patients', __name__)
 
+PATIENTS_PER_PAGE = 50
+MAX_PATIENTS_PER_PAGE = 200
+SEARCH_RESULTS_LIMIT = 10
+
 # List patients by ward (FR6)
 @patients_bp.route('/wards/<int:ward_id>/patients')
 @login_required
+@conditional_get(Patient, Ward)
 def list_patients_by_ward(ward_id):
     ward = Ward.query.get_or_404(ward_id)
     patients = Patient.query.filter_by(ward_id=ward_id).all()
@@ -30,13 +38,12 @@ def list_patients_by_ward(ward_id):
 # List patients by team (FR7)
 @patients_bp.route('/teams/<int:team_id>/patients')
 @login_required
+@conditional_get(Patient, Ward, Team)
 def list_patients_by_team(team_id):
     team = Team.query.get_or_404(team_id)
-    patients = Patient.query.filter_by(team_id=team_id).all()
+    patients = Patient.query.options(joinedload(Patient.assigned_ward)).filter_by(team_id=team_id).all()
     return render_template('patients/list_by_team.html', team=team, patients=patients)
 
-patients_bp = Blueprint('patients', __name__)
-
 # Add patient form page (GET)
 @patients_bp.route('/patients/add', methods=['GET'])
 @login_required
@@ -66,8 +73,8 @@ def edit_patient(id):
     if not ward:
         flash('Selected ward does not exist.', 'danger')
         return redirect(url_for('patients.list_patients'))
-    # Capacity validation (allow if patient is already in this ward, or if beds available)
-    if ward.id != patient.ward_id and ward.available_beds() < 1:
+    # Capacity validation: moving to another ward reserves a bed there atomically
+    if ward.id != patient.ward_id and not move_bed(patient.ward_id, ward.id):
         flash('Selected ward has no available beds.', 'danger')
         return redirect(url_for('patients.list_patients'))
     try:
@@ -77,16 +84,13 @@ def edit_patient(id):
     patient.name = name
     patient.age = int(age)
     patient.gender = gender
-    # If changing ward, update occupancy
-    if ward.id != patient.ward_id:
-        old_ward = patient.assigned_ward
-        if old_ward:
-            old_ward.current_occupancy = max(0, old_ward.current_occupancy - 1)
-        ward.current_occupancy = ward.current_occupancy + 1
-        patient.ward_id = ward.id
+    patient.ward_id = ward.id
     patient.team_id = int(team_id)
     patient.admission_date = admission_date_obj
-    db.session.commit()
+    uow = UnitOfWork()
+    uow.on_commit(invalidate_dashboard_snapshot)
+    uow.on_commit(patient_search_index.upsert_patient, patient)
+    uow.commit()
     flash('Patient updated successfully.', 'success')
     return redirect(url_for('patients.list_patients'))
 
@@ -109,41 +113,113 @@ def transfer_patient(id):
         if new_ward.type.lower() != patient.gender.lower():
             flash('Cannot transfer: Gender mismatch for ward.', 'danger')
             return redirect(url_for('patients.list_patients'))
-    # Capacity validation
-    if new_ward.available_beds() < 1:
+    old_ward = patient.assigned_ward
+    # Capacity validation and occupancy update: reserve in the new ward, release the old bed
+    if not move_bed(patient.ward_id, new_ward.id):
         flash('Selected ward has no available beds.', 'danger')
         return redirect(url_for('patients.list_patients'))
-    # Update occupancy: decrement old, increment new
-    old_ward = patient.assigned_ward
-    if old_ward:
-        old_ward.current_occupancy = max(0, old_ward.current_occupancy - 1)
-    new_ward.current_occupancy = new_ward.current_occupancy + 1
     patient.ward_id = new_ward.id
-    db.session.commit()
+    uow = UnitOfWork()
     # Audit log
-    audit_logger.info(f"User '{getattr(current_user, 'username', 'unknown')}' transferred patient '{patient.name}' (ID: {patient.id}) from ward '{old_ward.name if old_ward else 'unknown'}' (ID: {old_ward.id if old_ward else 'unknown'}) to ward '{new_ward.name}' (ID: {new_ward.id})")
+    uow.audit(f"User '{getattr(current_user, 'username', 'unknown')}' transferred patient '{patient.name}' (ID: {patient.id}) from ward '{old_ward.name if old_ward else 'unknown'}' (ID: {old_ward.id if old_ward else 'unknown'}) to ward '{new_ward.name}' (ID: {new_ward.id})")
     # Activity log
-    activity = ActivityLog(
-        user_id=getattr(current_user, 'id', None),
-        username=getattr(current_user, 'username', 'unknown'),
-        action='Transfer Patient',
-        details=f"{patient.name} transferred from {old_ward.name if old_ward else 'unknown'} to {new_ward.name}",
-    )
-    db.session.add(activity)
-    db.session.commit()
+    uow.activity('Transfer Patient', f"{patient.name} transferred from {old_ward.name if old_ward else 'unknown'} to {new_ward.name}")
+    uow.on_commit(invalidate_dashboard_snapshot)
+    uow.on_commit(patient_search_index.upsert_patient, patient)
+    uow.commit()
     flash('Patient transferred successfully.', 'success')
     return redirect(url_for('patients.list_patients'))
 
 
+# Data for the shared edit/transfer modals on the patient list: the patient's
+# current values and the wards they could move to. Wards are filtered in SQL by
+# gender (?gender= overrides the patient's, for the edit form) and free beds;
+# the patient's own ward is listed for editing but not for a transfer.
+@patients_bp.route('/api/patients/<int:id>/form')
+@login_required
+@roles_required('admin', 'staff')
+@conditional_get(Patient, Ward)
+@query_budget(4)
+def patient_form_data(id):
+    patient = Patient.query.get_or_404(id)
+    gender = (request.args.get('gender') or patient.gender or '').lower()
+    ward_type = func.lower(Ward.type)
+    rows = db.session.execute(
+        db.select(Ward.id, Ward.name, Ward.type, (Ward.capacity - Ward.current_occupancy).label('available'))
+        .where(or_(ward_type.notin_(['male', 'female']), ward_type == gender))
+        .where(or_(Ward.current_occupancy < Ward.capacity, Ward.id == patient.ward_id))
+        .order_by(Ward.name)
+    ).all()
+    return jsonify({
+        'patient': {
+            'id': patient.id,
+            'name': patient.name,
+            'age': patient.age,
+            'gender': (patient.gender or '').lower(),
+            'ward_id': patient.ward_id,
+            'team_id': patient.team_id,
+            'admission_date': patient.admission_date.strftime('%Y-%m-%d') if patient.admission_date else None,
+        },
+        'edit_url': url_for('patients.edit_patient', id=patient.id),
+        'transfer_url': url_for('patients.transfer_patient', id=patient.id),
+        'wards': [
+            {'id': row.id, 'name': row.name, 'type': row.type, 'available_beds': row.available,
+             'current': row.id == patient.ward_id}
+            for row in rows
+        ],
+    })
+
+
+# Typeahead search used by static/js/main.js initPatientSearch()
+@patients_bp.route('/api/patients/search')
+@login_required
+@conditional_get(Patient, Ward, Team)
+def search_patients():
+    query = request.args.get('q', '')
+    limit = request.args.get('limit', SEARCH_RESULTS_LIMIT, type=int)
+    patient_search_index.ensure_built(ttl=current_app.config.get('PATIENT_SEARCH_INDEX_TTL'))
+    return jsonify(patient_search_index.search(query, limit=limit))
+
 
 @patients_bp.route('/patients')
 @login_required
+@conditional_get(Patient, Ward, Team)
+@query_budget(6)
 def list_patients():
-    patients = Patient.query.all()
+    # Server-side filters; empty values mean "no filter"
+    filters = {
+        'q': request.args.get('q', '').strip(),
+        'ward_id': request.args.get('ward_id', type=int),
+        'team_id': request.args.get('team_id', type=int),
+        'status': request.args.get('status', ''),
+    }
+    query = Patient.query.options(joinedload(Patient.assigned_ward), joinedload(Patient.treatment_team))
+    if filters['q']:
+        query = query.filter(Patient.name.icontains(filters['q'], autoescape=True))
+    if filters['ward_id']:
+        query = query.filter(Patient.ward_id == filters['ward_id'])
+    if filters['team_id']:
+        query = query.filter(Patient.team_id == filters['team_id'])
+    if filters['status'] == 'active':
+        query = query.filter(Patient.discharge_date.is_(None))
+    elif filters['status'] == 'discharged':
+        query = query.filter(Patient.discharge_date.isnot(None))
+    per_page = min(max(request.args.get('per_page', PATIENTS_PER_PAGE, type=int), 1), MAX_PATIENTS_PER_PAGE)
+    # Keyset pagination on (admission_date, id), newest first
+    page = keyset_paginate(
+        query,
+        (Patient.admission_date, Patient.id),
+        after=request.args.get('after'),
+        before=request.args.get('before'),
+        per_page=per_page,
+    )
     wards = Ward.query.all()
     teams = Team.query.all()
-    current_date = datetime.now(UTC).strftime('%Y-%m-%d')
-    return render_template('patients/list.html', patients=patients, wards=wards, teams=teams, current_date=current_date)
+    active_filters = {k: v for k, v in filters.items() if v}
+    if 'per_page' in request.args:
+        active_filters['per_page'] = per_page
+    return render_template('patients/list.html', patients=page.items, page=page, filters=filters,
+                           active_filters=active_filters, wards=wards, teams=teams)
 # Add patient route (admin/staff)
 @patients_bp.route('/patients/add', methods=['POST'])
 @login_required
@@ -158,61 +234,25 @@ def add_patient():
     if not (name and age and gender and ward_name and team_id and admission_date):
         flash('All fields are required.', 'danger')
         return redirect(url_for('patients.list_patients'))
-    ward = Ward.query.filter(Ward.name.ilike(ward_name.strip())).first()
+    ward = Ward.query.filter(func.lower(Ward.name) == ward_name.strip().lower()).first()
     if not ward:
         flash('Ward with that name does not exist.', 'danger')
         return redirect(url_for('patients.list_patients'))
     # Gender validation: only enforce if ward.type is 'male' or 'female'
-    if ward.type.lower() in ['male', 'female']:
-        if ward.type.lower() != gender.lower():
-            flash('Selected ward does not match patient gender.', 'danger')
-            return redirect(url_for('patients.list_patients'))
-    # Capacity validation
-    if ward.available_beds() < 1:
-        flash('Selected ward has no available beds.', 'danger')
+    error = ward_gender_error(ward, gender)
+    if error:
+        flash(error, 'danger')
         return redirect(url_for('patients.list_patients'))
     # Team validation: must have at least one Consultant and one Grade 1/Junior doctor
-    import re
-    from app.models import Team, Doctor
     team = Team.query.get(int(team_id))
     if not team:
         flash('Selected team does not exist.', 'danger')
         return redirect(url_for('patients.list_patients'))
-
-    # Normalize and check common variants (case/spacing/short forms)
-    def is_consultant(grade_str):
-        if not grade_str:
-            return False
-        g = grade_str.strip().lower()
-        return bool(re.search(r'consult', g))
-
-    def is_junior(grade_str):
-        if not grade_str:
-            return False
-        g = grade_str.strip().lower()
-        # match 'grade 1', 'grade1', 'g1', 'junior', etc.
-        return bool(re.search(r'grade\s*1|grade1|\bg1\b|junior', g))
-
-    doctor_count = len(team.doctors or [])
-    has_consultant = any(is_consultant(d.grade) for d in team.doctors)
-    has_junior = any(is_junior(d.grade) for d in team.doctors)
-
-    if doctor_count == 0:
-        flash('Selected team has no doctors; please add doctors to the team first.', 'danger')
-        return redirect(url_for('patients.list_patients'))
-    # Prepare readable doctor list for diagnostics
-    doctor_lines = [f"{d.name} ({(d.grade or 'unknown').strip()})" for d in team.doctors]
-    doctor_list_text = '; '.join(doctor_lines) if doctor_lines else 'No doctors'
-    if not has_consultant:
-        flash(f'Selected team must have at least one Consultant (found {doctor_count} doctors). Doctors: {doctor_list_text}', 'danger')
-        return redirect(url_for('patients.list_patients'))
-    if not has_junior:
-        flash(f'Selected team must have at least one Grade 1 / junior doctor (found {doctor_count} doctors). Doctors: {doctor_list_text}', 'danger')
+    error = team_admission_error(team)
+    if error:
+        flash(error, 'danger')
         return redirect(url_for('patients.list_patients'))
-    try:
-        admission_date_obj = datetime.strptime(admission_date, '%Y-%m-%d')
-    except Exception:
-        admission_date_obj = datetime.now(UTC)
+    admission_date_obj = parse_admission_date(admission_date)
     new_patient = Patient(
         name=name,
         age=int(age),
@@ -221,29 +261,71 @@ def add_patient():
         team_id=int(team_id),
         admission_date=admission_date_obj
     )
+    # Capacity validation: reserve the bed last so a rejected admission never
+    # holds one (and after the identifier, which is allocated in its own transaction)
+    if not reserve_bed(ward.id):
+        flash('Selected ward has no available beds.', 'danger')
+        return redirect(url_for('patients.list_patients'))
     db.session.add(new_patient)
-    # Update ward occupancy
-    ward.current_occupancy = ward.current_occupancy + 1
-    db.session.commit()
-    # Audit log
-    audit_logger.info(f"User '{getattr(current_user, 'username', 'unknown')}' admitted patient '{name}' (ID: {new_patient.id}) to ward '{ward.name}' (ID: {ward.id}) on {admission_date_obj.strftime('%Y-%m-%d')}")
+    uow = UnitOfWork()
+    # Audit log (new_patient.id is only known once the insert is flushed)
+    username = getattr(current_user, 'username', 'unknown')
+    uow.audit(lambda: f"User '{username}' admitted patient '{name}' (ID: {new_patient.id}) to ward '{ward.name}' (ID: {ward.id}) on {admission_date_obj.strftime('%Y-%m-%d')}")
     # Activity log
-    activity = ActivityLog(
-        user_id=getattr(current_user, 'id', None),
-        username=getattr(current_user, 'username', 'unknown'),
-        action='Add Patient',
-        details=f"{name} admitted to {ward.name}",
-    )
-    db.session.add(activity)
-    db.session.commit()
+    uow.activity('Add Patient', f"{name} admitted to {ward.name}")
+    uow.on_commit(invalidate_dashboard_snapshot)
+    uow.on_commit(patient_search_index.upsert_patient, new_patient)
+    uow.commit()
     flash('Patient added successfully.', 'success')
     return redirect(url_for('patients.list_patients'))
 
 
+# Bulk admission (admin/staff): CSV or NDJSON with the add_patient fields, either
+# as a multipart 'file' upload or as the raw request body. The response streams
+# one NDJSON line per input row, then a summary line.
+@patients_bp.route('/patients/import', methods=['POST'])
+@login_required
+@roles_required('admin', 'staff')
+def import_patients():
+    upload = request.files.get('file')
+    if upload:
+        fmt = detect_format(upload.filename, upload.mimetype)
+        # Uploaded files are closed once the view returns; take this one over
+        # so the streamed response can keep reading it
+        stream, upload.stream = upload.stream, io.BytesIO()
+    else:
+        stream, fmt = request.stream, detect_format(mimetype=request.mimetype)
+    fmt = request.args.get('format', fmt)
+    if fmt not in IMPORT_FORMATS:
+        return jsonify({'error': f"Unsupported format '{fmt}'; use one of: {', '.join(IMPORT_FORMATS)}"}), 400
+    importer = AdmissionImporter(
+        chunk_size=current_app.config.get('PATIENT_IMPORT_CHUNK_SIZE'),
+        user_id=current_user.id,
+        username=current_user.username,
+    )
+
+    def generate():
+        try:
+            for result in importer.run(read_rows(stream, fmt)):
+                yield json.dumps(result.to_dict()) + '\n'
+            yield json.dumps({'summary': importer.summary()}) + '\n'
+        finally:
+            if upload:
+                stream.close()
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+
 @patients_bp.route('/patients/<int:id>')
 @login_required
+@query_budget(7)
 def patient_details(id):
-    patient = Patient.query.get_or_404(id)
+    patient = Patient.query.options(
+        joinedload(Patient.assigned_ward),
+        joinedload(Patient.treatment_team),
+        selectinload(Patient.treatment_logs).joinedload(TreatmentLog.doctor),
+        selectinload(Patient.treatment_logs).joinedload(TreatmentLog.nurse),
+    ).get_or_404(id)
     from app.models import Nurse
     nurses = Nurse.query.filter_by(team_id=patient.team_id).all()
     return render_template('patients/detail.html', patient=patient, nurses=nurses)
@@ -258,22 +340,18 @@ def delete_patient(id):
     # Update ward occupancy if patient was assigned to a ward
     try:
         ward = patient.assigned_ward
-        if ward and ward.current_occupancy > 0:
-            ward.current_occupancy = max(0, ward.current_occupancy - 1)
+        if ward:
+            release_bed(ward.id)
     except Exception:
         # If anything goes wrong reading the relationship, continue with delete to avoid blocking admin actions
         ward = None
     db.session.delete(patient)
-    db.session.commit()
+    uow = UnitOfWork()
     # Activity log
-    activity = ActivityLog(
-        user_id=getattr(current_user, 'id', None),
-        username=getattr(current_user, 'username', 'unknown'),
-        action='Delete Patient',
-        details=f"{patient.name} deleted from {ward.name if ward else 'unknown'}",
-    )
-    db.session.add(activity)
-    db.session.commit()
+    uow.activity('Delete Patient', f"{patient.name} deleted from {ward.name if ward else 'unknown'}")
+    uow.on_commit(invalidate_dashboard_snapshot)
+    uow.on_commit(patient_search_index.remove_patient, patient.id)
+    uow.commit()
     flash('Patient deleted successfully.', 'success')
     return redirect(url_for('patients.list_patients'))
 
@@ -287,17 +365,18 @@ def discharge_patient(id):
         flash('Patient is already discharged.', 'info')
     else:
         patient.discharge_date = datetime.now(UTC)
-        db.session.commit()
+        uow = UnitOfWork()
         # Audit log
-        audit_logger.info(f"User '{getattr(current_user, 'username', 'unknown')}' discharged patient '{patient.name}' (ID: {patient.id}) from ward '{patient.assigned_ward.name if patient.assigned_ward else 'unknown'}' (ID: {patient.assigned_ward.id if patient.assigned_ward else 'unknown'}) on {patient.discharge_date.strftime('%Y-%m-%d %H:%M:%S')}")
+        uow.audit(f"User '{getattr(current_user, 'username', 'unknown')}' discharged patient '{patient.name}' (ID: {patient.id}) from ward '{patient.assigned_ward.name if patient.assigned_ward else 'unknown'}' (ID: {patient.assigned_ward.id if patient.assigned_ward else 'unknown'}) on {patient.discharge_date.strftime('%Y-%m-%d %H:%M:%S')}")
         # Activity log
-        activity = ActivityLog(
+        uow.activity(
+            'Discharge Patient',
+            f"{patient.name} discharged from {patient.assigned_ward.name if patient.assigned_ward else 'unknown'}",
             user_id=patient.id,  # Log as patient, not admin
             username=patient.name,  # Show patient name in activity feed
-            action='Discharge Patient',
-            details=f"{patient.name} discharged from {patient.assigned_ward.name if patient.assigned_ward else 'unknown'}",
         )
-        db.session.add(activity)
-        db.session.commit()
+        uow.on_commit(invalidate_dashboard_snapshot)
+        uow.on_commit(patient_search_index.upsert_patient, patient)
+        uow.commit()
         flash('Patient discharged successfully.', 'success')
     return redirect(url_for('patients.list_patients'))
\ No newline at end of file
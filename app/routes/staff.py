@@ -1,7 +1,10 @@
 from flask import Blueprint, render_template, redirect, url_for, flash, request
 from flask_login import login_required
+from sqlalchemy.orm import joinedload
 from app.models import User, Doctor, Nurse, Technician, Team, db
 from app.utils import roles_required
+from app.dashboard_stats import invalidate_dashboard_snapshot
+from app.http_cache import conditional_get
 
 # ----------------- Blueprint -----------------
 staff_bp = Blueprint('staff', __name__)
@@ -10,11 +13,12 @@ staff_bp = Blueprint('staff', __name__)
 @staff_bp.route('/staff')
 @login_required
 @roles_required('admin')
+@conditional_get(User, Doctor, Nurse, Technician, Team)
 def staff_list():
     users = User.query.all()
-    doctors = Doctor.query.all()
+    doctors = Doctor.query.options(joinedload(Doctor.medical_team)).all()
     technicians = Technician.query.all()
-    nurses = Nurse.query.all()
+    nurses = Nurse.query.options(joinedload(Nurse.user)).all()
     teams = Team.query.all()
 
     # Map nurses to their user accounts
@@ -23,8 +27,8 @@ def staff_list():
             'id': n.id,
             'name': n.name,
             'grade': n.grade,
-            'username': (User.query.get(n.user_id).username if n.user_id else ''),
-            'email': (User.query.get(n.user_id).email if n.user_id else '')
+            'username': n.user.username if n.user else '',
+            'email': n.user.email if n.user else ''
         }
         for n in nurses
     ]
@@ -75,6 +79,7 @@ def add_doctor():
         )
         db.session.add(new_doctor)
         db.session.commit()
+        invalidate_dashboard_snapshot()
         flash('Doctor added successfully!', 'success')
     except Exception as e:
         db.session.rollback()
@@ -90,6 +95,7 @@ def delete_doctor(id):
     try:
         db.session.delete(doctor)
         db.session.commit()
+        invalidate_dashboard_snapshot()
         flash('Doctor deleted successfully!', 'success')
     except Exception as e:
         db.session.rollback()
@@ -120,6 +126,7 @@ def add_nurse():
         new_nurse = Nurse(name=name, grade=grade, user_id=int(user_id) if user_id else None)
         db.session.add(new_nurse)
         db.session.commit()
+        invalidate_dashboard_snapshot()
         flash('Nurse added successfully!', 'success')
     except Exception as e:
         db.session.rollback()
@@ -135,6 +142,7 @@ def delete_nurse(id):
     try:
         db.session.delete(nurse)
         db.session.commit()
+        invalidate_dashboard_snapshot()
         flash('Nurse deleted successfully!', 'success')
     except Exception as e:
         db.session.rollback()
@@ -165,6 +173,7 @@ def add_technician():
         new_tech = Technician(name=name, specialization=specialization, user_id=int(user_id) if user_id else None)
         db.session.add(new_tech)
         db.session.commit()
+        invalidate_dashboard_snapshot()
         flash('Technician added successfully.', 'success')
     except Exception as e:
         db.session.rollback()
@@ -180,6 +189,7 @@ def delete_technician(id):
     try:
         db.session.delete(tech)
         db.session.commit()
+        invalidate_dashboard_snapshot()
         flash('Technician deleted successfully.', 'success')
     except Exception as e:
         db.session.rollback()
@@ -1,7 +1,12 @@
 from flask import Blueprint, render_template, redirect, url_for, flash, request
 from flask_login import login_required, current_user
-from app.models import Team, db
+from app.models import Team, Doctor, db
 from app.utils import roles_required
+from app.sql_instrumentation import query_budget
+from app.db_routing import read_replica
+from app.http_cache import conditional_get
+from app.dashboard_stats import invalidate_dashboard_snapshot
+from app.search_index import patient_search_index
 teams_bp = Blueprint('teams', __name__)
 
 @teams_bp.route('/teams/<int:id>/edit', methods=['POST'])
@@ -22,12 +27,13 @@ def edit_team(id):
     team.name = name
     team.specialization = specialization
     db.session.flush()
-    junior_doctors = [d for d in team.doctors if d.grade and (('grade 1' in d.grade.lower()) or ('junior' in d.grade.lower()) or ('g1' in d.grade.lower()))]
-    if not junior_doctors:
+    if not team.grade1_count:
         db.session.rollback()
         flash('Each team must have at least one Grade-1/junior doctor.', 'danger')
         return redirect(url_for('teams.list_teams'))
     db.session.commit()
+    invalidate_dashboard_snapshot()
+    patient_search_index.upsert_team(team.id, team.name)
     flash('Team updated successfully.', 'success')
     return redirect(url_for('teams.list_teams'))
 
@@ -41,6 +47,8 @@ def delete_team(id):
         abort(404)
     db.session.delete(team)
     db.session.commit()
+    invalidate_dashboard_snapshot()
+    patient_search_index.upsert_team(id, None)
     flash('Team deleted successfully.', 'success')
     return redirect(url_for('teams.list_teams'))
 
@@ -48,9 +56,18 @@ def delete_team(id):
 
 @teams_bp.route('/teams')
 @login_required
+@conditional_get(Team, Doctor)
+@read_replica
 def list_teams():
-    teams = Team.query.all()
-    return render_template('teams/list.html', teams=teams, current_user=current_user)
+    # ?ready=1 lists teams that can take patients, ?ready=0 those that cannot
+    ready = request.args.get('ready', '')
+    query = Team.query
+    if ready == '1':
+        query = query.filter(Team.admission_ready)
+    elif ready == '0':
+        query = query.filter(~Team.admission_ready)
+    teams = query.all()
+    return render_template('teams/list.html', teams=teams, ready=ready, current_user=current_user)
 
 # Add team route (admin/staff)
 @teams_bp.route('/teams/add', methods=['POST'])
@@ -66,17 +83,19 @@ def add_team():
     new_team = Team(code=code, name=name, specialization=specialization)
     db.session.add(new_team)
     db.session.flush()  # get new_team.id
-    junior_doctors = [d for d in new_team.doctors if d.grade and (('grade 1' in d.grade.lower()) or ('junior' in d.grade.lower()) or ('g1' in d.grade.lower()))]
-    if not junior_doctors:
+    if not new_team.grade1_count:
         db.session.rollback()
         flash('Each team must have at least one Grade-1/junior doctor.', 'danger')
         return redirect(url_for('teams.list_teams'))
     db.session.commit()
+    invalidate_dashboard_snapshot()
+    patient_search_index.upsert_team(new_team.id, new_team.name)
     flash('Team added successfully.', 'success')
     return redirect(url_for('teams.list_teams'))
 
 @teams_bp.route('/teams/<int:id>')
 @login_required
+@query_budget(6)
 def team_details(id):
     team = db.session.get(Team, id)
     if not team:
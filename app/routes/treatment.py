@@ -1,6 +1,9 @@
 from flask import Blueprint, request, redirect, url_for, flash
 from flask_login import login_required, current_user
 from app.models import db, Patient, Doctor, TreatmentLog
+from app.dashboard_stats import invalidate_dashboard_snapshot
+from app.treatment_rollup import record_treatment
+from datetime import datetime, UTC
 
 treatment_bp = Blueprint('treatment', __name__)
 
@@ -28,15 +31,20 @@ def treat_patient(patient_id):
     if nurse_id:
         from app.models import Nurse
         nurse = db.session.get(Nurse, nurse_id)
+    treated_at = datetime.now(UTC)
     log = TreatmentLog(
         patient_id=patient.id,
         doctor_id=doctor.id,
+        treatment_time=treated_at,
         notes=notes,
         medication=medication,
         dosage=dosage,
         nurse_id=nurse.id if nurse else None
     )
     db.session.add(log)
+    # Keep the daily rollup in step, in the same transaction
+    record_treatment(treated_at.date(), doctor.id, patient.team_id, patient.ward_id)
     db.session.commit()
+    invalidate_dashboard_snapshot()
     flash('Treatment recorded successfully.', 'success')
     return redirect(url_for('patients.patient_details', id=patient_id))
@@ -2,6 +2,11 @@ from flask import Blueprint, render_template, redirect, url_for, flash, request
 from flask_login import login_required, current_user
 from app.models import Ward, db
 from app.utils import roles_required
+from app.sql_instrumentation import query_budget
+from app.db_routing import read_replica
+from app.http_cache import conditional_get
+from app.dashboard_stats import invalidate_dashboard_snapshot
+from app.search_index import patient_search_index
 wards_bp = Blueprint('wards', __name__)
 
 @wards_bp.route('/wards/<int:id>/edit', methods=['POST'])
@@ -27,6 +32,8 @@ def edit_ward(id):
     ward.type = type_
     ward.capacity = capacity
     db.session.commit()
+    invalidate_dashboard_snapshot()
+    patient_search_index.upsert_ward(ward.id, ward.name)
     flash('Ward updated successfully.', 'success')
     return redirect(url_for('wards.list_wards'))
 
@@ -40,6 +47,8 @@ def delete_ward(id):
         abort(404)
     db.session.delete(ward)
     db.session.commit()
+    invalidate_dashboard_snapshot()
+    patient_search_index.upsert_ward(id, None)
     flash('Ward deleted successfully.', 'success')
     return redirect(url_for('wards.list_wards'))
 
@@ -47,6 +56,8 @@ def delete_ward(id):
 
 @wards_bp.route('/wards')
 @login_required
+@conditional_get(Ward)
+@read_replica
 def list_wards():
     wards = Ward.query.all()
     # Filter full wards in Python for template use
@@ -72,11 +83,14 @@ def add_ward():
     new_ward = Ward(name=name, type=type_, capacity=capacity, current_occupancy=0)
     db.session.add(new_ward)
     db.session.commit()
+    invalidate_dashboard_snapshot()
+    patient_search_index.upsert_ward(new_ward.id, new_ward.name)
     flash('Ward added successfully.', 'success')
     return redirect(url_for('wards.list_wards'))
 
 @wards_bp.route('/wards/<int:id>')
 @login_required
+@query_budget(5)
 def ward_details(id):
     ward = db.session.get(Ward, id)
     if not ward:
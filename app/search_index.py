@@ -0,0 +1,467 @@
+import bisect
+import heapq
+import itertools
+import logging
+import re
+import threading
+import time
+from collections import Counter
+from typing import NamedTuple
+
+from flask import current_app
+from sqlalchemy import select
+
+from app import db
+from app.models import Patient, Ward, Team
+
+logger = logging.getLogger(__name__)
+
+_TOKEN_RE = re.compile(r'[a-z0-9]+')
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 50
+# Minimum share of the query's trigrams a name must contain to count as a fuzzy match
+TRIGRAM_THRESHOLD = 0.5
+# Per-term relevance weights
+EXACT_TOKEN_WEIGHT = 10
+PREFIX_WEIGHT = 6
+FUZZY_WEIGHT = 4
+GROUP_WEIGHT = 2
+IDENTIFIER_BONUS = 100
+NAME_PHRASE_BONUS = 20
+ACTIVE_TIEBREAK = 0.01
+# Cap on the candidate patients scored for one query. A term matching more
+# (a one-letter prefix, a common surname) is read best-first: first-name
+# matches before other tokens, exact tokens before longer ones and active
+# admissions before discharged ones, so the cap only drops lower-ranked or
+# equally ranked patients
+MATCH_SCAN_LIMIT = 1000
+
+
+def tokenize(text):
+    return _TOKEN_RE.findall((text or '').lower())
+
+
+def trigrams(token):
+    padded = f'  {token} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class _Entry(NamedTuple):
+    name: str
+    identifier: str
+    ward_id: int
+    team_id: int
+    discharged: bool
+    name_key: str
+    identifier_key: str
+    tokens: tuple  # name tokens, then identifier tokens
+    lead: str | None  # first name token
+
+
+class _TermMatch(NamedTuple):
+    term: str
+    ward_ids: set
+    team_ids: set
+    fuzzy: dict | None  # patient_id -> score, when the term matches no token
+
+
+class _PrefixIndex:
+    """token -> set of keys, with sorted tokens for prefix range lookups.
+
+    Can be read while one writer changes it: the sorted token list is
+    replaced rather than edited in place, and readers copy a key set
+    (tuple()) before iterating it.
+    """
+
+    def __init__(self):
+        self.postings = {}
+        self.tokens = []
+        # While deferred (still loading, not read by anyone), new tokens are
+        # only sorted once by finalize()
+        self.deferred = False
+
+    def add(self, token, key):
+        keys = self.postings.get(token)
+        if keys is None:
+            keys = self.postings[token] = set()
+            if not self.deferred:
+                i = bisect.bisect_left(self.tokens, token)
+                self.tokens = self.tokens[:i] + [token] + self.tokens[i:]
+        keys.add(key)
+
+    def finalize(self):
+        self.tokens = sorted(self.postings)
+        self.deferred = False
+
+    def discard(self, token, key):
+        keys = self.postings.get(token)
+        if keys is None:
+            return
+        keys.discard(key)
+        if not keys:
+            del self.postings[token]
+            i = bisect.bisect_left(self.tokens, token)
+            if i < len(self.tokens) and self.tokens[i] == token:
+                self.tokens = self.tokens[:i] + self.tokens[i + 1:]
+
+    def prefix(self, term):
+        """Yield (token, keys) for every token starting with term, in token order."""
+        tokens = self.tokens
+        i = bisect.bisect_left(tokens, term)
+        while i < len(tokens) and tokens[i].startswith(term):
+            keys = self.postings.get(tokens[i])
+            if keys:
+                yield tokens[i], keys
+            i += 1
+
+
+class _Index:
+    """One generation of the search index; PatientSearchIndex swaps whole generations.
+
+    Names and identifiers are indexed by token prefix plus name trigrams for
+    typo-tolerant matches. Token postings are split by whether the token is
+    the patient's first name token and whether the patient is discharged,
+    so the best matches of a broad term can be read first. Ward and team
+    names are indexed once per ward/team and joined to patients through
+    ward_id/team_id, so renaming a ward does not touch its patients.
+
+    One writer at a time; searches may run alongside it, as every change is
+    a single container operation and searches copy what they iterate.
+    """
+
+    def __init__(self):
+        self.patients = {}  # id -> _Entry
+        # (is first name token, discharged) -> token postings
+        self.patient_tokens = {(lead, discharged): _PrefixIndex()
+                               for lead in (True, False) for discharged in (False, True)}
+        self.identifiers = {}  # lowercased identifier -> id
+        self.name_trigrams = {}
+        self.by_ward = {}
+        self.by_team = {}
+        self.wards = {}
+        self.teams = {}
+        self.ward_tokens = _PrefixIndex()
+        self.team_tokens = _PrefixIndex()
+
+    # -- maintenance -------------------------------------------------------
+    def load(self):
+        """Fill this (empty) index from the database."""
+        for ward_id, name in db.session.execute(select(Ward.id, Ward.name)):
+            self._set_named(self.wards, self.ward_tokens, ward_id, name)
+        for team_id, name in db.session.execute(select(Team.id, Team.name)):
+            self._set_named(self.teams, self.team_tokens, team_id, name)
+        rows = db.session.execute(select(
+            Patient.id, Patient.name, Patient.patient_identifier,
+            Patient.ward_id, Patient.team_id, Patient.discharge_date,
+        ).execution_options(yield_per=5000))
+        for tokens in self.patient_tokens.values():
+            tokens.deferred = True
+        for pid, name, identifier, ward_id, team_id, discharge_date in rows:
+            self._add_patient(pid, name, identifier, ward_id, team_id, discharge_date is not None)
+        for tokens in self.patient_tokens.values():
+            tokens.finalize()
+
+    @staticmethod
+    def _identifier_tokens(identifier):
+        tokens = set(tokenize(identifier))
+        # P0042 is also found by typing 0042
+        tokens.update(t.lstrip('abcdefghijklmnopqrstuvwxyz') for t in list(tokens))
+        tokens.discard('')
+        return tokens
+
+    def _add_patient(self, pid, name, identifier, ward_id, team_id, discharged):
+        name_tokens = tokenize(name)
+        tokens = tuple(dict.fromkeys(name_tokens + sorted(self._identifier_tokens(identifier))))
+        entry = _Entry(name, identifier, ward_id, team_id, discharged, ' '.join(name_tokens),
+                       (identifier or '').lower(), tokens, name_tokens[0] if name_tokens else None)
+        self.patients[pid] = entry
+        for token in tokens:
+            self.patient_tokens[token == entry.lead, discharged].add(token, pid)
+        if entry.identifier_key:
+            self.identifiers[entry.identifier_key] = pid
+        for token in name_tokens:
+            for gram in trigrams(token):
+                self.name_trigrams.setdefault(gram, set()).add(pid)
+        self.by_ward.setdefault(ward_id, set()).add(pid)
+        self.by_team.setdefault(team_id, set()).add(pid)
+
+    def _remove_patient(self, pid):
+        entry = self.patients.pop(pid, None)
+        if entry is None:
+            return
+        for token in entry.tokens:
+            self.patient_tokens[token == entry.lead, entry.discharged].discard(token, pid)
+        if self.identifiers.get(entry.identifier_key) == pid:
+            del self.identifiers[entry.identifier_key]
+        for token in tokenize(entry.name):
+            for gram in trigrams(token):
+                ids = self.name_trigrams.get(gram)
+                if ids is not None:
+                    ids.discard(pid)
+                    if not ids:
+                        del self.name_trigrams[gram]
+        self.by_ward.get(entry.ward_id, set()).discard(pid)
+        self.by_team.get(entry.team_id, set()).discard(pid)
+
+    @staticmethod
+    def _set_named(names, token_index, key, name):
+        old = names.get(key)
+        if old is not None:
+            for token in set(tokenize(old)):
+                token_index.discard(token, key)
+        if name is None:
+            names.pop(key, None)
+            return
+        names[key] = name
+        for token in set(tokenize(name)):
+            token_index.add(token, key)
+
+    def upsert_patient(self, pid, name, identifier, ward_id, team_id, discharged):
+        self._remove_patient(pid)
+        self._add_patient(pid, name, identifier, ward_id, team_id, discharged)
+
+    def remove_patient(self, pid):
+        self._remove_patient(pid)
+
+    def upsert_ward(self, ward_id, name):
+        self._set_named(self.wards, self.ward_tokens, ward_id, name)
+
+    def upsert_team(self, team_id, name):
+        self._set_named(self.teams, self.team_tokens, team_id, name)
+
+    # -- querying ----------------------------------------------------------
+    def _term_matches(self, term):
+        """Match one query term against ward/team names, and names approximately if no token matches."""
+        ward_ids = set().union(*(tuple(keys) for _, keys in self.ward_tokens.prefix(term)))
+        team_ids = set().union(*(tuple(keys) for _, keys in self.team_tokens.prefix(term)))
+        fuzzy = None
+        has_token = any(next(tokens.prefix(term), None) for tokens in self.patient_tokens.values())
+        if not (has_token or ward_ids or team_ids) and len(term) >= 3:
+            # Fuzzy fallback: names sharing enough trigrams with the term
+            grams = trigrams(term)
+            overlap = Counter()
+            for gram in grams:
+                overlap.update(tuple(self.name_trigrams.get(gram, ())))
+            needed = TRIGRAM_THRESHOLD * len(grams)
+            fuzzy = {pid: FUZZY_WEIGHT * hits / len(grams) for pid, hits in overlap.items() if hits >= needed}
+        return _TermMatch(term, ward_ids, team_ids, fuzzy)
+
+    @staticmethod
+    def _term_score(match, entry, pid):
+        if match.fuzzy is not None:
+            return match.fuzzy.get(pid)
+        score = None
+        for token in entry.tokens:
+            if token == match.term:
+                return EXACT_TOKEN_WEIGHT
+            if token.startswith(match.term):
+                score = PREFIX_WEIGHT
+        if score is None and (entry.ward_id in match.ward_ids or entry.team_id in match.team_ids):
+            score = GROUP_WEIGHT
+        return score
+
+    def _match_size(self, match):
+        """Patients matching the term, counted up to MATCH_SCAN_LIMIT."""
+        if match.fuzzy is not None:
+            return len(match.fuzzy)
+        size = (sum(len(self.by_ward.get(w, ())) for w in match.ward_ids)
+                + sum(len(self.by_team.get(t, ())) for t in match.team_ids))
+        for tokens in self.patient_tokens.values():
+            for _, keys in tokens.prefix(match.term):
+                size += len(keys)
+                if size >= MATCH_SCAN_LIMIT:
+                    return size
+        return size
+
+    def _candidates(self, match):
+        """Patients matching the term, best-ranked first; may repeat a patient."""
+        term = match.term
+        if match.fuzzy is not None:
+            yield from sorted(match.fuzzy, key=match.fuzzy.get, reverse=True)
+        for lead in (True, False):
+            for exact in (True, False):
+                for discharged in (False, True):
+                    tokens = self.patient_tokens[lead, discharged]
+                    if exact:
+                        yield from tuple(tokens.postings.get(term, ()))
+                        continue
+                    for token, keys in tokens.prefix(term):
+                        if token != term:
+                            yield from tuple(keys)
+        # Ward/team-only members all tie on this term
+        for groups, keys in ((self.by_ward, match.ward_ids), (self.by_team, match.team_ids)):
+            for key in keys:
+                yield from tuple(groups.get(key, ()))
+
+    def search(self, query, limit=DEFAULT_LIMIT):
+        """Return up to `limit` ranked result dicts for a free-text query.
+
+        Every term must match (as a token prefix, a ward/team name prefix or,
+        failing both, a fuzzy name match). Candidates are read best-first
+        from the most selective term, at most MATCH_SCAN_LIMIT of them, and
+        checked against the others.
+        """
+        terms = tokenize(query)
+        if not terms:
+            return []
+        limit = max(1, min(limit, MAX_LIMIT))
+        matches = [self._term_matches(t) for t in terms]
+        driver = min(matches, key=self._match_size)
+        phrase = ' '.join(terms)
+        compact = ''.join(terms)
+        patients = self.patients
+        identified = self.identifiers.get(compact)
+        candidates = self._candidates(driver)
+        if identified is not None:
+            candidates = itertools.chain((identified,), candidates)
+        seen = set()
+        ranked = []
+        for pid in candidates:
+            if pid in seen:
+                continue
+            seen.add(pid)
+            if len(seen) > MATCH_SCAN_LIMIT:
+                break
+            entry = patients.get(pid)
+            if entry is None:
+                continue  # removed since the candidates were read
+            score = 0
+            for match in matches:
+                term_score = self._term_score(match, entry, pid)
+                if term_score is None:
+                    break
+                score += term_score
+            else:
+                if entry.identifier_key == compact:
+                    score += IDENTIFIER_BONUS
+                elif entry.name_key.startswith(phrase):
+                    score += NAME_PHRASE_BONUS
+                # Active admissions before discharged ones
+                if not entry.discharged:
+                    score += ACTIVE_TIEBREAK
+                ranked.append((score, pid, entry))
+        best = heapq.nlargest(limit, ranked, key=lambda item: item[0])
+        return [self._result(pid, entry) for _, pid, entry in best]
+
+    def _result(self, pid, entry):
+        return {
+            'id': pid,
+            'name': entry.name,
+            'patient_identifier': entry.identifier,
+            'ward': self.wards.get(entry.ward_id),
+            'team': self.teams.get(entry.team_id),
+            'discharged': entry.discharged,
+        }
+
+
+class PatientSearchIndex:
+    """In-process typeahead index over patient name, identifier, ward and team.
+
+    Write routes keep the index current through upsert_patient()/
+    remove_patient()/upsert_ward()/upsert_team(). The index is built on
+    first use and rebuilt in a background thread once it is older than
+    `ttl` seconds, to pick up writes made by other worker processes. A
+    rebuild fills a new generation without holding the lock; searches keep
+    using the old one until it is swapped in, and writes made meanwhile are
+    replayed onto the new one first. Searches never take the lock.
+    """
+
+    def __init__(self):
+        # Serializes writes to the current generation and the swap
+        self._lock = threading.Lock()
+        # Only one rebuild at a time
+        self._build_lock = threading.Lock()
+        self._index = None
+        self._built_at = None
+        self._pending = None  # changes made while a rebuild is loading
+        self._refreshing = False
+
+    # -- maintenance -------------------------------------------------------
+    def rebuild(self):
+        """Load a new generation from the database and swap it in."""
+        self._rebuild_if(self._built_at)
+
+    def _rebuild_if(self, built_at):
+        with self._build_lock:
+            if self._built_at != built_at:
+                return  # someone else rebuilt while we waited
+            with self._lock:
+                self._pending = []
+            fresh = _Index()
+            try:
+                fresh.load()
+            finally:
+                with self._lock:
+                    pending, self._pending = self._pending, None
+            with self._lock:
+                for change in pending:
+                    change(fresh)
+                self._index = fresh
+                self._built_at = time.monotonic()
+
+    def _refresh_in_background(self, built_at):
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+        app = current_app._get_current_object()
+
+        def refresh():
+            try:
+                with app.app_context():
+                    self._rebuild_if(built_at)
+            except Exception:
+                logger.exception('Rebuilding the patient search index failed')
+            finally:
+                self._refreshing = False
+
+        threading.Thread(target=refresh, name='patient-search-index', daemon=True).start()
+
+    def invalidate(self):
+        """Drop the index; it is rebuilt on the next search."""
+        with self._lock:
+            self._index = None
+            self._built_at = None
+
+    def ensure_built(self, ttl=None):
+        built_at = self._built_at
+        if built_at is None:
+            # Nothing to serve yet: the first search waits for the build
+            self._rebuild_if(None)
+        elif ttl and time.monotonic() - built_at > ttl:
+            self._refresh_in_background(built_at)
+
+    def _apply(self, change):
+        with self._lock:
+            if self._index is not None:
+                change(self._index)
+            if self._pending is not None:
+                self._pending.append(change)
+
+    def upsert_patient(self, patient):
+        # Read now: the patient object may be expired or detached by the time a change is replayed
+        values = (patient.id, patient.name, patient.patient_identifier,
+                  patient.ward_id, patient.team_id, patient.discharge_date is not None)
+        self._apply(lambda index: index.upsert_patient(*values))
+
+    def remove_patient(self, patient_id):
+        self._apply(lambda index: index.remove_patient(patient_id))
+
+    def upsert_ward(self, ward_id, name):
+        """Index a ward's (new) name; pass name=None when the ward is deleted."""
+        self._apply(lambda index: index.upsert_ward(ward_id, name))
+
+    def upsert_team(self, team_id, name):
+        """Index a team's (new) name; pass name=None when the team is deleted."""
+        self._apply(lambda index: index.upsert_team(team_id, name))
+
+    # -- querying ----------------------------------------------------------
+    def search(self, query, limit=DEFAULT_LIMIT):
+        """Return up to `limit` ranked result dicts for a free-text query (see _Index.search)."""
+        index = self._index
+        if index is None:
+            return []
+        return index.search(query, limit=limit)
+
+
+patient_search_index = PatientSearchIndex()
@@ -0,0 +1,161 @@
+import random
+from datetime import datetime, timedelta, UTC
+
+from sqlalchemy import bindparam, func, insert, select, update
+
+from app import db
+from app.identifiers import patient_identifiers
+from app.models import (User, Ward, Team, Doctor, Nurse, Patient, TreatmentLog,
+                        GRADE_CONSULTANT, GRADE_1, GRADE_OTHER, team_readiness_update)
+from app.treatment_rollup import rebuild_treatment_rollup
+
+FIRST_NAMES = ['James', 'Mary', 'Ahmed', 'Fatima', 'Wei', 'Olga', 'Carlos', 'Aisha', 'John', 'Priya',
+               'Liam', 'Sofia', 'Noah', 'Amara', 'Hiro', 'Elena', 'Omar', 'Grace', 'Ivan', 'Zara']
+LAST_NAMES = ['Smith', 'Khan', 'Garcia', 'Chen', 'Okafor', 'Ivanova', 'Brown', 'Rahman', 'Silva', 'Patel',
+              'Müller', 'Kowalski', 'Nguyen', 'Haddad', 'Jones', 'Tanaka', 'Rossi', 'Dubois', 'Ali', 'Moreno']
+SPECIALIZATIONS = ['Cardiology', 'Orthopaedics', 'Neurology', 'Oncology', 'Paediatrics', 'General Surgery']
+MEDICATIONS = [('Paracetamol', '500mg'), ('Amoxicillin', '250mg'), ('Ibuprofen', '400mg'),
+               ('Morphine', '10mg'), ('Insulin', '10 units'), ('Saline', '1L')]
+WARD_TYPES = ['male', 'female', 'mixed']
+# Share of each ward's beds filled by active patients; the rest are discharged
+TARGET_OCCUPANCY = 0.85
+CHUNK_ROWS = 10000
+
+
+def _name(rng):
+    return f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}'
+
+
+def _insert_chunked(model, rows):
+    for start in range(0, len(rows), CHUNK_ROWS):
+        db.session.execute(insert(model), rows[start:start + CHUNK_ROWS])
+        db.session.commit()
+
+
+def _new_ids(model, after_id):
+    return db.session.execute(select(model.id).where(model.id > after_id).order_by(model.id)).scalars().all()
+
+
+def _max_id(model):
+    return db.session.execute(select(func.coalesce(func.max(model.id), 0))).scalar()
+
+
+def seed_hospital(wards, patients, treatments, teams=None, seed=None, echo=print):
+    """Bulk-generate a synthetic hospital on top of whatever the database already holds.
+
+    Every team gets a valid doctor mix (at least one Consultant and one
+    Grade 1) and three nurses. Patients fill compatible wards up to
+    TARGET_OCCUPANCY of their capacity and the remainder are discharged.
+    Treatments go to random patients, by a doctor of the patient's team,
+    between admission and discharge (or now). Rows are written with
+    multi-row INSERTs committed every CHUNK_ROWS rows; ward occupancy, team
+    readiness and the treatment rollup are brought up to date at the end.
+    """
+    rng = random.Random(seed)
+    now = datetime.now(UTC).replace(tzinfo=None)
+    teams = teams or max(1, wards // 2)
+    run = f'{_max_id(Ward) + 1:04d}'
+
+    # Wards
+    last_ward = _max_id(Ward)
+    _insert_chunked(Ward, [
+        {'name': f'Seed {run}-{i:04d}', 'type': WARD_TYPES[i % len(WARD_TYPES)],
+         'capacity': rng.randint(20, 60), 'current_occupancy': 0}
+        for i in range(1, wards + 1)
+    ])
+    ward_rows = db.session.execute(
+        select(Ward.id, Ward.type, Ward.capacity).where(Ward.id > last_ward)
+    ).all()
+    echo(f'{len(ward_rows)} wards')
+
+    # Teams, each with a valid doctor mix, and their nurses
+    last_team = _max_id(Team)
+    _insert_chunked(Team, [
+        {'code': f'S{last_team + i}', 'name': f'{rng.choice(SPECIALIZATIONS)} Team {last_team + i}',
+         'specialization': rng.choice(SPECIALIZATIONS)}
+        for i in range(1, teams + 1)
+    ])
+    team_ids = _new_ids(Team, last_team)
+    last_doctor = _max_id(Doctor)
+    doctor_rows, nurse_rows = [], []
+    for team_id in team_ids:
+        grades = ([('Consultant', GRADE_CONSULTANT)] * rng.randint(1, 2)
+                  + [('Grade 1', GRADE_1)] * rng.randint(1, 2)
+                  + [('Registrar', GRADE_OTHER)] * rng.randint(0, 2))
+        for grade, category in grades:
+            doctor_rows.append({'name': f'Dr. {_name(rng)}', 'grade': grade, 'grade_category': category,
+                                'specialization': rng.choice(SPECIALIZATIONS), 'team_id': team_id})
+        for _ in range(3):
+            nurse_rows.append({'name': _name(rng), 'grade': rng.choice(['Band 5', 'Band 6', 'Band 7']),
+                               'team_id': team_id})
+    _insert_chunked(Doctor, doctor_rows)
+    last_nurse = _max_id(Nurse)
+    _insert_chunked(Nurse, nurse_rows)
+    db.session.execute(team_readiness_update(team_ids))
+    db.session.commit()
+    doctors_by_team = {}
+    for doctor_id, team_id in db.session.execute(
+            select(Doctor.id, Doctor.team_id).where(Doctor.id > last_doctor)):
+        doctors_by_team.setdefault(team_id, []).append(doctor_id)
+    echo(f'{len(team_ids)} teams, {len(doctor_rows)} doctors, {len(nurse_rows)} nurses')
+
+    # Give the default doctor/nurse accounts a staff record so their dashboards have data
+    for role, model, first_id in (('doctor', Doctor, last_doctor), ('nurse', Nurse, last_nurse)):
+        user_id = db.session.execute(select(User.id).where(User.username == role)).scalar()
+        if user_id and not db.session.execute(select(model.id).where(model.user_id == user_id)).first():
+            db.session.execute(update(model).where(model.id == first_id + 1).values(user_id=user_id))
+    db.session.commit()
+
+    # Patients: active ones fill compatible wards, the rest are discharged
+    free = {ward_id: int(capacity * TARGET_OCCUPANCY) for ward_id, _, capacity in ward_rows}
+    by_gender = {
+        gender: [ward_id for ward_id, ward_type, _ in ward_rows if ward_type in (gender, 'mixed')]
+        for gender in ('male', 'female')
+    }
+    last_patient = _max_id(Patient)
+    for start in range(0, patients, CHUNK_ROWS):
+        count = min(CHUNK_ROWS, patients - start)
+        rows = []
+        for identifier in patient_identifiers.allocate(count):
+            gender = rng.choice(('male', 'female'))
+            ward_id = rng.choice(by_gender[gender] or [w[0] for w in ward_rows])
+            admitted = now - timedelta(days=rng.uniform(0, 365))
+            discharged = None
+            if free[ward_id] > 0:
+                free[ward_id] -= 1
+            else:
+                discharged = admitted + (now - admitted) * rng.random()
+            rows.append({'patient_identifier': identifier, 'name': _name(rng), 'age': rng.randint(0, 99),
+                         'gender': gender, 'ward_id': ward_id, 'team_id': rng.choice(team_ids),
+                         'admission_date': admitted, 'discharge_date': discharged})
+        _insert_chunked(Patient, rows)
+    db.session.execute(
+        update(Ward.__table__).where(Ward.__table__.c.id == bindparam('ward_id'))
+        .values(current_occupancy=bindparam('occupancy')),
+        [{'ward_id': ward_id, 'occupancy': int(capacity * TARGET_OCCUPANCY) - free[ward_id]}
+         for ward_id, _, capacity in ward_rows],
+    )
+    db.session.commit()
+    echo(f'{patients} patients')
+
+    # Treatments by a doctor of the patient's team, during the stay
+    patient_rows = db.session.execute(
+        select(Patient.id, Patient.team_id, Patient.admission_date, Patient.discharge_date)
+        .where(Patient.id > last_patient)
+    ).all()
+    if treatments and patient_rows:
+        for start in range(0, treatments, CHUNK_ROWS):
+            rows = []
+            for _ in range(min(CHUNK_ROWS, treatments - start)):
+                patient_id, team_id, admitted, discharged = rng.choice(patient_rows)
+                until = discharged or now
+                medication, dosage = rng.choice(MEDICATIONS)
+                rows.append({'patient_id': patient_id, 'doctor_id': rng.choice(doctors_by_team[team_id]),
+                             'treatment_time': admitted + (until - admitted) * rng.random(),
+                             'medication': medication, 'dosage': dosage, 'notes': 'Routine round'})
+            db.session.execute(insert(TreatmentLog), rows)
+            db.session.commit()
+            if (start // CHUNK_ROWS) % 50 == 49:
+                echo(f'  {start + len(rows)} treatments')
+    rebuild_treatment_rollup()
+    echo(f'{treatments if patient_rows else 0} treatments')
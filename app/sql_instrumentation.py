@@ -0,0 +1,203 @@
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime, UTC
+from functools import wraps
+
+from flask import current_app, g, has_app_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+# Slowest statements kept per request
+SLOWEST_KEPT = 5
+
+_history_lock = threading.Lock()
+_history = deque(maxlen=50)
+
+
+class QueryBudgetExceeded(AssertionError):
+    """A request ran more SQL statements than its route's query budget."""
+
+
+@dataclass
+class StatementStats:
+    statement: str
+    count: int = 0
+    total_ms: float = 0.0
+    slowest_ms: float = 0.0
+    parameter_sets: set = field(default_factory=set)
+
+
+@dataclass
+class RequestQueries:
+    """SQL executed while handling one request.
+
+    Statements are grouped by their SQL text, which still carries the bind
+    placeholders; the same text run repeatedly with different parameters
+    (typically one query per row of an earlier result) is the N+1 pattern.
+    """
+    method: str
+    path: str
+    endpoint: str | None
+    count: int = 0
+    total_ms: float = 0.0
+    statements: dict = field(default_factory=dict)
+    slowest: list = field(default_factory=list)
+    # (statement, exception class name) of statements that raised
+    failed: list = field(default_factory=list)
+    budget: int | None = None
+    status: int | None = None
+    started_at: datetime | None = None
+
+    def record(self, statement, parameters, elapsed_ms, error=None):
+        self.count += 1
+        if error is not None:
+            self.failed.append((statement, error))
+        self.total_ms += elapsed_ms
+        stats = self.statements.get(statement)
+        if stats is None:
+            stats = self.statements[statement] = StatementStats(statement)
+        stats.count += 1
+        stats.total_ms += elapsed_ms
+        stats.slowest_ms = max(stats.slowest_ms, elapsed_ms)
+        # Two distinct parameter sets are enough to tell repeats from a re-run
+        if len(stats.parameter_sets) < 2:
+            stats.parameter_sets.add(repr(parameters))
+        self.slowest.append((elapsed_ms, statement))
+        self.slowest.sort(key=lambda item: item[0], reverse=True)
+        del self.slowest[SLOWEST_KEPT:]
+
+    def repeated(self, threshold):
+        """Statements run at least `threshold` times with differing parameters."""
+        return sorted(
+            (s for s in self.statements.values() if s.count >= threshold and len(s.parameter_sets) > 1),
+            key=lambda s: s.count, reverse=True,
+        )
+
+    @property
+    def over_budget(self):
+        return self.budget is not None and self.count > self.budget
+
+
+def query_budget(max_queries):
+    """Declare the most SQL statements one request to this view may run.
+
+    Usage:
+        @query_budget(6)
+        def view():
+            ...
+
+    A request over budget is logged and flagged with an X-Query-Budget
+    header; with TESTING or SQL_QUERY_BUDGET_STRICT it raises
+    QueryBudgetExceeded instead, so a test client request fails loudly.
+    Requests are always counted while TESTING is set, whatever
+    SQL_INSTRUMENTATION says.
+    """
+    def decorator(f):
+        @wraps(f)
+        def wrapped(*args, **kwargs):
+            stats = g.get('sql_queries')
+            if stats is not None:
+                stats.budget = max_queries
+            return f(*args, **kwargs)
+        return wrapped
+    return decorator
+
+
+def _current():
+    return g.get('sql_queries') if has_app_context() else None
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current() is not None:
+        conn.info.setdefault('sql_instrumentation_start', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current()
+    starts = conn.info.get('sql_instrumentation_start')
+    if stats is None or not starts:
+        return
+    stats.record(statement, parameters, (time.perf_counter() - starts.pop()) * 1000)
+
+
+def _handle_error(exception_context):
+    # A statement that raises never reaches after_cursor_execute; without
+    # this its start time would stay on the pooled connection
+    conn = exception_context.connection
+    starts = conn.info.get('sql_instrumentation_start') if conn is not None else None
+    if not starts:
+        return
+    elapsed_ms = (time.perf_counter() - starts.pop()) * 1000
+    stats = _current()
+    if stats is not None and exception_context.statement is not None:
+        stats.record(exception_context.statement, exception_context.parameters, elapsed_ms,
+                     error=type(exception_context.original_exception).__name__)
+
+
+def instrumentation_enabled(app):
+    return bool(app.config.get('SQL_INSTRUMENTATION') or app.testing)
+
+
+def _start_request():
+    # Checked per request so tests can set TESTING after create_app()
+    if not instrumentation_enabled(current_app):
+        return
+    g.sql_queries = RequestQueries(request.method, request.path, request.endpoint,
+                                   started_at=datetime.now(UTC))
+
+
+def _finish_request(response):
+    stats = g.pop('sql_queries', None)
+    if stats is None:
+        return response
+    config = current_app.config
+    repeated = stats.repeated(config.get('SQL_N_PLUS_ONE_THRESHOLD', 5))
+    stats.status = response.status_code
+    response.headers['X-Query-Count'] = str(stats.count)
+    response.headers['X-DB-Time-ms'] = f'{stats.total_ms:.2f}'
+    if stats.failed:
+        response.headers['X-Query-Failed'] = str(len(stats.failed))
+    if repeated:
+        response.headers['X-Query-Repeated'] = str(len(repeated))
+        current_app.logger.warning(
+            'Possible N+1 on %s %s: %s', stats.method, stats.path,
+            '; '.join(f'{s.count}x {s.statement[:120]}' for s in repeated),
+        )
+    if stats.budget is not None:
+        response.headers['X-Query-Budget'] = f'{stats.count}/{stats.budget}'
+    with _history_lock:
+        _history.appendleft(stats)
+    if stats.over_budget:
+        message = f'{stats.endpoint} ran {stats.count} queries, budget is {stats.budget}'
+        if current_app.testing or config.get('SQL_QUERY_BUDGET_STRICT'):
+            raise QueryBudgetExceeded(message)
+        current_app.logger.warning('Query budget exceeded: %s', message)
+    return response
+
+
+def recent_requests():
+    """Instrumented requests, newest first."""
+    with _history_lock:
+        return list(_history)
+
+
+def init_sql_instrumentation(app):
+    """Record per-request SQL statistics when SQL_INSTRUMENTATION or TESTING is on.
+
+    Listens to cursor events on every engine; statements outside a request
+    (CLI commands, background threads) are not recorded.
+    """
+    global _history
+    with _history_lock:
+        _history = deque(maxlen=app.config.get('SQL_INSTRUMENTATION_HISTORY', 50))
+    # On the Engine class, so engines need not be created (or their driver
+    # imported) at startup; the listeners do nothing outside an instrumented request
+    if not event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+        event.listen(Engine, 'handle_error', _handle_error)
+    app.before_request(_start_request)
+    app.after_request(_finish_request)
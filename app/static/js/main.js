@@ -120,19 +120,24 @@ function initPatientSearch() {
             return;
         }
         
+        // Patient, ward and team names are user input: set them as text, never as HTML
+        function element(tag, className, text) {
+            const el = document.createElement(tag);
+            el.className = className;
+            if (text !== undefined) el.textContent = text;
+            return el;
+        }
+        
         patients.forEach(patient => {
-            const item = document.createElement('a');
-            item.className = 'dropdown-item';
-            item.href = `/patients/${patient.id}`;
-            item.innerHTML = `
-                <div class="d-flex align-items-center">
-                    <div class="flex-grow-1">
-                        <h6 class="mb-0">${patient.name}</h6>
-                        <small class="text-muted">Patient ID: ${patient.id}</small>
-                    </div>
-                    <small class="text-muted">${patient.ward || 'No ward assigned'}</small>
-                </div>
-            `;
+            const item = element('a', 'dropdown-item');
+            item.href = `/patients/${encodeURIComponent(patient.id)}`;
+            const row = element('div', 'd-flex align-items-center');
+            const details = element('div', 'flex-grow-1');
+            details.appendChild(element('h6', 'mb-0', patient.name));
+            details.appendChild(element('small', 'text-muted', `Patient ID: ${patient.patient_identifier || patient.id}`));
+            row.appendChild(details);
+            row.appendChild(element('small', 'text-muted', patient.ward || 'No ward assigned'));
+            item.appendChild(row);
             searchResults.appendChild(item);
         });
         
@@ -0,0 +1,104 @@
+from collections import OrderedDict
+from datetime import timedelta
+
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+
+from app import db
+from app.models import Patient, TreatmentDailyRollup, TreatmentLog
+
+_rollup = TreatmentDailyRollup.__table__
+_KEY = ('day', 'doctor_id', 'team_id', 'ward_id')
+
+
+def _upsert(dialect_name, values):
+    """Dialect-native "insert or add to the count" statement, or None if unsupported."""
+    increment = _rollup.c.treatment_count + values['treatment_count']
+    if dialect_name in ('mysql', 'mariadb'):
+        return mysql.insert(_rollup).values(**values).on_duplicate_key_update(treatment_count=increment)
+    if dialect_name in ('postgresql', 'sqlite'):
+        make_insert = postgresql.insert if dialect_name == 'postgresql' else sqlite.insert
+        return make_insert(_rollup).values(**values).on_conflict_do_update(
+            index_elements=[_rollup.c[k] for k in _KEY], set_={'treatment_count': increment},
+        )
+    return None
+
+
+def record_treatment(day, doctor_id, team_id, ward_id, count=1):
+    """Add `count` treatments to one rollup bucket, in the caller's transaction.
+
+    Call next to the TreatmentLog insert it mirrors so both commit (or roll
+    back) together. `team_id` and `ward_id` are the patient's at treatment time.
+    """
+    values = {'day': day, 'doctor_id': doctor_id, 'team_id': team_id, 'ward_id': ward_id,
+              'treatment_count': count}
+    stmt = _upsert(db.engine.dialect.name, values)
+    if stmt is not None:
+        db.session.execute(stmt)
+        return
+    bumped = db.session.execute(
+        update(_rollup)
+        .where(*(_rollup.c[k] == values[k] for k in _KEY))
+        .values(treatment_count=_rollup.c.treatment_count + count)
+    )
+    if bumped.rowcount == 0:
+        db.session.execute(insert(_rollup).values(**values))
+
+
+def rebuild_treatment_rollup():
+    """Recompute the whole rollup from treatment_log and commit.
+
+    Treatments are attributed to the patient's current ward and team, since
+    the log does not record where the patient was at the time.
+    """
+    day = func.date(TreatmentLog.treatment_time)
+    db.session.execute(delete(_rollup))
+    db.session.execute(insert(_rollup).from_select(
+        list(_KEY) + ['treatment_count'],
+        select(day, TreatmentLog.doctor_id, Patient.team_id, Patient.ward_id, func.count(TreatmentLog.id))
+        .join(Patient, Patient.id == TreatmentLog.patient_id)
+        .group_by(day, TreatmentLog.doctor_id, Patient.team_id, Patient.ward_id),
+    ))
+    db.session.commit()
+
+
+def _filtered(stmt, start=None, end=None, doctor_id=None, team_id=None, ward_id=None):
+    if start is not None:
+        stmt = stmt.where(_rollup.c.day >= start)
+    if end is not None:
+        stmt = stmt.where(_rollup.c.day < end)
+    for column, value in (('doctor_id', doctor_id), ('team_id', team_id), ('ward_id', ward_id)):
+        if value is not None:
+            stmt = stmt.where(_rollup.c[column] == value)
+    return stmt
+
+
+def treatment_total_select(**filters):
+    """SELECT of the treatment count over [start, end) days and optional doctor/team/ward."""
+    return _filtered(select(func.coalesce(func.sum(_rollup.c.treatment_count), 0)), **filters)
+
+
+def total_treatments(**filters):
+    return int(db.session.execute(treatment_total_select(**filters)).scalar())
+
+
+def treatments_per_day(start, end, **filters):
+    """Ordered {'YYYY-MM-DD': count} for every day in [start, end), zero-filled.
+
+    Reads one row per day from the rollup, so the cost grows with the number
+    of days and not with the number of treatments.
+    """
+    counts = OrderedDict()
+    day = start
+    while day < end:
+        counts[day.strftime('%Y-%m-%d')] = 0
+        day += timedelta(days=1)
+    rows = db.session.execute(_filtered(
+        select(_rollup.c.day, func.sum(_rollup.c.treatment_count)).group_by(_rollup.c.day),
+        start=start, end=end, **filters,
+    ))
+    for day, count in rows:
+        key = day.strftime('%Y-%m-%d') if hasattr(day, 'strftime') else str(day)
+        if key in counts:
+            counts[key] = int(count)
+    return counts
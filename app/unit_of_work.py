@@ -0,0 +1,80 @@
+from flask_login import current_user
+from sqlalchemy import insert
+
+from app import db
+from app.audit import audit_logger
+from app.models import ActivityLog
+
+
+class UnitOfWork:
+    """Commit a write together with its ActivityLog rows and audit entries.
+
+    Routes stage their domain changes on the session as usual, record
+    activity and audit entries on the unit of work, then call commit() once:
+
+        uow = UnitOfWork()
+        patient.discharge_date = now
+        uow.activity('Discharge Patient', f'{patient.name} discharged')
+        uow.audit(lambda: f'... patient {patient.id} ...')
+        uow.on_commit(invalidate_dashboard_snapshot)
+        uow.commit()
+
+    All staged activity rows go out as a single multi-row INSERT in the same
+    transaction as the domain change. Audit messages are logged and
+    on_commit callbacks run only after the commit succeeds. An audit message
+    may be a callable, for text that needs values only known after flush
+    (such as a new row's id).
+    """
+
+    def __init__(self, session=None):
+        self.session = session or db.session
+        self._activities = []
+        self._audit = []
+        self._callbacks = []
+
+    def activity(self, action, details, user_id=None, username=None):
+        if user_id is None and username is None:
+            user_id = getattr(current_user, 'id', None)
+            username = getattr(current_user, 'username', 'unknown')
+        self._activities.append({
+            'user_id': user_id,
+            'username': username,
+            'action': action,
+            'details': details,
+        })
+
+    def audit(self, message):
+        self._audit.append(message)
+
+    def on_commit(self, callback, *args):
+        self._callbacks.append((callback, args))
+
+    def commit(self):
+        try:
+            if self._activities:
+                self.session.execute(insert(ActivityLog), self._activities)
+            self.session.commit()
+        except Exception:
+            self.rollback()
+            raise
+        self._activities = []
+        audit, self._audit = self._audit, []
+        for message in audit:
+            audit_logger.info(message() if callable(message) else message)
+        callbacks, self._callbacks = self._callbacks, []
+        for callback, args in callbacks:
+            callback(*args)
+
+    def rollback(self):
+        self.session.rollback()
+        self._activities, self._audit, self._callbacks = [], [], []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.commit()
+        else:
+            self.rollback()
+        return False
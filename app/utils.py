@@ -1,4 +1,8 @@
+import base64
+from datetime import datetime
 from functools import wraps
+from typing import NamedTuple
+from sqlalchemy import and_, or_
 from flask import redirect, url_for, flash
 from flask_login import current_user
 
@@ -23,3 +27,75 @@ def roles_required(*allowed_roles):
             return f(*args, **kwargs)
         return wrapped
     return decorator
+
+
+class KeysetPage(NamedTuple):
+    items: list
+    next_cursor: str | None
+    prev_cursor: str | None
+
+
+def encode_cursor(*values):
+    """Encode keyset values into an opaque, URL-safe cursor token."""
+    raw = '|'.join(v.isoformat() if isinstance(v, datetime) else str(v) for v in values)
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token, columns):
+    """Decode a cursor produced by encode_cursor back into typed values.
+
+    Returns None for malformed tokens so callers can fall back to the first page.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)).decode('utf-8')
+        parts = raw.split('|')
+        if len(parts) != len(columns):
+            return None
+        values = []
+        for col, part in zip(columns, parts):
+            python_type = col.type.python_type
+            values.append(python_type.fromisoformat(part) if python_type is datetime else python_type(part))
+        return values
+    except (ValueError, TypeError, UnicodeDecodeError):
+        return None
+
+
+def keyset_paginate(query, columns, after=None, before=None, per_page=50):
+    """Paginate `query` by a descending keyset over `columns`.
+
+    `columns` must uniquely order the rows (e.g. (Patient.admission_date, Patient.id)).
+    `after` walks towards older rows, `before` towards newer ones; each page costs
+    one indexed range scan of per_page + 1 rows no matter how deep it is.
+    """
+    cursor = decode_cursor(after, columns) if after else None
+    backwards = False
+    if cursor is None and before:
+        cursor = decode_cursor(before, columns)
+        backwards = cursor is not None
+
+    if cursor is not None:
+        # Row-value comparison (a, b) < (x, y) spelled out portably
+        clauses = []
+        for i, col in enumerate(columns):
+            prefix = [columns[j] == cursor[j] for j in range(i)]
+            step = col > cursor[i] if backwards else col < cursor[i]
+            clauses.append(and_(*prefix, step))
+        query = query.filter(or_(*clauses))
+
+    ordering = [col.asc() if backwards else col.desc() for col in columns]
+    rows = query.order_by(*ordering).limit(per_page + 1).all()
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+    if backwards:
+        rows.reverse()
+
+    def cursor_for(row):
+        return encode_cursor(*(getattr(row, col.key) for col in columns))
+
+    next_cursor = prev_cursor = None
+    if rows:
+        if has_more or backwards:
+            next_cursor = cursor_for(rows[-1])
+        if cursor is not None and (has_more or not backwards):
+            prev_cursor = cursor_for(rows[0])
+    return KeysetPage(rows, next_cursor, prev_cursor)
@@ -0,0 +1,111 @@
+-- SQLite schema of an install that predates the team readiness columns, the
+-- treatment rollup and identifier tables, and the secondary indexes.
+
+CREATE TABLE user (
+	id INTEGER NOT NULL,
+	username VARCHAR(64) NOT NULL,
+	email VARCHAR(120) NOT NULL,
+	password_hash VARCHAR(128) NOT NULL,
+	role VARCHAR(20) NOT NULL,
+	PRIMARY KEY (id),
+	UNIQUE (username),
+	UNIQUE (email)
+);
+
+CREATE TABLE ward (
+	id INTEGER NOT NULL,
+	name VARCHAR(50) NOT NULL,
+	type VARCHAR(20) NOT NULL,
+	capacity INTEGER NOT NULL,
+	current_occupancy INTEGER NOT NULL,
+	PRIMARY KEY (id),
+	UNIQUE (name)
+);
+
+CREATE TABLE team (
+	id INTEGER NOT NULL,
+	code VARCHAR(10) NOT NULL,
+	name VARCHAR(100) NOT NULL,
+	specialization VARCHAR(100) NOT NULL,
+	PRIMARY KEY (id),
+	UNIQUE (code)
+);
+
+CREATE TABLE nurse (
+	id INTEGER NOT NULL,
+	name VARCHAR(100) NOT NULL,
+	grade VARCHAR(50),
+	team_id INTEGER,
+	user_id INTEGER,
+	PRIMARY KEY (id),
+	FOREIGN KEY(team_id) REFERENCES team (id),
+	UNIQUE (user_id),
+	FOREIGN KEY(user_id) REFERENCES user (id)
+);
+
+CREATE TABLE technician (
+	id INTEGER NOT NULL,
+	name VARCHAR(100) NOT NULL,
+	specialization VARCHAR(100) NOT NULL,
+	user_id INTEGER,
+	PRIMARY KEY (id),
+	UNIQUE (user_id),
+	FOREIGN KEY(user_id) REFERENCES user (id)
+);
+
+CREATE TABLE activity_log (
+	id INTEGER NOT NULL,
+	user_id INTEGER,
+	username VARCHAR(64),
+	action VARCHAR(64),
+	details VARCHAR(256),
+	timestamp DATETIME,
+	PRIMARY KEY (id),
+	FOREIGN KEY(user_id) REFERENCES user (id)
+);
+
+CREATE TABLE doctor (
+	id INTEGER NOT NULL,
+	name VARCHAR(100) NOT NULL,
+	grade VARCHAR(20) NOT NULL,
+	specialization VARCHAR(100) NOT NULL,
+	team_id INTEGER NOT NULL,
+	user_id INTEGER,
+	PRIMARY KEY (id),
+	FOREIGN KEY(team_id) REFERENCES team (id),
+	UNIQUE (user_id),
+	FOREIGN KEY(user_id) REFERENCES user (id)
+);
+
+CREATE TABLE patient (
+	id INTEGER NOT NULL,
+	patient_identifier VARCHAR(32) NOT NULL,
+	name VARCHAR(100) NOT NULL,
+	age INTEGER NOT NULL,
+	gender VARCHAR(10) NOT NULL,
+	admission_date DATETIME NOT NULL,
+	discharge_date DATETIME,
+	ward_id INTEGER NOT NULL,
+	team_id INTEGER NOT NULL,
+	medical_record TEXT,
+	PRIMARY KEY (id),
+	FOREIGN KEY(ward_id) REFERENCES ward (id),
+	FOREIGN KEY(team_id) REFERENCES team (id)
+);
+
+CREATE UNIQUE INDEX ix_patient_patient_identifier ON patient (patient_identifier);
+
+CREATE TABLE treatment_log (
+	id INTEGER NOT NULL,
+	patient_id INTEGER NOT NULL,
+	doctor_id INTEGER NOT NULL,
+	treatment_time DATETIME NOT NULL,
+	notes TEXT,
+	medication VARCHAR(255),
+	dosage VARCHAR(100),
+	nurse_id INTEGER,
+	PRIMARY KEY (id),
+	FOREIGN KEY(patient_id) REFERENCES patient (id),
+	FOREIGN KEY(doctor_id) REFERENCES doctor (id),
+	FOREIGN KEY(nurse_id) REFERENCES nurse (id)
+);
@@ -0,0 +1,48 @@
+import pytest
+
+from app import create_app, db
+from app.cli import init_database
+from app.dashboard_stats import dashboard_snapshot
+from app.fragment_cache import fragment_cache
+from app.search_index import patient_search_index
+from app.user_cache import user_cache
+
+PASSWORDS = {'admin': 'admin123', 'nurse': 'nurse123', 'doctor': 'doctor123'}
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    """The app on a fresh SQLite file holding only the default users."""
+    monkeypatch.setenv('SQLALCHEMY_DATABASE_URI', f"sqlite:///{tmp_path / 'hms.db'}")
+    monkeypatch.setenv('AUDIT_LOG_PATH', str(tmp_path / 'audit.log'))
+    # Cheap hashes; these tests are not about password storage
+    monkeypatch.setenv('PASSWORD_HASH_METHOD', 'pbkdf2:sha256:1000')
+    app = create_app()
+    app.config['TESTING'] = True
+    with app.app_context():
+        init_database()
+    # Process-wide caches must not carry rows over from another test's database
+    user_cache.clear()
+    fragment_cache.clear()
+    dashboard_snapshot.clear()
+    patient_search_index.invalidate()
+    yield app
+    with app.app_context():
+        db.session.remove()
+        for engine in db.engines.values():
+            engine.dispose()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def login(client):
+    """login('admin') signs the test client in as one of the default users."""
+    def sign_in(username):
+        response = client.post('/login', data={'username': username, 'password': PASSWORDS[username]})
+        assert response.status_code == 302, response.status_code
+        return client
+    return sign_in
@@ -0,0 +1,29 @@
+from app import db
+from app.admissions import AdmissionImporter
+from app.models import Team, Ward
+from app.seed import seed_hospital
+
+
+def test_results_follow_input_order(app):
+    with app.app_context():
+        seed_hospital(wards=2, patients=0, treatments=0, teams=1, seed=1, echo=lambda *args: None)
+        ward = db.session.query(Ward).filter(Ward.capacity - Ward.current_occupancy >= 5).first()
+        team = db.session.query(Team).filter_by(admission_ready=True).first()
+        gender = 'female' if ward.type.lower() == 'female' else 'male'
+
+        def admit(name):
+            return {'name': name, 'age': '40', 'gender': gender, 'ward_name': ward.name,
+                    'team_id': str(team.id), 'admission_date': '2026-01-01'}
+        rows = [
+            (2, admit('Ann')),
+            (3, {'name': 'No ward'}),
+            (4, admit('Ben')),
+            (5, ValueError('Invalid JSON')),
+            (6, admit('Cal')),
+            (7, {**admit('Dee'), 'ward_name': 'Nowhere'}),
+            (8, admit('Eve')),
+        ]
+        results = list(AdmissionImporter(chunk_size=3).run(rows))
+
+    assert [result.row for result in results] == [2, 3, 4, 5, 6, 7, 8]
+    assert [result.status for result in results] == ['accepted', 'rejected'] * 3 + ['accepted']
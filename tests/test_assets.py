@@ -0,0 +1,19 @@
+from app.assets import build_assets
+
+
+def test_only_fingerprinted_assets_are_cached_as_immutable(app, client, tmp_path):
+    (tmp_path / 'css').mkdir()
+    (tmp_path / 'css' / 'style.css').write_text('body { color: black; }')
+    app.static_folder = str(tmp_path)
+    manifest = build_assets(app.static_folder)
+
+    response = client.get(f"/assets/{manifest['css/style.css']}")
+    assert response.status_code == 200
+    assert response.cache_control.immutable
+    assert response.cache_control.max_age == 365 * 24 * 3600
+
+    response = client.get('/assets/manifest.json')
+    assert response.status_code == 200
+    assert response.cache_control.no_cache
+    assert not response.cache_control.immutable
+    assert response.cache_control.max_age == 0
@@ -0,0 +1,47 @@
+import os
+
+from app import audit
+from app.audit import audit_logger, shutdown_audit_logging
+
+
+def _read(path):
+    with open(path, encoding='utf-8') as f:
+        return f.read()
+
+
+def test_writer_starts_on_first_record(app):
+    assert audit._listener is None
+    audit_logger.info('first record')
+    assert audit._listener_pid == os.getpid()
+    shutdown_audit_logging()
+    assert 'first record' in _read(app.config['AUDIT_LOG_PATH'])
+
+
+def test_reopens_log_moved_away_by_rotation(app):
+    path = app.config['AUDIT_LOG_PATH']
+    audit_logger.info('before rotation')
+    audit._listener.stop()
+    audit._listener.start()
+    os.rename(path, path + '.1')
+    audit_logger.info('after rotation')
+    shutdown_audit_logging()
+    assert 'before rotation' in _read(path + '.1')
+    assert 'after rotation' in _read(path)
+    assert 'before rotation' not in _read(path)
+
+
+def test_forked_child_writes_through_its_own_writer(app):
+    path = app.config['AUDIT_LOG_PATH']
+    audit_logger.info('from parent')
+    pid = os.fork()
+    if pid == 0:
+        try:
+            audit_logger.info('from child')
+            shutdown_audit_logging()
+        finally:
+            os._exit(0)
+    os.waitpid(pid, 0)
+    shutdown_audit_logging()
+    text = _read(path)
+    assert 'from parent' in text
+    assert 'from child' in text
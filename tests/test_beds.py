@@ -0,0 +1,54 @@
+import threading
+
+from app import db
+from app.beds import reserve_bed, reserve_beds
+from app.models import Ward
+
+THREADS = 30
+
+
+def _ward(capacity, occupancy):
+    ward = Ward(name='Small', type='general', capacity=capacity, current_occupancy=occupancy)
+    db.session.add(ward)
+    db.session.commit()
+    return ward.id
+
+
+def _race(app, ward_id, reserve):
+    """Run reserve(ward_id) from THREADS threads at once, each in its own session."""
+    start = threading.Barrier(THREADS)
+    results = []
+
+    def worker():
+        with app.app_context():
+            start.wait()
+            taken = reserve(ward_id)
+            db.session.commit()
+            results.append(taken)
+            db.session.remove()
+
+    threads = [threading.Thread(target=worker) for _ in range(THREADS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(results) == THREADS
+    return results
+
+
+def test_concurrent_reservations_never_overbook(app):
+    with app.app_context():
+        ward_id = _ward(capacity=8, occupancy=3)
+    results = _race(app, ward_id, reserve_bed)
+    assert results.count(True) == 8 - 3
+    with app.app_context():
+        assert db.session.get(Ward, ward_id).current_occupancy == 8
+
+
+def test_concurrent_group_reservations_never_overbook(app):
+    with app.app_context():
+        ward_id = _ward(capacity=10, occupancy=1)
+    results = _race(app, ward_id, lambda ward_id: reserve_beds(ward_id, 2))
+    assert sum(results) == 10 - 1
+    with app.app_context():
+        assert db.session.get(Ward, ward_id).current_occupancy == 10
@@ -0,0 +1,21 @@
+from datetime import datetime, UTC, timedelta
+
+from app import db
+from app.models import Doctor, Patient, TreatmentLog
+from app.seed import seed_hospital
+
+
+def test_scheduling_day_includes_its_last_second(app, login):
+    with app.app_context():
+        seed_hospital(wards=1, patients=1, treatments=0, teams=1, seed=1, echo=lambda *args: None)
+        patient = db.session.query(Patient).filter(Patient.discharge_date.is_(None)).first()
+        doctor = db.session.query(Doctor).filter_by(team_id=patient.team_id).first()
+        today = datetime.now(UTC).date()
+        midnight = datetime(today.year, today.month, today.day) + timedelta(days=1)
+        for moment in (midnight - timedelta(milliseconds=500), midnight):
+            db.session.add(TreatmentLog(patient_id=patient.id, doctor_id=doctor.id, treatment_time=moment))
+        db.session.commit()
+
+    response = login('admin').get('/doctor-scheduling')
+    assert response.status_code == 200
+    assert b'1 appointments scheduled' in response.data
@@ -0,0 +1,51 @@
+import shutil
+
+import pytest
+from flask import g
+
+from app import db
+from app.dashboard_stats import dashboard_snapshot, invalidate_dashboard_snapshot
+from app.models import Patient, Team, Ward
+
+
+@pytest.fixture
+def replica_app(request, tmp_path, monkeypatch):
+    """The app with a read replica that holds the default users but none of the later writes."""
+    monkeypatch.setenv('DB_REPLICA_URI', f"sqlite:///{tmp_path / 'replica.db'}")
+    app = request.getfixturevalue('app')
+    with app.app_context():
+        db.engines['replica'].dispose()
+        shutil.copy(tmp_path / 'hms.db', tmp_path / 'replica.db')
+        db.session.add_all([Ward(name='North', type='mixed', capacity=10),
+                            Team(code='T1', name='Blue', specialization='General')])
+        db.session.commit()
+        db.session.add(Patient(name='Ann Lee', age=40, gender='female',
+                               ward_id=Ward.query.first().id, team_id=Team.query.first().id))
+        db.session.commit()
+    yield app
+    # init_app registered metadata for the bind on the shared db object
+    db.metadatas.pop('replica', None)
+
+
+def _total_patients(client):
+    response = client.get('/reports')
+    assert response.status_code == 200
+    return response.data.split(b'fs-2 fw-bold">', 1)[1].split(b'<', 1)[0].strip()
+
+
+def test_replica_is_skipped_right_after_a_write(replica_app, login):
+    client = login('admin')
+    assert _total_patients(client) == b'1'
+    # Outside the grace window the (lagging) replica serves the view
+    replica_app.config['DB_REPLICA_WRITE_GRACE_SECONDS'] = 0
+    assert _total_patients(client) == b'0'
+
+
+def test_dashboard_snapshot_is_computed_on_the_primary(replica_app):
+    replica_app.config['DB_REPLICA_WRITE_GRACE_SECONDS'] = 0
+    invalidate_dashboard_snapshot()
+    with replica_app.test_request_context():
+        g.db_use_replica = True
+        assert dashboard_snapshot.get().total_patients == 1
+        assert g.db_use_replica
+        assert Patient.query.count() == 0
@@ -0,0 +1,26 @@
+import csv
+import io
+import json
+
+from app import db
+from app.models import Patient, Team, Ward
+
+
+def _admit(app, name):
+    with app.app_context():
+        db.session.add_all([Ward(name='North', type='mixed', capacity=10),
+                            Team(code='T1', name='Blue', specialization='General')])
+        db.session.commit()
+        db.session.add(Patient(name=name, age=40, gender='female',
+                               ward_id=Ward.query.first().id, team_id=Team.query.first().id))
+        db.session.commit()
+
+
+def test_csv_cells_cannot_run_as_formulas(app, login):
+    _admit(app, '=HYPERLINK("http://example.com","x")')
+    client = login('admin')
+    rows = list(csv.DictReader(io.StringIO(client.get('/export/patients.csv').get_data(as_text=True))))
+    assert rows[0]['name'] == '\'=HYPERLINK("http://example.com","x")'
+
+    lines = client.get('/export/patients.ndjson').get_data(as_text=True).splitlines()
+    assert json.loads(lines[0])['name'] == '=HYPERLINK("http://example.com","x")'
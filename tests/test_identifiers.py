@@ -0,0 +1,24 @@
+import os
+
+from app import db
+from app.identifiers import patient_identifiers
+
+
+def test_forked_child_does_not_reuse_the_parents_block(app):
+    with app.app_context():
+        patient_identifiers.next()
+        read_end, write_end = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            try:
+                # Pooled connections belong to the parent
+                db.engine.dispose(close=False)
+                os.write(write_end, patient_identifiers.next().encode())
+            finally:
+                os._exit(0)
+        os.close(write_end)
+        os.waitpid(pid, 0)
+        with os.fdopen(read_end) as pipe:
+            child = pipe.read()
+        assert child
+        assert patient_identifiers.next() != child
@@ -0,0 +1,27 @@
+from app.login_throttle import login_throttle
+
+
+def _login(client, username, password, address):
+    return client.post('/login', data={'username': username, 'password': password},
+                       environ_base={'REMOTE_ADDR': address})
+
+
+def test_failed_attempts_do_not_lock_the_account_out_elsewhere(client):
+    for _ in range(login_throttle.users.burst):
+        assert _login(client, 'admin', 'wrong', '10.0.0.1').status_code == 200
+    assert _login(client, 'admin', 'wrong', '10.0.0.1').status_code == 429
+    assert _login(client, 'admin', 'admin123', '10.0.0.2').status_code == 302
+
+
+def test_busy_response_does_not_reveal_whether_the_account_exists(client):
+    # Every verification slot taken by other requests
+    slots = login_throttle._slots
+    held = 0
+    while slots.acquire(blocking=False):
+        held += 1
+    try:
+        assert _login(client, 'admin', 'wrong', '10.0.0.3').status_code == 503
+        assert _login(client, 'nobody', 'wrong', '10.0.0.3').status_code == 503
+    finally:
+        for _ in range(held):
+            slots.release()
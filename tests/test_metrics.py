@@ -0,0 +1,23 @@
+import pytest
+
+
+@pytest.fixture
+def scrape(app, client):
+    app.config.update(METRICS_ENABLED=True, METRICS_ALLOWED_IPS=('127.0.0.1',))
+
+    def get():
+        response = client.get('/metrics')
+        assert response.status_code == 200
+        return response
+    return get
+
+
+def test_scrape_does_not_compute_the_dashboard_numbers(scrape, login):
+    response = scrape()
+    assert response.headers['X-Query-Count'] == '0'
+    assert b'hms_active_admissions' not in response.data
+
+    login('admin').get('/dashboard')
+    response = scrape()
+    assert response.headers['X-Query-Count'] == '0'
+    assert b'hms_active_admissions 0' in response.data
@@ -0,0 +1,38 @@
+import pytest
+
+from app.seed import seed_hospital
+
+ROUTES = {
+    'admin': ('/patients', '/staff', '/teams', '/reports'),
+    'doctor': ('/doctor',),
+}
+
+
+def _query_counts(app, login):
+    counts = {}
+    for username, urls in ROUTES.items():
+        client = login(username)
+        for url in urls:
+            # The first request may also load the user into the user cache
+            client.get(url)
+            response = client.get(url)
+            assert response.status_code == 200, url
+            counts[url] = int(response.headers['X-Query-Count'])
+        client.get('/logout')
+    return counts
+
+
+@pytest.fixture
+def seed(app):
+    def add(**sizes):
+        with app.app_context():
+            seed_hospital(seed=1, echo=lambda *args: None, **sizes)
+    return add
+
+
+def test_query_count_does_not_grow_with_rows(app, login, seed):
+    seed(wards=2, patients=10, treatments=20)
+    small = _query_counts(app, login)
+    seed(wards=8, patients=120, treatments=400)
+    large = _query_counts(app, login)
+    assert large == small
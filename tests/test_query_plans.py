@@ -0,0 +1,24 @@
+from sqlalchemy import text
+
+from app import db
+from app.cli import create_missing_indexes
+from app.query_plans import explain_hot_queries
+from app.seed import seed_hospital
+
+
+def test_hot_queries_use_an_index(app):
+    with app.app_context():
+        seed_hospital(wards=4, patients=200, treatments=500, seed=1, echo=lambda *args: None)
+        plans = explain_hot_queries()
+    assert plans
+    assert {plan.name: plan.lines for plan in plans if plan.full_scans} == {}
+
+
+def test_init_adds_indexes_missing_from_an_existing_database(app):
+    with app.app_context():
+        with db.engine.begin() as conn:
+            conn.execute(text('DROP INDEX ix_ward_name_lower'))
+            conn.execute(text('DROP INDEX ix_patient_discharge_date'))
+        assert sorted(create_missing_indexes()) == ['ix_patient_discharge_date', 'ix_ward_name_lower']
+        assert create_missing_indexes() == []
+        assert not [plan.name for plan in explain_hot_queries() if plan.full_scans]
@@ -0,0 +1,116 @@
+import threading
+from types import SimpleNamespace
+
+from app import db
+from app.models import Patient, Ward, Team
+from app import search_index
+from app.search_index import PatientSearchIndex, _Index
+
+
+def _admit(name):
+    ward, team = Ward.query.first(), Team.query.first()
+    patient = Patient(name=name, age=40, gender='female', ward_id=ward.id, team_id=team.id)
+    db.session.add(patient)
+    db.session.commit()
+    return patient
+
+
+def _names(index, query):
+    return [result['name'] for result in index.search(query)]
+
+
+def test_stale_index_is_rebuilt_off_the_request_path(app, monkeypatch):
+    index = PatientSearchIndex()
+    with app.app_context():
+        db.session.add_all([Ward(name='North', type='mixed', capacity=10), Team(code='T1', name='Blue', specialization='General')])
+        db.session.commit()
+        _admit('Alice Archer')
+        index.ensure_built()
+        # Written by "another process": not in the index until a rebuild
+        _admit('Alina Abbott')
+        assert _names(index, 'ali') == ['Alice Archer']
+
+        loading, release = threading.Event(), threading.Event()
+        load = _Index.load
+
+        def slow_load(self):
+            loading.set()
+            release.wait(5)
+            load(self)
+        monkeypatch.setattr(_Index, 'load', slow_load)
+        index._built_at -= 1000
+        index.ensure_built(ttl=300)
+        assert loading.wait(5)
+        # The stale generation keeps answering while the new one loads
+        assert _names(index, 'ali') == ['Alice Archer']
+        release.set()
+        for _ in range(100):
+            if len(_names(index, 'ali')) == 2:
+                break
+            threading.Event().wait(0.05)
+        assert sorted(_names(index, 'ali')) == ['Alice Archer', 'Alina Abbott']
+
+
+def test_writes_during_a_rebuild_are_replayed(app, monkeypatch):
+    index = PatientSearchIndex()
+    with app.app_context():
+        db.session.add_all([Ward(name='North', type='mixed', capacity=10), Team(code='T1', name='Blue', specialization='General')])
+        db.session.commit()
+        patient = _admit('Alice Archer')
+        index.ensure_built()
+        load = _Index.load
+
+        def load_then_rename(self):
+            load(self)
+            # Committed after the rows were read
+            patient.name = 'Beatrice Archer'
+            db.session.commit()
+            index.upsert_patient(patient)
+        monkeypatch.setattr(_Index, 'load', load_then_rename)
+        index.rebuild()
+        assert _names(index, 'archer') == ['Beatrice Archer']
+
+
+def test_broad_terms_read_the_best_matches_first(monkeypatch):
+    monkeypatch.setattr(search_index, 'MATCH_SCAN_LIMIT', 20)
+    index = _Index()
+    index.upsert_ward(1, 'North')
+    index.upsert_team(1, 'Blue')
+    for pid in range(1, 200):
+        index.upsert_patient(pid, f'Anna Smith{pid}', f'P{pid:04d}', 1, 1, discharged=pid % 2 == 0)
+    index.upsert_patient(500, 'Smith Jones', 'P0500', 1, 1, discharged=True)
+    index.upsert_patient(501, 'Jane Smith', 'P0501', 1, 1, discharged=False)
+    # Far more patients match than are scanned; exact and first-name matches still rank first
+    assert _names(index, 'smith')[:2] == ['Smith Jones', 'Jane Smith']
+    assert _names(index, 'p0042') == ['Anna Smith42']
+    assert all(not result['discharged'] for result in index.search('smith1')[:10])
+
+
+def test_searches_run_alongside_writes():
+    index = PatientSearchIndex()
+    index._index = _Index()
+    index._index.upsert_ward(1, 'North')
+    index._index.upsert_team(1, 'Blue')
+    errors, done = [], threading.Event()
+
+    def search():
+        try:
+            while not done.is_set():
+                index.search('a')
+                index.search('al ar')
+        except Exception as exc:
+            errors.append(exc)
+    readers = [threading.Thread(target=search) for _ in range(3)]
+    for reader in readers:
+        reader.start()
+    for pid in range(1, 2000):
+        index.upsert_ward(1, f'Ward {pid}')
+        index.upsert_patient(SimpleNamespace(id=pid, name=f'Al{pid} Ar{pid}', patient_identifier=f'P{pid}',
+                                             ward_id=1, team_id=1, discharge_date=None))
+        if pid % 3 == 0:
+            index.remove_patient(pid - 1)
+    done.set()
+    for reader in readers:
+        reader.join()
+    assert errors == []
+    assert _names(index, 'al1999') == ['Al1999 Ar1999']
@@ -0,0 +1,45 @@
+import pytest
+from sqlalchemy.exc import OperationalError
+
+from app import db
+from app.models import User
+from app.sql_instrumentation import QueryBudgetExceeded, query_budget
+
+
+def _add_counting_route(app, budget, queries):
+    @query_budget(budget)
+    def counting():
+        for _ in range(queries):
+            db.session.execute(db.select(User.id)).all()
+        return 'ok'
+    app.add_url_rule(f'/_test/{budget}/{queries}', f'counting_{budget}_{queries}', counting)
+
+
+def test_counts_requests_when_testing_with_instrumentation_off(app, client):
+    assert not app.config['SQL_INSTRUMENTATION']
+    _add_counting_route(app, budget=5, queries=3)
+    response = client.get('/_test/5/3')
+    assert response.headers['X-Query-Count'] == '3'
+    assert response.headers['X-Query-Budget'] == '3/5'
+
+
+def test_budget_is_enforced_when_testing(app, client):
+    _add_counting_route(app, budget=1, queries=3)
+    with pytest.raises(QueryBudgetExceeded):
+        client.get('/_test/1/3')
+
+
+def test_failed_statements_are_recorded_and_leave_no_state_behind(app, client):
+    def failing():
+        try:
+            db.session.execute(db.text('SELECT * FROM no_such_table')).all()
+        except OperationalError:
+            db.session.rollback()
+        connection = db.session.connection()
+        return str(len(connection.info.get('sql_instrumentation_start', [])))
+    app.add_url_rule('/_test/failing', 'failing', failing)
+
+    response = client.get('/_test/failing')
+    assert response.get_data(as_text=True) == '0'
+    assert response.headers['X-Query-Count'] == '1'
+    assert response.headers['X-Query-Failed'] == '1'
@@ -0,0 +1,10 @@
+import statistics
+
+from app.cli import measure_startup
+
+
+def test_startup_is_within_budget(app):
+    # The probes inherit the test database and audit log from the environment
+    budget_ms = app.config['STARTUP_TIME_BUDGET_MS']
+    median = statistics.median(measure_startup(app.root_path, runs=3))
+    assert median <= budget_ms, f'startup takes {median:.0f} ms, over the {budget_ms} ms budget'
@@ -0,0 +1,63 @@
+import sqlite3
+from pathlib import Path
+
+import pytest
+
+from app import create_app, db
+from app.cli import add_missing_columns, create_missing_indexes, init_database
+from app.models import Doctor, Team
+from app.treatment_rollup import total_treatments
+
+BASELINE_SCHEMA = Path(__file__).with_name('baseline_schema.sql')
+
+
+@pytest.fixture
+def baseline_app(tmp_path, monkeypatch):
+    """The app on a database created from the pre-upgrade schema, holding one team of doctors."""
+    path = tmp_path / 'hms.db'
+    with sqlite3.connect(path) as conn:
+        conn.executescript(BASELINE_SCHEMA.read_text())
+        conn.execute("INSERT INTO team (id, code, name, specialization) VALUES (1, 'T1', 'Blue', 'General')")
+        conn.executemany(
+            'INSERT INTO doctor (name, grade, specialization, team_id) VALUES (?, ?, ?, 1)',
+            [('Dr A', 'Consultant', 'General'), ('Dr B', 'Grade 1', 'General'), ('Dr C', 'Registrar', 'General')],
+        )
+        conn.execute("INSERT INTO ward (id, name, type, capacity, current_occupancy) VALUES (1, 'North', 'mixed', 10, 1)")
+        conn.execute("INSERT INTO patient (id, patient_identifier, name, age, gender, admission_date, ward_id, team_id) "
+                     "VALUES (1, 'P1', 'Ann Lee', 40, 'female', '2026-01-01 09:00:00', 1, 1)")
+        conn.executemany('INSERT INTO treatment_log (patient_id, doctor_id, treatment_time) VALUES (1, 1, ?)',
+                         [('2026-01-01 10:00:00',), ('2026-01-01 18:00:00',), ('2026-01-02 10:00:00',)])
+    monkeypatch.setenv('SQLALCHEMY_DATABASE_URI', f'sqlite:///{path}')
+    monkeypatch.setenv('AUDIT_LOG_PATH', str(tmp_path / 'audit.log'))
+    app = create_app()
+    app.config['TESTING'] = True
+    yield app
+    with app.app_context():
+        db.session.remove()
+        db.engine.dispose()
+
+
+def test_init_upgrades_a_baseline_database(baseline_app):
+    with baseline_app.app_context():
+        created = init_database()
+        assert {'doctor.grade_category', 'team.doctor_count'} <= set(created.columns)
+        assert 'ix_doctor_team_grade_category' in created.indexes
+        team = db.session.get(Team, 1)
+        assert (team.doctor_count, team.consultant_count, team.grade1_count) == (3, 1, 1)
+        assert team.admission_ready
+        assert sorted(d.grade_category for d in Doctor.query) == ['consultant', 'grade1', 'other']
+        assert created.rollup_rebuilt
+        assert total_treatments() == 3
+
+        again = init_database()
+        assert (again.columns, again.indexes, again.rollup_rebuilt, again.users) == ([], [], False, [])
+
+
+def test_indexes_on_columns_not_added_yet_are_skipped(baseline_app):
+    with baseline_app.app_context():
+        db.create_all()
+        created = create_missing_indexes()
+        assert 'ix_doctor_team_grade_category' not in created
+        assert 'ix_patient_discharge_date' in created
+        add_missing_columns()
+        assert create_missing_indexes() == ['ix_doctor_team_grade_category']